@@ -0,0 +1,325 @@
+"""
+bench/ftp_server.py
+
+Lokaler FTP-Stand-in-Server (nur Standardbibliothek) für Benchmarks.
+
+Unterstützt die Befehle, die FTPWorker verwendet: USER/PASS, CWD/PWD, TYPE,
+PASV/EPSV, NLST/LIST/MLSD, RETR/STOR/APPE mit REST, SIZE, MDTM, RNFR/RNTO,
+DELE, MKD, NOOP, FEAT/OPTS, XCRC und HASH (SHA-256).
+"""
+
+import hashlib
+import os
+import socket
+import socketserver
+import threading
+import time
+import zlib
+
+
+class _FTPHandler(socketserver.StreamRequestHandler):
+    """
+    Bearbeitet eine Steuerverbindung. Pro Client ein Thread.
+    """
+
+    def setup(self):
+        super().setup()
+        # Antworten sofort senden, sonst verfälscht Nagle/Delayed-ACK die Latenzen
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.root = self.server.root
+        self.cwd = "/"
+        self.rest = 0
+        self.rnfr = None
+        self.pasv_sock = None
+        self.user = None
+
+    def reply(self, line: str):
+        self.wfile.write((line + "\r\n").encode("utf-8"))
+        self.wfile.flush()
+
+    def handle(self):
+        self.reply("220 Enshrouded Stand-in FTP bereit")
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                break
+            line = raw.decode("utf-8", "replace").rstrip("\r\n")
+            cmd, _, arg = line.partition(" ")
+            cmd = cmd.upper()
+            if self.server.latency:
+                time.sleep(self.server.latency)
+            handler = getattr(self, f"cmd_{cmd}", None)
+            if handler is None:
+                self.reply(f"502 Befehl {cmd} nicht implementiert")
+                continue
+            try:
+                if handler(arg) is False:
+                    break
+            except (ConnectionError, socket.timeout):
+                break
+            except Exception as e:
+                self.reply(f"451 Fehler: {e}")
+        self._close_pasv()
+
+    # --- Hilfsfunktionen -------------------------------------------------
+
+    def _path(self, name: str) -> str:
+        virtual = name if name.startswith("/") else os.path.join(self.cwd, name)
+        virtual = os.path.normpath(virtual).replace("\\", "/")
+        if not virtual.startswith("/"):
+            virtual = "/" + virtual
+        return os.path.join(self.root, virtual.lstrip("/"))
+
+    def _close_pasv(self):
+        if self.pasv_sock:
+            try:
+                self.pasv_sock.close()
+            except OSError:
+                pass
+            self.pasv_sock = None
+
+    def _open_data(self):
+        if not self.pasv_sock:
+            self.reply("425 Kein PASV aktiv")
+            return None
+        self.pasv_sock.settimeout(10)
+        conn, _ = self.pasv_sock.accept()
+        self._close_pasv()
+        return conn
+
+    def _fact_line(self, path: str, name: str) -> str:
+        st = os.stat(path)
+        kind = "dir" if os.path.isdir(path) else "file"
+        modify = time.strftime("%Y%m%d%H%M%S", time.gmtime(st.st_mtime))
+        return f"type={kind};size={st.st_size};modify={modify}; {name}"
+
+    # --- Befehle ---------------------------------------------------------
+
+    def cmd_USER(self, arg):
+        self.user = arg
+        self.reply("331 Passwort erforderlich")
+
+    def cmd_PASS(self, arg):
+        self.server.logins += 1
+        self.reply("230 Angemeldet")
+
+    def cmd_SYST(self, arg):
+        self.reply("215 UNIX Type: L8")
+
+    def cmd_FEAT(self, arg):
+        self.wfile.write(b"211-Features:\r\n MLST type*;size*;modify*;\r\n"
+                         b" SIZE\r\n MDTM\r\n REST STREAM\r\n EPSV\r\n"
+                         b" HASH SHA-256*;SHA-1;MD5\r\n XCRC\r\n")
+        self.reply("211 Ende")
+
+    def cmd_OPTS(self, arg):
+        self.reply("200 OK")
+
+    def cmd_NOOP(self, arg):
+        self.reply("200 NOOP ok")
+
+    def cmd_PWD(self, arg):
+        self.reply(f'257 "{self.cwd}"')
+
+    def cmd_CWD(self, arg):
+        path = self._path(arg)
+        if not os.path.isdir(path):
+            self.reply("550 Verzeichnis nicht gefunden")
+            return
+        self.cwd = os.path.normpath(os.path.join(self.cwd, arg)).replace("\\", "/")
+        self.reply("250 OK")
+
+    def cmd_TYPE(self, arg):
+        self.reply("200 Typ gesetzt")
+
+    def cmd_PASV(self, arg):
+        self._close_pasv()
+        self.pasv_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.pasv_sock.bind(("127.0.0.1", 0))
+        self.pasv_sock.listen(1)
+        port = self.pasv_sock.getsockname()[1]
+        self.reply(f"227 Entering Passive Mode (127,0,0,1,{port >> 8},{port & 0xFF})")
+
+    def cmd_EPSV(self, arg):
+        self._close_pasv()
+        self.pasv_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.pasv_sock.bind(("127.0.0.1", 0))
+        self.pasv_sock.listen(1)
+        port = self.pasv_sock.getsockname()[1]
+        self.reply(f"229 Entering Extended Passive Mode (|||{port}|)")
+
+    def _send_listing(self, lines):
+        conn = self._open_data()
+        if conn is None:
+            return
+        self.reply("150 Verzeichnisliste folgt")
+        with conn:
+            conn.sendall("".join(line + "\r\n" for line in lines).encode("utf-8"))
+        self.reply("226 Übertragung abgeschlossen")
+
+    def cmd_NLST(self, arg):
+        path = self._path(arg or ".")
+        self._send_listing(sorted(os.listdir(path)))
+
+    def cmd_LIST(self, arg):
+        path = self._path(arg or ".")
+        self._send_listing(sorted(os.listdir(path)))
+
+    def cmd_MLSD(self, arg):
+        path = self._path(arg or ".")
+        self._send_listing(self._fact_line(os.path.join(path, n), n) for n in sorted(os.listdir(path)))
+
+    def cmd_REST(self, arg):
+        self.rest = int(arg)
+        self.reply(f"350 Neustart bei {self.rest}")
+
+    def cmd_RETR(self, arg):
+        path = self._path(arg)
+        if not os.path.isfile(path):
+            self._close_pasv()
+            self.reply("550 Datei nicht gefunden")
+            return
+        conn = self._open_data()
+        if conn is None:
+            return
+        self.reply("150 Öffne Datenverbindung")
+        offset, self.rest = self.rest, 0
+        with conn, open(path, "rb") as f:
+            f.seek(offset)
+            while True:
+                chunk = f.read(65536)
+                if not chunk:
+                    break
+                conn.sendall(chunk)
+        self.reply("226 Übertragung abgeschlossen")
+
+    def _store(self, arg, mode):
+        path = self._path(arg)
+        conn = self._open_data()
+        if conn is None:
+            return
+        self.reply("150 Bereit zum Empfang")
+        offset, self.rest = self.rest, 0
+        if mode == "r+b" and not os.path.exists(path):
+            mode = "wb"
+        with conn, open(path, mode) as f:
+            if offset:
+                f.seek(offset)
+                f.truncate()
+            while True:
+                chunk = conn.recv(65536)
+                if not chunk:
+                    break
+                f.write(chunk)
+        self.reply("226 Übertragung abgeschlossen")
+
+    def cmd_STOR(self, arg):
+        self._store(arg, "r+b" if self.rest else "wb")
+
+    def cmd_APPE(self, arg):
+        self._store(arg, "ab")
+
+    def cmd_SIZE(self, arg):
+        path = self._path(arg)
+        if not os.path.isfile(path):
+            self.reply("550 Datei nicht gefunden")
+            return
+        self.reply(f"213 {os.path.getsize(path)}")
+
+    def cmd_MDTM(self, arg):
+        path = self._path(arg)
+        if not os.path.exists(path):
+            self.reply("550 Datei nicht gefunden")
+            return
+        self.reply("213 " + time.strftime("%Y%m%d%H%M%S", time.gmtime(os.path.getmtime(path))))
+
+    def cmd_XCRC(self, arg):
+        path = self._path(arg)
+        if not os.path.isfile(path):
+            self.reply("550 Datei nicht gefunden")
+            return
+        crc = 0
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(65536), b""):
+                crc = zlib.crc32(chunk, crc)
+        self.reply(f"250 {crc & 0xFFFFFFFF:08X}")
+
+    def cmd_HASH(self, arg):
+        path = self._path(arg)
+        if not os.path.isfile(path):
+            self.reply("550 Datei nicht gefunden")
+            return
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(65536), b""):
+                h.update(chunk)
+        size = os.path.getsize(path)
+        self.reply(f"213 SHA-256 0-{size} {h.hexdigest()} {arg}")
+
+    def cmd_RNFR(self, arg):
+        path = self._path(arg)
+        if not os.path.exists(path):
+            self.reply("550 Datei nicht gefunden")
+            return
+        self.rnfr = path
+        self.reply("350 Bereit für RNTO")
+
+    def cmd_RNTO(self, arg):
+        if not self.rnfr:
+            self.reply("503 RNFR fehlt")
+            return
+        os.replace(self.rnfr, self._path(arg))
+        self.rnfr = None
+        self.reply("250 Umbenannt")
+
+    def cmd_DELE(self, arg):
+        path = self._path(arg)
+        if not os.path.isfile(path):
+            self.reply("550 Datei nicht gefunden")
+            return
+        os.remove(path)
+        self.reply("250 Gelöscht")
+
+    def cmd_MKD(self, arg):
+        os.makedirs(self._path(arg), exist_ok=True)
+        self.reply(f'257 "{arg}" erstellt')
+
+    def cmd_QUIT(self, arg):
+        self.reply("221 Auf Wiedersehen")
+        return False
+
+
+class StubFTPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    """
+    In-Process-FTP-Server auf 127.0.0.1, der ein lokales Verzeichnis ausliefert.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+    # Viele gleichzeitige Verbindungsaufbauten (asyncio-Backend) nicht am Backlog scheitern lassen
+    request_queue_size = 128
+
+    def __init__(self, root: str, port: int = 0, latency: float = 0.0):
+        """
+        Args:
+            root (str): Lokales Wurzelverzeichnis, das ausgeliefert wird.
+            port (int): TCP-Port (0 = beliebiger freier Port).
+            latency (float): Künstliche Verzögerung pro Befehl in Sekunden.
+        """
+        super().__init__(("127.0.0.1", port), _FTPHandler)
+        self.root = os.path.abspath(root)
+        self.latency = latency
+        self.logins = 0
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
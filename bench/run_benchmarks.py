@@ -0,0 +1,316 @@
+"""
+bench/run_benchmarks.py
+
+Benchmarks für FTPWorker, BackupLogic und UpdaterLogic gegen einen lokalen
+FTP-Stand-in-Server (bench/ftp_server.py).
+
+Der Server liefert ein temporäres Verzeichnis mit synthetischen
+Enshrouded-Spielständen aus (Index-Datei plus Slot-Dateien). Gemessen werden
+Verbindungsaufbau, Verzeichnisliste, Download, Backup und Index-Update; das
+Ergebnis (Latenz-Perzentile, Durchsatz, Speicherspitze je Vorgang) wird als
+JSON gespeichert und kann mit einem früheren Lauf verglichen werden.
+
+Beispiele (aus dem Projektverzeichnis):
+    python -m bench.run_benchmarks
+    python -m bench.run_benchmarks --slots 10 --slot-size-mb 8 --output bench_neu.json
+    python -m bench.run_benchmarks --compare bench_alt.json --latency-ms 20
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from bench.ftp_server import StubFTPServer
+from core.async_ftp import AsyncFTPWorker
+from core.backup_logic import BackupLogic
+from core.ftp_pool import FTPConnectionPool
+from core.ftp_worker import FTPWorker
+from core.listing_cache import ListingCache
+from core.logger import Logger
+from core.updater_logic import UpdaterLogic
+
+INDEX_FILENAME = "3ad85aea-index"
+SLOT_PREFIX = "3ad85aea"
+
+
+def create_dataset(root: str, slots: int, slot_size: int, seed: int = 42) -> int:
+    """
+    Legt synthetische Spielstände an: eine Index-Datei und `slots` Slot-Dateien.
+    Die Slots sind zufällige (also wie echte, komprimierte Spielstände kaum
+    weiter komprimierbare) Daten.
+
+    Returns:
+        int: Gesamtgröße aller Dateien in Bytes.
+    """
+    rng = random.Random(seed)
+    total = 0
+    for index in range(slots):
+        name = SLOT_PREFIX if index == 0 else f"{SLOT_PREFIX}-{index}"
+        with open(os.path.join(root, name), "wb") as f:
+            remaining = slot_size
+            while remaining > 0:
+                chunk = rng.randbytes(min(remaining, 1024 * 1024))
+                f.write(chunk)
+                remaining -= len(chunk)
+        total += slot_size
+    total += write_index(root, slots)
+    return total
+
+
+def write_index(root: str, latest: int) -> int:
+    content = json.dumps({"time": int(time.time()), "deleted": False, "latest": latest}, indent=2)
+    with open(os.path.join(root, INDEX_FILENAME), "w", encoding="utf-8") as f:
+        f.write(content)
+    return len(content)
+
+
+def percentile(values: List[float], p: float) -> float:
+    """
+    Perzentil mit linearer Interpolation (p von 0 bis 100).
+    """
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    rank = (len(ordered) - 1) * p / 100.0
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def peak_rss_kb() -> Optional[int]:
+    """
+    Höchster Speicherverbrauch des ganzen Laufs in KiB (None, falls nicht
+    ermittelbar). ru_maxrss steigt nur, taugt also nicht für einzelne Vorgänge.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS liefert Bytes, Linux KiB
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def summarize(measured: Tuple[List[float], int], bytes_per_run: int = 0) -> Dict[str, Any]:
+    durations, peak_alloc_kb = measured
+    ms = [d * 1000 for d in durations]
+    result = {
+        "runs": len(ms),
+        "min_ms": round(min(ms), 3),
+        "mean_ms": round(sum(ms) / len(ms), 3),
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p90_ms": round(percentile(ms, 90), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "max_ms": round(max(ms), 3),
+        "peak_alloc_kb": peak_alloc_kb,
+    }
+    if bytes_per_run:
+        result["bytes_per_run"] = bytes_per_run
+        result["throughput_mb_s"] = round(bytes_per_run * len(durations) / sum(durations) / (1024 * 1024), 2)
+    return result
+
+
+def measure(operation: Callable[[], Any], iterations: int, warmup: int) -> Tuple[List[float], int]:
+    """
+    Misst die Dauer von `iterations` Durchläufen und danach in einem eigenen
+    Durchlauf die Speicherspitze (tracemalloc verlangsamt jede Allokation und
+    läuft deshalb nicht bei den Zeitmessungen mit).
+
+    Returns:
+        Tuple[List[float], int]: Dauern in Sekunden und die Spitze der
+            Python-Allokationen über dem Stand vor dem Durchlauf in KiB. Der
+            Stand-in-Server läuft im selben Prozess und zählt mit.
+    """
+    for _ in range(warmup):
+        operation()
+    durations = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        if operation() is False:
+            raise RuntimeError("Vorgang fehlgeschlagen")
+        durations.append(time.perf_counter() - started)
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        operation()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return durations, max(0, peak - before) // 1024
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(args) -> Dict[str, Any]:
+    logger = Logger(level=logging.WARNING)
+    slot_size = int(args.slot_size_mb * 1024 * 1024)
+    work_dir = tempfile.mkdtemp(prefix="enshrouded_bench_")
+    server_root = os.path.join(work_dir, "server")
+    backup_dir = os.path.join(work_dir, "backups")
+    os.makedirs(server_root)
+    dataset_bytes = create_dataset(server_root, args.slots, slot_size)
+    slot_names = sorted(name for name in os.listdir(server_root) if name != INDEX_FILENAME)
+
+    server = StubFTPServer(server_root, latency=args.latency_ms / 1000.0)
+    server.start()
+    results: Dict[str, Any] = {}
+    try:
+        worker_class = AsyncFTPWorker if args.ftp_backend == "asyncio" else FTPWorker
+        listing_cache = ListingCache(ttl=args.listing_cache_ttl)
+
+        def new_worker(pool: Optional[FTPConnectionPool] = None) -> FTPWorker:
+            # Das asyncio-Backend ignoriert den Pool
+            return worker_class("127.0.0.1", "bench", "bench", "/", logger, port=server.port,
+                                pool=pool, tmp_dir=work_dir,
+                                blocksize=args.blocksize_kib * 1024 if args.blocksize_kib else None,
+                                listing_cache=listing_cache)
+
+        # Verbindungsaufbau inkl. Login, ohne und mit Pool
+        def connect_cold():
+            worker = new_worker()
+            ok = worker.connect()
+            worker.disconnect()
+            return ok
+
+        results["connect"] = summarize(measure(connect_cold, args.iterations, args.warmup))
+
+        pool = FTPConnectionPool(logger=logger)
+
+        def connect_pooled():
+            worker = new_worker(pool)
+            ok = worker.connect()
+            worker.disconnect()
+            return ok
+
+        results["connect_pooled"] = summarize(measure(connect_pooled, args.iterations, args.warmup))
+
+        worker = new_worker(pool)
+        with worker.session():
+            results["list"] = summarize(measure(lambda: worker.list_entries() is not None,
+                                                args.iterations, args.warmup))
+
+            def download_all():
+                for name in slot_names:
+                    if worker.download_stream(name, lambda block: None) is None:
+                        return False
+                return True
+
+            results["download"] = summarize(measure(download_all, args.iterations, args.warmup),
+                                            bytes_per_run=slot_size * len(slot_names))
+
+            def update_index():
+                # Index zurücksetzen, damit 'latest' nie bei 0 hängen bleibt
+                write_index(server_root, args.slots)
+                return UpdaterLogic(worker, logger).process_index_file()
+
+            results["index_update"] = summarize(measure(update_index, args.iterations, args.warmup))
+
+        def backup():
+            shutil.rmtree(backup_dir, ignore_errors=True)
+            return BackupLogic(new_worker(pool), backup_dir, logger,
+                               parallel_connections=args.parallel_connections,
+                               backend=args.backup_backend, compression=args.compression,
+                               compression_level=args.compression_level).create_backup()
+
+        results["backup"] = summarize(measure(backup, args.iterations, args.warmup),
+                                      bytes_per_run=dataset_bytes)
+        pool.close_all()
+    finally:
+        server.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "revision": git_revision(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {
+            "slots": args.slots,
+            "slot_size_mb": args.slot_size_mb,
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+            "latency_ms": args.latency_ms,
+            "ftp_backend": args.ftp_backend,
+            "blocksize_kib": args.blocksize_kib,
+            "listing_cache_ttl": args.listing_cache_ttl,
+            "parallel_connections": args.parallel_connections,
+            "backup_backend": args.backup_backend,
+            "compression": args.compression,
+            "compression_level": args.compression_level,
+        },
+        "results": results,
+        "peak_rss_kb": peak_rss_kb(),
+    }
+
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None):
+    print(f"{'Vorgang':<16}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'MB/s':>10}{'Spitze KiB':>12}"
+          + (f"{'p50 Δ':>10}" if baseline else ""))
+    for name, stats in report["results"].items():
+        line = (f"{name:<16}{stats['p50_ms']:>10.2f}{stats['p90_ms']:>10.2f}{stats['p99_ms']:>10.2f}"
+                f"{stats.get('throughput_mb_s', ''):>10}{stats.get('peak_alloc_kb', ''):>12}")
+        if baseline:
+            old = baseline.get("results", {}).get(name)
+            if old and old.get("p50_ms"):
+                line += f"{(stats['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100:>+9.1f}%"
+        print(line)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmarks gegen einen lokalen FTP-Stand-in-Server")
+    parser.add_argument("--slots", type=int, default=10, help="Anzahl Slot-Dateien")
+    parser.add_argument("--slot-size-mb", type=float, default=4.0, help="Größe je Slot-Datei in MiB")
+    parser.add_argument("--iterations", type=int, default=10, help="Gemessene Durchläufe je Vorgang")
+    parser.add_argument("--warmup", type=int, default=1, help="Nicht gemessene Aufwärmdurchläufe")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Künstliche Verzögerung pro FTP-Befehl")
+    parser.add_argument("--ftp-backend", choices=("ftplib", "asyncio"), default="ftplib", help="FTP-Backend")
+    parser.add_argument("--blocksize-kib", type=int,
+                        help="Feste Blockgröße für Übertragungen (Standard: gemessen, siehe TransferTuner)")
+    parser.add_argument("--listing-cache-ttl", type=float, default=0.0,
+                        help="TTL des Verzeichnis-Caches in Sekunden (Standard 0: jede Liste vom Server)")
+    parser.add_argument("--parallel-connections", type=int, default=1, help="Verbindungen für das Backup")
+    parser.add_argument("--backup-backend", choices=("zip", "store"), default="zip")
+    parser.add_argument("--compression", default="deflate", help="store, deflate, bzip2, lzma, zstd oder auto")
+    parser.add_argument("--compression-level", type=int, help="Kompressionsstufe")
+    parser.add_argument("--output", default="bench_results.json", help="Ergebnisdatei (JSON)")
+    parser.add_argument("--compare", help="Früheres Ergebnis zum Vergleich (JSON)")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    report = run_benchmarks(args)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print_report(report, baseline)
+    print(f"Ergebnis gespeichert: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,572 @@
+"""
+core/async_ftp.py
+
+FTP-Client auf Basis von asyncio als alternatives Backend für FTPWorker.
+
+Alle Sitzungen laufen auf einer gemeinsamen Event-Loop in einem
+Hintergrund-Thread, statt dass jede Verbindung einen eigenen Thread mit
+blockierendem Socket belegt. AsyncFTPClient stellt die FTP-Befehle als
+Coroutinen bereit, z.B. für nebenläufige Index-Updates vieler Server
+(FleetRunner). AsyncFTPSession bietet dieselben Befehle mit der
+Schnittstelle von ftplib.FTP an; AsyncFTPWorker nutzt sie, so dass
+Wiederholungen, Fortsetzen, Metriken und damit UpdaterLogic und BackupLogic
+unverändert auf beiden Backends laufen.
+
+Gedacht ist das Backend für viele kleine Übertragungen (Index-Updates). Große
+Downloads bleiben trotz einer Coroutine je Datei langsamer als mit ftplib,
+weil jeder Block über die Loop an den aufrufenden Thread geht.
+"""
+
+import asyncio
+import concurrent.futures
+import ftplib
+import os
+import queue
+import re
+import socket
+import threading
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+from core.ftp_worker import FTPWorker
+from core.transfer_tuning import apply_socket_buffers
+
+BLOCKSIZE = 64 * 1024
+# Blöcke, die zwischen Event-Loop und aufrufendem Thread unterwegs sein dürfen
+TRANSFER_WINDOW = 8
+# Lesepuffer der Datenverbindung; beim Standard (64 KiB) pausiert der Transport ständig
+DATA_BUFFER_LIMIT = 1024 * 1024
+
+_EPSV_PATTERN = re.compile(r"\(\|\|\|(\d+)\|\)")
+_PASV_PATTERN = re.compile(r"(\d+),(\d+),(\d+),(\d+),(\d+),(\d+)")
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    Liefert die gemeinsame Event-Loop aller Sitzungen. Sie läuft in einem
+    Daemon-Thread und wird beim ersten Aufruf gestartet.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="ftp-asyncio", daemon=True).start()
+            _loop = loop
+        return _loop
+
+
+def run_sync(coroutine: Awaitable) -> Any:
+    """
+    Führt eine Coroutine auf der gemeinsamen Event-Loop aus und wartet auf
+    das Ergebnis. Nicht aus der Event-Loop selbst aufrufen.
+    """
+    return asyncio.run_coroutine_threadsafe(coroutine, get_event_loop()).result()
+
+
+def _reset_after_fork():
+    # Der Loop-Thread existiert im Kindprozess nicht mehr
+    global _loop
+    _loop = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class _Watchdog:
+    """
+    Zeitlimit für eine ganze Übertragung: geht `timeout` Sekunden lang kein
+    Block voran, wird die Datenverbindung mit TimeoutError abgebrochen. Ein
+    wait_for je Block kostet auf schnellen Leitungen mehr als das Kopieren.
+    Solange `waiting` gesetzt ist, wartet die Übertragung auf den Aufrufer
+    (z.B. eine gedrosselte Gegenseite) und läuft nicht ab.
+    """
+
+    def __init__(self, timeout: float, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.timeout = timeout
+        self.reader = reader
+        self.writer = writer
+        self.progress = 0
+        self.waiting = False
+        self._seen = -1
+        self._handle = asyncio.get_running_loop().call_later(timeout, self._check)
+
+    def _check(self):
+        if self.progress == self._seen and not self.waiting:
+            self.reader.set_exception(TimeoutError("Zeitüberschreitung der Datenverbindung"))
+            self.writer.transport.abort()
+            return
+        self._seen = self.progress
+        self._handle = asyncio.get_running_loop().call_later(self.timeout, self._check)
+
+    def cancel(self):
+        self._handle.cancel()
+
+
+class AsyncFTPClient:
+    """
+    Minimaler FTP-Client (passiver Modus) auf asyncio-Streams. Fehlerantworten
+    werden wie bei ftplib als error_temp (4xx), error_perm (5xx) bzw.
+    error_reply gemeldet, Timeouts als TimeoutError.
+    """
+
+    def __init__(self, host: str, port: int = 21, timeout: float = 10.0, encoding: str = "utf-8"):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.encoding = encoding
+        self.welcome: Optional[str] = None
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._epsv = True
+        # Socket-Puffer der Datenverbindungen (None = Systemstandard), siehe core/transfer_tuning.py
+        self.rcvbuf: Optional[int] = None
+        self.sndbuf: Optional[int] = None
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    # --- Steuerverbindung --------------------------------------------------
+
+    async def connect(self) -> str:
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout)
+        self.welcome = await self._get_response()
+        return self.welcome
+
+    async def _readline(self) -> str:
+        line = await asyncio.wait_for(self._reader.readline(), self.timeout)
+        if not line:
+            raise EOFError("Steuerverbindung geschlossen")
+        return line.decode(self.encoding, "replace").rstrip("\r\n")
+
+    async def _get_response(self) -> str:
+        response = await self._readline()
+        if response[3:4] == "-":
+            # Mehrzeilige Antwort endet mit "NNN " (gleicher Code, Leerzeichen)
+            code, lines = response[:3], [response]
+            while True:
+                line = await self._readline()
+                lines.append(line)
+                if line[:3] == code and line[3:4] != "-":
+                    break
+            response = "\n".join(lines)
+        kind = response[:1]
+        if kind in ("1", "2", "3"):
+            return response
+        if kind == "4":
+            raise ftplib.error_temp(response)
+        if kind == "5":
+            raise ftplib.error_perm(response)
+        raise ftplib.error_proto(response)
+
+    async def sendcmd(self, cmd: str) -> str:
+        if "\r" in cmd or "\n" in cmd:
+            raise ValueError("Befehl enthält einen Zeilenumbruch")
+        self._writer.write((cmd + "\r\n").encode(self.encoding))
+        await asyncio.wait_for(self._writer.drain(), self.timeout)
+        return await self._get_response()
+
+    async def voidcmd(self, cmd: str) -> str:
+        response = await self.sendcmd(cmd)
+        if response[:1] != "2":
+            raise ftplib.error_reply(response)
+        return response
+
+    async def login(self, user: str, passwd: str) -> str:
+        response = await self.sendcmd(f"USER {user}")
+        if response[:1] == "3":
+            response = await self.sendcmd(f"PASS {passwd}")
+        if response[:1] != "2":
+            raise ftplib.error_reply(response)
+        return response
+
+    async def cwd(self, path: str) -> str:
+        return await self.voidcmd(f"CWD {path}")
+
+    async def quit(self):
+        """
+        Meldet sich ab und schließt die Verbindung (Fehler beim Abmelden werden ignoriert).
+        """
+        try:
+            if self.connected:
+                await self.voidcmd("QUIT")
+        except (ftplib.Error, OSError, EOFError):
+            pass
+        finally:
+            await self.close()
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = self._reader = None
+
+    # --- Datenverbindung ---------------------------------------------------
+
+    async def _open_data(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        port = None
+        if self._epsv:
+            try:
+                match = _EPSV_PATTERN.search(await self.sendcmd("EPSV"))
+                port = int(match.group(1)) if match else None
+            except ftplib.error_perm:
+                self._epsv = False
+        if port is None:
+            response = await self.sendcmd("PASV")
+            match = _PASV_PATTERN.search(response)
+            if not match:
+                raise ftplib.error_proto(response)
+            port = int(match.group(5)) * 256 + int(match.group(6))
+        # Wie ftplib: Adresse der Steuerverbindung verwenden (PASV-Adressen hinter NAT sind oft falsch)
+        host = self._writer.get_extra_info("peername")[0]
+        if not (self.rcvbuf or self.sndbuf):
+            return await asyncio.wait_for(
+                asyncio.open_connection(host, port, limit=DATA_BUFFER_LIMIT), self.timeout)
+        # Puffer vor dem Verbindungsaufbau setzen, sonst gilt die ausgehandelte Fensterskalierung
+        sock = socket.socket(self._writer.get_extra_info("socket").family, socket.SOCK_STREAM)
+        try:
+            apply_socket_buffers(sock, self.rcvbuf, self.sndbuf)
+            sock.setblocking(False)
+            await asyncio.wait_for(asyncio.get_running_loop().sock_connect(sock, (host, port)), self.timeout)
+        except BaseException:
+            sock.close()
+            raise
+        return await asyncio.open_connection(sock=sock, limit=DATA_BUFFER_LIMIT)
+
+    async def open_transfer(self, cmd: str, rest: Optional[int] = None,
+                            binary: bool = True) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        """
+        Öffnet eine Datenverbindung und startet `cmd` (RETR, STOR, APPE, MLSD...).
+        Nach der Übertragung close_transfer() aufrufen.
+        """
+        await self.voidcmd("TYPE I" if binary else "TYPE A")
+        reader, writer = await self._open_data()
+        try:
+            if rest:
+                await self.sendcmd(f"REST {rest}")
+            response = await self.sendcmd(cmd)
+            if response[:1] != "1":
+                raise ftplib.error_reply(response)
+        except BaseException:
+            writer.close()
+            raise
+        return reader, writer
+
+    async def read_block(self, reader: asyncio.StreamReader, blocksize: int = BLOCKSIZE) -> bytes:
+        return await asyncio.wait_for(reader.read(blocksize), self.timeout)
+
+    async def write_block(self, writer: asyncio.StreamWriter, block: bytes):
+        writer.write(block)
+        await asyncio.wait_for(writer.drain(), self.timeout)
+
+    async def close_transfer(self, writer: asyncio.StreamWriter) -> str:
+        """
+        Schließt die Datenverbindung und liest die Abschlussmeldung (226).
+        """
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        response = await self._get_response()
+        if response[:1] != "2":
+            raise ftplib.error_reply(response)
+        return response
+
+    async def _discard_transfer(self, writer: asyncio.StreamWriter):
+        # Abgebrochene Übertragung: die Abschlussmeldung (226/426) trotzdem
+        # lesen, damit die nächste Antwort wieder zum nächsten Befehl gehört
+        writer.close()
+        try:
+            await asyncio.wait_for(self._get_response(), self.timeout)
+        except (asyncio.TimeoutError, OSError, EOFError, ftplib.Error):
+            pass
+
+    async def retrieve(self, cmd: str, callback: Callable[[bytes], Any], rest: Optional[int] = None,
+                       blocksize: int = BLOCKSIZE) -> str:
+        """
+        Lädt per `cmd` herunter und übergibt jeden Block an `callback`. Liefert
+        der Callback eine Coroutine, wird sie abgewartet.
+        """
+        reader, writer = await self.open_transfer(cmd, rest)
+        watchdog = _Watchdog(self.timeout, reader, writer)
+        try:
+            while True:
+                block = await reader.read(blocksize)
+                if not block:
+                    break
+                watchdog.progress += 1
+                result = callback(block)
+                if asyncio.iscoroutine(result):
+                    watchdog.waiting = True
+                    await result
+                    watchdog.waiting = False
+        except BaseException:
+            await self._discard_transfer(writer)
+            raise
+        finally:
+            watchdog.cancel()
+        return await self.close_transfer(writer)
+
+    async def store(self, cmd: str, fp, blocksize: int = BLOCKSIZE, rest: Optional[int] = None) -> str:
+        """
+        Lädt den Inhalt von `fp` per `cmd` hoch. Liefert `fp.read` eine
+        Coroutine, wird sie abgewartet.
+        """
+        reader, writer = await self.open_transfer(cmd, rest)
+        watchdog = _Watchdog(self.timeout, reader, writer)
+        try:
+            while True:
+                block = fp.read(blocksize)
+                if asyncio.iscoroutine(block):
+                    watchdog.waiting = True
+                    block = await block
+                    watchdog.waiting = False
+                if not block:
+                    break
+                writer.write(block)
+                await writer.drain()
+                watchdog.progress += 1
+        except BaseException:
+            await self._discard_transfer(writer)
+            raise
+        finally:
+            watchdog.cancel()
+        return await self.close_transfer(writer)
+
+    async def retrlines(self, cmd: str) -> List[str]:
+        reader, writer = await self.open_transfer(cmd, binary=False)
+        chunks = []
+        try:
+            while True:
+                block = await self.read_block(reader)
+                if not block:
+                    break
+                chunks.append(block)
+        except BaseException:
+            await self._discard_transfer(writer)
+            raise
+        await self.close_transfer(writer)
+        return b"".join(chunks).decode(self.encoding, "replace").splitlines()
+
+    # --- Befehle -----------------------------------------------------------
+
+    async def mlsd(self, path: str = "", facts: Tuple[str, ...] = ()) -> List[Tuple[str, Dict[str, str]]]:
+        if facts:
+            await self.sendcmd("OPTS MLST " + ";".join(facts) + ";")
+        lines = await self.retrlines(f"MLSD {path}" if path else "MLSD")
+        entries = []
+        for line in lines:
+            facts_found, _, name = line.partition(" ")
+            entry = {}
+            for fact in facts_found[:-1].split(";"):
+                key, _, value = fact.partition("=")
+                entry[key.lower()] = value
+            entries.append((name, entry))
+        return entries
+
+    async def nlst(self, path: str = "") -> List[str]:
+        return await self.retrlines(f"NLST {path}" if path else "NLST")
+
+    async def size(self, filename: str) -> Optional[int]:
+        response = await self.sendcmd(f"SIZE {filename}")
+        if response[:3] == "213":
+            return int(response[3:].strip())
+        return None
+
+    async def rename(self, old_name: str, new_name: str) -> str:
+        response = await self.sendcmd(f"RNFR {old_name}")
+        if response[:1] != "3":
+            raise ftplib.error_reply(response)
+        return await self.voidcmd(f"RNTO {new_name}")
+
+    async def replace(self, old_name: str, new_name: str) -> str:
+        """
+        Wie FTPWorker.rename_file: das Ziel wird nur gelöscht, wenn RNFR die
+        Quelle bestätigt und erst RNTO das Überschreiben verweigert hat.
+        """
+        response = await self.sendcmd(f"RNFR {old_name}")
+        if response[:1] != "3":
+            raise ftplib.error_reply(response)
+        try:
+            return await self.voidcmd(f"RNTO {new_name}")
+        except ftplib.error_perm:
+            await self.delete(new_name)
+            return await self.rename(old_name, new_name)
+
+    async def delete(self, filename: str) -> str:
+        return await self.voidcmd(f"DELE {filename}")
+
+    async def mkd(self, path: str) -> str:
+        return await self.voidcmd(f"MKD {path}")
+
+
+class AsyncFTPSession:
+    """
+    ftplib.FTP-kompatible Hülle um einen AsyncFTPClient. Jeder Aufruf wird auf
+    der gemeinsamen Event-Loop ausgeführt. Eine Übertragung läuft als eine
+    Coroutine; die Blöcke wandern über eine Queue zwischen Loop und
+    aufrufendem Thread. Callbacks (Schreiben ins ZIP-Archiv, Hashen, Drosseln)
+    laufen so im aufrufenden Thread und blockieren die Loop nicht.
+    """
+
+    def __init__(self, client: AsyncFTPClient):
+        self.client = client
+
+    @property
+    def sock(self):
+        # FTPWorker.is_connected() prüft wie bei ftplib auf sock is not None
+        if not self.client.connected:
+            return None
+        return self.client._writer.get_extra_info("socket")
+
+    def sendcmd(self, cmd: str) -> str:
+        return run_sync(self.client.sendcmd(cmd))
+
+    def voidcmd(self, cmd: str) -> str:
+        return run_sync(self.client.voidcmd(cmd))
+
+    def cwd(self, path: str) -> str:
+        return run_sync(self.client.cwd(path))
+
+    def set_socket_buffers(self, rcvbuf: Optional[int] = None, sndbuf: Optional[int] = None):
+        self.client.rcvbuf = rcvbuf
+        self.client.sndbuf = sndbuf
+
+    def retrbinary(self, cmd: str, callback: Callable[[bytes], Any], blocksize: int = BLOCKSIZE,
+                   rest: Optional[int] = None) -> str:
+        # Die Loop liest voraus, bis TRANSFER_WINDOW Blöcke auf den Thread warten
+        loop = get_event_loop()
+        blocks: "queue.Queue[Optional[bytes]]" = queue.Queue()
+        credits = asyncio.Semaphore(TRANSFER_WINDOW)
+
+        async def _deliver(block: bytes):
+            await credits.acquire()
+            blocks.put(block)
+
+        transfer, finished = self._start(self.client.retrieve(cmd, _deliver, rest, blocksize))
+        transfer.add_done_callback(lambda _: blocks.put(None))
+        def _release(count: int):
+            for _ in range(count):
+                credits.release()
+
+        try:
+            consumed = 0
+            for block in iter(blocks.get, None):
+                # Freigaben gesammelt zurückgeben, jeder Aufruf weckt die Loop
+                consumed += 1
+                if consumed == TRANSFER_WINDOW // 2:
+                    loop.call_soon_threadsafe(_release, consumed)
+                    consumed = 0
+                callback(block)
+        except BaseException:
+            self._abort(transfer, finished)
+            raise
+        return transfer.result()
+
+    def storbinary(self, cmd: str, fp, blocksize: int = BLOCKSIZE, callback: Optional[Callable] = None,
+                   rest: Optional[int] = None) -> str:
+        # Der Thread liest voraus, bis TRANSFER_WINDOW Blöcke auf die Loop warten
+        loop = get_event_loop()
+        blocks: "asyncio.Queue[bytes]" = asyncio.Queue()
+        credits = threading.Semaphore(TRANSFER_WINDOW)
+
+        class _Feed:
+            @staticmethod
+            async def read(_size: int) -> bytes:
+                block = await blocks.get()
+                credits.release()
+                return block
+
+        transfer, finished = self._start(self.client.store(cmd, _Feed, blocksize, rest))
+        # Bricht die Übertragung ab, darf der Thread nicht auf Freigaben warten
+        transfer.add_done_callback(lambda _: credits.release(TRANSFER_WINDOW))
+        try:
+            for block in iter(lambda: fp.read(blocksize), b""):
+                credits.acquire()
+                if transfer.done():
+                    break
+                loop.call_soon_threadsafe(blocks.put_nowait, block)
+                if callback:
+                    callback(block)
+            loop.call_soon_threadsafe(blocks.put_nowait, b"")
+        except BaseException:
+            self._abort(transfer, finished)
+            raise
+        return transfer.result()
+
+    @staticmethod
+    def _start(coroutine: Awaitable) -> Tuple[concurrent.futures.Future, threading.Event]:
+        # Das Event wird erst gesetzt, wenn die Coroutine wirklich beendet ist
+        # (ein abgebrochenes Future meldet sich sofort als fertig)
+        finished = threading.Event()
+
+        async def _run():
+            try:
+                return await coroutine
+            finally:
+                finished.set()
+
+        return asyncio.run_coroutine_threadsafe(_run(), get_event_loop()), finished
+
+    def _abort(self, transfer: concurrent.futures.Future, finished: threading.Event):
+        # Erst weiter, wenn die Übertragung die Steuerverbindung nicht mehr benutzt
+        transfer.cancel()
+        finished.wait(self.client.timeout)
+
+    def mlsd(self, path: str = "", facts: List[str] = []) -> Iterator[Tuple[str, Dict[str, str]]]:
+        return iter(run_sync(self.client.mlsd(path, tuple(facts))))
+
+    def nlst(self, *args) -> List[str]:
+        return run_sync(self.client.nlst(" ".join(args)))
+
+    def size(self, filename: str) -> Optional[int]:
+        return run_sync(self.client.size(filename))
+
+    def rename(self, old_name: str, new_name: str) -> str:
+        return run_sync(self.client.rename(old_name, new_name))
+
+    def delete(self, filename: str) -> str:
+        return run_sync(self.client.delete(filename))
+
+    def mkd(self, path: str) -> str:
+        return run_sync(self.client.mkd(path))
+
+    def quit(self):
+        run_sync(self.client.quit())
+
+    def close(self):
+        run_sync(self.client.close())
+
+
+class AsyncFTPWorker(FTPWorker):
+    """
+    FTPWorker auf dem asyncio-Backend. Die Sitzungen leben auf der
+    gemeinsamen Event-Loop; der (ftplib-basierte) Verbindungspool wird nicht
+    verwendet.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = None
+
+    def _open_session(self) -> AsyncFTPSession:
+        return AsyncFTPSession(run_sync(self.open_client()))
+
+    async def open_client(self) -> AsyncFTPClient:
+        """
+        Baut eine angemeldete Sitzung im FTP-Verzeichnis auf, zur direkten
+        Verwendung in Coroutinen auf der Event-Loop.
+        """
+        client = AsyncFTPClient(self.host, self.port, timeout=10)
+        await client.connect()
+        try:
+            await client.login(self.username, self.password)
+            await client.cwd(self.ftp_dir)
+        except BaseException:
+            await client.close()
+            raise
+        return client
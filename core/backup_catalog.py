@@ -0,0 +1,211 @@
+"""
+core/backup_catalog.py
+
+Persistenter Katalog aller Backups eines Backup-Ordners (SQLite).
+
+Pro Backup werden Zeitstempel, Größe, Anzahl Dateien, Quellserver und pro
+Datei Größe und Prüfsumme gespeichert. BackupLogic trägt jedes neue Backup
+direkt ein, die Aufbewahrung entfernt gelöschte Backups. Die Liste
+"Vorhandene Backups" und Suchen nach Dateien kommen so ohne das Öffnen der
+Archive aus; nur Archive, die der Katalog noch nicht kennt (z.B. von Hand
+kopiert), werden beim Abgleich einmalig gelesen.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import zipfile
+from contextlib import closing, contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from core.integrity import ARCHIVE_MANIFEST_NAME, read_archive_manifest
+from core.logger import Logger
+from core.retention import parse_backup_timestamp
+from core.snapshot_store import SnapshotStore
+
+CATALOG_FILENAME = "backup_catalog.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS backups (
+    name TEXT PRIMARY KEY,
+    timestamp TEXT,
+    server TEXT,
+    backend TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    file_count INTEGER NOT NULL,
+    added REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS backup_files (
+    backup TEXT NOT NULL REFERENCES backups(name) ON DELETE CASCADE,
+    filename TEXT NOT NULL,
+    size INTEGER,
+    hash TEXT,
+    PRIMARY KEY (backup, filename)
+);
+CREATE INDEX IF NOT EXISTS idx_backup_files_filename ON backup_files(filename);
+CREATE INDEX IF NOT EXISTS idx_backup_files_hash ON backup_files(hash);
+"""
+
+
+def zip_file_entries(zipf: zipfile.ZipFile) -> Dict[str, Dict[str, Any]]:
+    """
+    Dateiliste eines ZIP-Archivs mit Größe und Hash aus dem Manifest im Archiv,
+    bei älteren Archiven ohne Manifest mit CRC32 aus dem Inhaltsverzeichnis
+    (ohne die Einträge zu entpacken).
+    """
+    manifest = read_archive_manifest(zipf)
+    if manifest is not None:
+        return manifest.get("files", {})
+    return {info.filename: {"size": info.file_size, "hash": f"crc32:{info.CRC:08x}"}
+            for info in zipf.infolist() if not info.is_dir() and info.filename != ARCHIVE_MANIFEST_NAME}
+
+
+class BackupCatalog:
+    """
+    SQLite-Katalog der Backups in einem Backup-Ordner.
+    """
+
+    def __init__(self, db_path: str, logger: Optional[Logger] = None):
+        """
+        Args:
+            db_path (str): Pfad der SQLite-Datei (wird bei Bedarf angelegt).
+            logger (Logger, optional): Logger für Protokollierung.
+        """
+        self.db_path = db_path
+        self.logger = logger
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @classmethod
+    def for_backup_dir(cls, backup_dir: str, logger: Optional[Logger] = None) -> "BackupCatalog":
+        return cls(os.path.join(backup_dir, CATALOG_FILENAME), logger)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        with self._lock, closing(sqlite3.connect(self.db_path, timeout=30)) as conn:
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA foreign_keys = ON")
+            with conn:
+                yield conn
+
+    def add_backup(self, name: str, backend: str, size: int, files: Dict[str, Dict[str, Any]],
+                   server: Optional[str] = None):
+        """
+        Trägt ein Backup ein (oder ersetzt einen vorhandenen Eintrag gleichen Namens).
+
+        Args:
+            name (str): Dateiname des Archivs bzw. Snapshot-Name.
+            backend (str): "zip" oder "store".
+            size (int): Größe in Bytes (Archiv bzw. Summe der Dateien).
+            files (Dict[str, Dict[str, Any]]): Dateiname -> {"size", "hash"}.
+            server (str, optional): Quellserver.
+        """
+        timestamp = parse_backup_timestamp(name)
+        with self._connect() as conn:
+            conn.execute("DELETE FROM backups WHERE name = ?", (name,))
+            conn.execute(
+                "INSERT INTO backups (name, timestamp, server, backend, size, file_count, added) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (name, timestamp.isoformat(sep=" ") if timestamp else None, server, backend,
+                 size, len(files), time.time()))
+            conn.executemany(
+                "INSERT INTO backup_files (backup, filename, size, hash) VALUES (?, ?, ?, ?)",
+                [(name, filename, meta.get("size"), meta.get("hash")) for filename, meta in files.items()])
+
+    def remove_backups(self, names: List[str]):
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM backups WHERE name = ?", [(name,) for name in names])
+
+    def list_backups(self, server: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Liefert die Backups, neueste zuerst.
+
+        Returns:
+            List[Dict[str, Any]]: Einträge mit name, timestamp, server, backend, size und file_count.
+        """
+        query = "SELECT name, timestamp, server, backend, size, file_count FROM backups"
+        params: List[Any] = []
+        if server:
+            query += " WHERE server = ?"
+            params.append(server)
+        query += " ORDER BY timestamp DESC, name DESC"
+        if limit:
+            query += " LIMIT ?"
+            params.append(int(limit))
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute(query, params)]
+
+    def get_files(self, name: str) -> Dict[str, Dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT filename, size, hash FROM backup_files WHERE backup = ? ORDER BY filename",
+                                (name,))
+            return {row["filename"]: {"size": row["size"], "hash": row["hash"]} for row in rows}
+
+    def find_file(self, filename: Optional[str] = None, file_hash: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Sucht Backups, die eine Datei (per Name, Muster mit % oder Prüfsumme) enthalten.
+
+        Returns:
+            List[Dict[str, Any]]: Treffer mit backup, timestamp, filename, size und hash, neueste zuerst.
+        """
+        conditions, params = [], []
+        if filename:
+            conditions.append("f.filename LIKE ?" if "%" in filename else "f.filename = ?")
+            params.append(filename)
+        if file_hash:
+            conditions.append("f.hash = ?")
+            params.append(file_hash)
+        if not conditions:
+            return []
+        query = ("SELECT f.backup, b.timestamp, f.filename, f.size, f.hash FROM backup_files f "
+                 "JOIN backups b ON b.name = f.backup WHERE " + " AND ".join(conditions) +
+                 " ORDER BY b.timestamp DESC")
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute(query, params)]
+
+    def sync_directory(self, backup_dir: str) -> int:
+        """
+        Gleicht den Katalog mit dem Backup-Ordner ab: Einträge verschwundener
+        Backups werden entfernt, unbekannte Archive bzw. Snapshots einmalig
+        eingelesen.
+
+        Returns:
+            int: Anzahl geänderter Einträge.
+        """
+        present = {name: "zip" for name in os.listdir(backup_dir)
+                   if name.endswith(".zip") and parse_backup_timestamp(name)}
+        store_dir = os.path.join(backup_dir, "store")
+        store = SnapshotStore(store_dir, self.logger) if os.path.isdir(store_dir) else None
+        if store is not None:
+            present.update({name: "store" for name in store.list_snapshots()})
+
+        with self._connect() as conn:
+            known = {row["name"] for row in conn.execute("SELECT name FROM backups")}
+        missing = sorted(known - set(present))
+        if missing:
+            self.remove_backups(missing)
+
+        added = 0
+        for name in sorted(set(present) - known):
+            try:
+                if present[name] == "zip":
+                    path = os.path.join(backup_dir, name)
+                    with zipfile.ZipFile(path) as zipf:
+                        files = zip_file_entries(zipf)
+                    self.add_backup(name, "zip", os.path.getsize(path), files)
+                else:
+                    snapshot = store.load_snapshot(name)
+                    if snapshot is None:
+                        continue
+                    files = {filename: {"size": meta.get("size"), "hash": f"sha256:{meta['hash']}"}
+                             for filename, meta in snapshot.get("files", {}).items()}
+                    self.add_backup(name, "store", sum(meta["size"] or 0 for meta in files.values()), files)
+                added += 1
+            except (zipfile.BadZipFile, OSError, KeyError) as e:
+                if self.logger:
+                    self.logger.log_warning(f"BackupCatalog: {name} konnte nicht eingelesen werden: {e}")
+        if self.logger and (added or missing):
+            self.logger.log_info(f"BackupCatalog: {added} Backups ergänzt, {len(missing)} entfernt.")
+        return added + len(missing)
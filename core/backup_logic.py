@@ -1,66 +1,405 @@
 # core/backup_logic.py
 
 import os
-import io
+import json
+import shutil
+import tempfile
+import time
 import zipfile
-from typing import List
+from typing import Any, Dict, List, Optional, Set, Tuple
+from core.backup_catalog import BackupCatalog
+from core.compression import CompressionPolicy
 from core.ftp_worker import FTPWorker
+from core.integrity import HASH_ALGORITHMS, HashingWriter, StreamHasher, write_archive_manifest
+from core.parallel_download import ParallelDownloader
+from core.snapshot_store import SnapshotStore
 from core.logger import Logger
+from core.metrics import get_registry
+from core.retention import RetentionPolicy
 from core.utils import ensure_dir_exists, format_timestamp
 
+BACKUP_SECONDS = get_registry().histogram(
+    "backup_duration_seconds", "Dauer eines Backups in Sekunden", ["server", "backend"],
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600))
+BACKUP_RUNS = get_registry().counter(
+    "backup_runs_total", "Anzahl Backups nach Ergebnis", ["server", "backend", "outcome"])
+BACKUP_BYTES = get_registry().counter(
+    "backup_written_bytes_total", "Größe der erstellten Backups in Bytes", ["server", "backend"])
+BACKUP_LAST_SUCCESS = get_registry().gauge(
+    "backup_last_success_timestamp_seconds", "Zeitpunkt des letzten erfolgreichen Backups (Unix-Zeit)", ["server"])
+
+# Ab dieser Größe (Bytes) wird eine Datei beim sequenziellen Backup auf die Platte gespoolt
+SPOOL_THRESHOLD = 1024 * 1024
+
 class BackupLogic:
     """
     Backup-Logik zum Herunterladen aller Dateien aus dem FTP-Verzeichnis,
     Erstellen eines ZIP-Archivs und Speichern im Backup-Ordner.
+
+    Alternativ zum ZIP-Archiv pro Lauf (backend="zip") kann ein deduplizierter,
+    inhaltsadressierter Speicher genutzt werden (backend="store"), in dem jedes
+    Backup nur ein Snapshot-Manifest ist.
     """
 
-    def __init__(self, ftp_worker: FTPWorker, backup_dir: str, logger: Logger):
+    MANIFEST_FILENAME = "backup_manifest.json"
+
+    def __init__(self, ftp_worker: FTPWorker, backup_dir: str, logger: Logger, parallel_connections: int = 1,
+                 incremental: bool = False, backend: str = "zip", compression: str = "deflate",
+                 compression_level: Optional[int] = None, retention: Optional[RetentionPolicy] = None,
+                 hash_algorithm: str = "sha256", skip_unchanged: bool = False):
         """
         Args:
             ftp_worker (FTPWorker): FTP-Worker für Dateioperationen.
             backup_dir (str): Lokaler Pfad zum Backup-Ordner.
             logger (Logger): Logger für Protokollierung.
+            parallel_connections (int): Anzahl paralleler FTP-Verbindungen für Downloads.
+                Bei 1 wird sequenziell über die Sitzung des FTP-Workers geladen.
+            incremental (bool): Nur geänderte Dateien laden; unveränderte Dateien
+                (gleiche Größe und Änderungszeit laut Manifest) werden aus dem
+                vorherigen Archiv übernommen.
+            backend (str): "zip" für ein ZIP-Archiv pro Backup, "store" für den
+                deduplizierten Snapshot-Speicher unter `<backup_dir>/store`.
+            compression (str): Kompression der ZIP-Einträge: "store", "deflate", "bzip2",
+                "lzma", "zstd" oder "auto" (unkomprimierbare Dateien werden nur abgelegt).
+            compression_level (int, optional): Kompressionsstufe, z.B. 1-9 für deflate.
+            retention (RetentionPolicy, optional): Aufbewahrungsregeln; nach jedem
+                erfolgreichen Backup werden ältere Backups entsprechend gelöscht.
+            hash_algorithm (str): Hash der Einträge im Manifest des ZIP-Archivs
+                ("sha256" oder "blake2b"); der Snapshot-Speicher nutzt immer SHA-256.
+            skip_unchanged (bool): Kein neues Backup anlegen, wenn die Verzeichnisliste
+                (Namen, Größen, Änderungszeiten) dem letzten Backup entspricht.
         """
         self.ftp_worker = ftp_worker
         self.backup_dir = backup_dir
         self.logger = logger
+        self.parallel_connections = max(1, int(parallel_connections))
+        self.incremental = incremental
+        self.manifest_path = os.path.join(self.backup_dir, self.MANIFEST_FILENAME)
+        if backend not in ("zip", "store"):
+            raise ValueError(f"Unbekanntes Backup-Backend: {backend}")
+        self.backend = backend
+        self.compression = CompressionPolicy(compression, compression_level, logger=logger)
+        self.retention = retention
+        if hash_algorithm not in HASH_ALGORITHMS:
+            raise ValueError(f"Unbekannter Hash-Algorithmus: {hash_algorithm}")
+        self.hash_algorithm = hash_algorithm
+        self.skip_unchanged = skip_unchanged
 
         ensure_dir_exists(self.backup_dir)
+        self.store = SnapshotStore(os.path.join(self.backup_dir, "store"), logger) if backend == "store" else None
+        self.catalog = BackupCatalog.for_backup_dir(self.backup_dir, logger)
 
     def create_backup(self) -> bool:
         """
         Lädt alle Dateien vom FTP-Server herunter, erstellt ein ZIP-Archiv
-        und speichert dieses im Backup-Ordner.
+        und speichert dieses im Backup-Ordner. Im inkrementellen Modus werden
+        nur geänderte Dateien übertragen.
 
         Returns:
             bool: True bei Erfolg, False bei Fehlern.
         """
+        started = time.monotonic()
+        event: Dict[str, Any] = {}
+        success = self._create_backup(event)
+        duration = time.monotonic() - started
+        server = self.ftp_worker.host
+        outcome = "ok" if success else "error"
+        BACKUP_SECONDS.observe(duration, server=server, backend=self.backend)
+        BACKUP_RUNS.inc(server=server, backend=self.backend, outcome=outcome)
+        if success:
+            BACKUP_BYTES.inc(event.get("bytes", 0), server=server, backend=self.backend)
+            BACKUP_LAST_SUCCESS.set(time.time(), server=server)
+        self.logger.log_event("backup", outcome=outcome, server=server, duration_ms=round(duration * 1000, 1),
+                              backend=self.backend, **event)
+        if success and self.retention is not None:
+            self.apply_retention()
+        return success
+
+    def apply_retention(self) -> List[str]:
+        """
+        Löscht Backups, die nach den Aufbewahrungsregeln nicht mehr benötigt
+        werden. Die Basis des inkrementellen Backups bleibt immer erhalten.
+
+        Returns:
+            List[str]: Namen der gelöschten Backups.
+        """
+        if self.retention is None:
+            return []
         try:
-            self.logger.log_info("BackupLogic: Lade Dateiliste vom FTP-Server...")
-            files = self.ftp_worker.list_files()
-            if not files:
-                self.logger.log_error("BackupLogic: Keine Dateien im FTP-Verzeichnis gefunden.")
-                return False
+            if self.store is not None:
+                deleted = self.retention.prune_store(self.store, self.logger)
+            else:
+                manifest = self._load_manifest()
+                protected = {manifest["archive"]} if manifest and manifest.get("archive") else set()
+                deleted = self.retention.prune_directory(self.backup_dir, self.logger, protected)
+            if deleted:
+                self.catalog.remove_backups(deleted)
+            return deleted
+        except Exception as e:
+            self.logger.log_error(f"BackupLogic: Fehler beim Aufräumen alter Backups: {e}")
+            return []
+
+    def _create_backup(self, event: Dict[str, Any]) -> bool:
+        """
+        Führt das Backup aus und trägt Datei, Größe und Anzahl der Dateien in
+        `event` ein.
+        """
+        try:
+            with self.ftp_worker.session():
+                self.logger.log_info("BackupLogic: Lade Dateiliste vom FTP-Server...")
+                # Immer frisch vom Server: eine gecachte Liste könnte Änderungen anderer
+                # Clients verbergen, und inkrementelle Backups würden sie auslassen
+                with_metadata = self.incremental or self.store is not None or self.skip_unchanged
+                entries = self.ftp_worker.list_entries(fresh=True) if with_metadata else None
+                files = list(entries) if entries is not None else self.ftp_worker.list_files(fresh=True)
+                if not files:
+                    self.logger.log_error("BackupLogic: Keine Dateien im FTP-Verzeichnis gefunden.")
+                    return False
+
+                if self.skip_unchanged and self._is_unchanged(entries):
+                    self.logger.log_info("BackupLogic: Keine Änderungen seit dem letzten Backup, übersprungen.")
+                    event.update(skipped=True, files=len(files), bytes=0)
+                    return True
+
+                if self.store is not None:
+                    return self._create_snapshot(files, entries or {}, event)
 
-            zip_buffer = io.BytesIO()
-            with zipfile.ZipFile(zip_buffer, 'w', compression=zipfile.ZIP_DEFLATED) as zipf:
-                for filename in files:
+                previous_archive, unchanged = self._find_unchanged(entries if self.incremental else None)
+                if previous_archive:
+                    self.logger.log_info(
+                        f"BackupLogic: {len(unchanged)} unveränderte Dateien werden aus "
+                        f"{os.path.basename(previous_archive)} übernommen.")
+
+                timestamp = format_timestamp()
+                backup_filename = os.path.join(self.backup_dir, f"backup_{timestamp}.zip")
+                temp_filename = backup_filename + ".part"
+
+                # Auf die Platte streamen: jede Datei wird erst vollständig geladen
+                # (gespoolt) und dann als Eintrag geschrieben, das fertige Archiv
+                # wird erst am Ende umbenannt.
+                # Die Hashes entstehen dabei und kommen als Manifest ins Archiv.
+                hashes: Dict[str, Dict[str, Any]] = {}
+                try:
+                    method, level = self.compression.zip_arguments()
+                    with zipfile.ZipFile(temp_filename, 'w', compression=method, compresslevel=level) as zipf:
+                        written = self._write_entries(zipf, files, unchanged, previous_archive, hashes)
+                        write_archive_manifest(zipf, hashes, self.hash_algorithm)
+                    os.replace(temp_filename, backup_filename)
+                finally:
+                    if os.path.exists(temp_filename):
+                        os.remove(temp_filename)
+
+                if entries is not None:
+                    self._save_manifest(os.path.basename(backup_filename),
+                                        {name: entries[name] for name in written})
+
+                event.update(file=os.path.basename(backup_filename), bytes=os.path.getsize(backup_filename),
+                             files=len(written))
+                self._add_to_catalog(event["file"], "zip", event["bytes"], hashes)
+                self.logger.log_info(f"BackupLogic: Backup erfolgreich erstellt: {backup_filename}")
+                return True
+
+        except Exception as e:
+            self.logger.log_error(f"BackupLogic: Ausnahmefehler: {e}")
+            event["error"] = str(e)
+            return False
+
+    def _write_entries(self, zipf: zipfile.ZipFile, files: List[str], unchanged: Set[str],
+                       previous_archive: Optional[str], hashes: Dict[str, Dict[str, Any]]) -> List[str]:
+        """
+        Schreibt alle Dateien in Reihenfolge der Dateiliste ins Archiv. Unveränderte
+        Dateien werden aus dem vorherigen Archiv kopiert, alle anderen geladen.
+        Größe und Hash jedes geschriebenen Eintrags landen in `hashes`.
+
+        Returns:
+            List[str]: Namen der erfolgreich geschriebenen Einträge.
+        """
+        written = []
+        to_download = [name for name in files if name not in unchanged]
+        downloads = None
+        if self.parallel_connections > 1 and to_download:
+            self.logger.log_info(
+                f"BackupLogic: Lade {len(to_download)} Dateien über {self.parallel_connections} Verbindungen herunter...")
+            downloader = ParallelDownloader(self.ftp_worker, self.parallel_connections,
+                                            spool_dir=self.backup_dir, logger=self.logger)
+            downloads = downloader.iter_downloads(to_download)
+
+        previous = zipfile.ZipFile(previous_archive) if previous_archive else None
+        try:
+            for filename in files:
+                hasher = StreamHasher(self.hash_algorithm)
+                if filename in unchanged:
+                    with previous.open(filename) as source, self.compression.open_entry(zipf, filename) as entry:
+                        shutil.copyfileobj(source, HashingWriter(entry, hasher))
+                elif downloads is not None:
+                    _, spool = next(downloads)
+                    if spool is None:
+                        self.logger.log_error(f"BackupLogic: Fehler beim Herunterladen von {filename}")
+                        continue
+                    with spool, self.compression.open_entry(zipf, filename) as entry:
+                        shutil.copyfileobj(spool, HashingWriter(entry, hasher))
+                else:
                     self.logger.log_info(f"BackupLogic: Lade Datei {filename} herunter...")
-                    content = self.ftp_worker.download_file(filename)
-                    if content is None:
+                    if not self._stream_into_zip(zipf, filename, hasher):
                         self.logger.log_error(f"BackupLogic: Fehler beim Herunterladen von {filename}")
                         continue
-                    zipf.writestr(filename, content)
+                written.append(filename)
+                hashes[filename] = {"size": hasher.size, "hash": hasher.digest_string()}
+        finally:
+            if downloads is not None:
+                downloads.close()
+            if previous is not None:
+                previous.close()
+        return written
+
+    def _create_snapshot(self, files: List[str], entries: Dict[str, Dict[str, Any]],
+                         event: Dict[str, Any]) -> bool:
+        """
+        Legt einen Snapshot im deduplizierten Speicher an. Es werden nur Blobs
+        geschrieben, deren Inhalt noch nicht im Speicher liegt. Im inkrementellen
+        Modus werden unveränderte Dateien gar nicht erst geladen, sondern der
+        Hash aus dem letzten Snapshot übernommen.
+
+        Returns:
+            bool: True bei Erfolg, False bei Fehlern.
+        """
+        previous = self.store.latest_snapshot() if self.incremental else None
+        previous_files = previous.get("files", {}) if previous else {}
+
+        snapshot_files = {}
+        to_download = []
+        for filename in files:
+            meta = entries.get(filename, {})
+            known = previous_files.get(filename)
+            if (known and meta.get("size") is not None and meta.get("modify")
+                    and known.get("size") == meta["size"] and known.get("modify") == meta["modify"]
+                    and self.store.has_blob(known["hash"])):
+                snapshot_files[filename] = known
+            else:
+                to_download.append(filename)
 
-            timestamp = format_timestamp()
-            backup_filename = os.path.join(self.backup_dir, f"backup_{timestamp}.zip")
+        if snapshot_files:
+            self.logger.log_info(f"BackupLogic: {len(snapshot_files)} unveränderte Dateien aus letztem Snapshot übernommen.")
 
-            with open(backup_filename, "wb") as f:
-                f.write(zip_buffer.getvalue())
+        if self.parallel_connections > 1 and to_download:
+            downloader = ParallelDownloader(self.ftp_worker, self.parallel_connections,
+                                            spool_dir=self.store.tmp_dir, logger=self.logger)
+            for filename, spool in downloader.iter_downloads(to_download):
+                if spool is None:
+                    self.logger.log_error(f"BackupLogic: Fehler beim Herunterladen von {filename}")
+                    continue
+                with spool, self.store.new_blob() as blob:
+                    shutil.copyfileobj(spool, blob)
+                snapshot_files[filename] = dict(entries.get(filename, {}), hash=blob.digest, size=blob.size)
+        else:
+            for filename in to_download:
+                self.logger.log_info(f"BackupLogic: Lade Datei {filename} herunter...")
+                with self.store.new_blob() as blob:
+                    if self.ftp_worker.download_stream(filename, blob.write) is None:
+                        blob.discard()
+                if blob.digest is None:
+                    self.logger.log_error(f"BackupLogic: Fehler beim Herunterladen von {filename}")
+                    continue
+                snapshot_files[filename] = dict(entries.get(filename, {}), hash=blob.digest, size=blob.size)
 
-            self.logger.log_info(f"BackupLogic: Backup erfolgreich erstellt: {backup_filename}")
-            return True
+        # Reihenfolge der Dateiliste beibehalten
+        ordered = {name: snapshot_files[name] for name in files if name in snapshot_files}
+        snapshot_name = f"backup_{format_timestamp()}"
+        self.store.write_snapshot(snapshot_name, ordered)
+        event.update(file=snapshot_name, bytes=sum(meta["size"] for meta in ordered.values()),
+                     files=len(ordered))
+        self._add_to_catalog(snapshot_name, "store", event["bytes"],
+                             {name: {"size": meta["size"], "hash": f"sha256:{meta['hash']}"}
+                              for name, meta in ordered.items()})
+        self.logger.log_info(f"BackupLogic: Snapshot {snapshot_name} erstellt ({len(ordered)} Dateien).")
+        return True
 
+    def _add_to_catalog(self, name: str, backend: str, size: int, files: Dict[str, Dict[str, Any]]):
+        # Ein Fehler im Katalog darf das fertige Backup nicht ungültig machen
+        try:
+            self.catalog.add_backup(name, backend, size, files, server=self.ftp_worker.host)
         except Exception as e:
-            self.logger.log_error(f"BackupLogic: Ausnahmefehler: {e}")
+            self.logger.log_warning(f"BackupLogic: Backup {name} konnte nicht in den Katalog eingetragen werden: {e}")
+
+    def _find_unchanged(self, entries: Optional[Dict[str, Dict[str, Any]]]) -> Tuple[Optional[str], Set[str]]:
+        """
+        Vergleicht die aktuelle Dateiliste mit dem Manifest des letzten Backups.
+
+        Returns:
+            Tuple[Optional[str], Set[str]]: Pfad des vorherigen Archivs (oder None)
+                und die Namen der unveränderten Dateien.
+        """
+        if not entries:
+            return None, set()
+        manifest = self._load_manifest()
+        if not manifest:
+            return None, set()
+        previous_archive = os.path.join(self.backup_dir, manifest.get("archive", ""))
+        if not os.path.isfile(previous_archive):
+            return None, set()
+
+        previous_files = manifest.get("files", {})
+        unchanged = {
+            name for name, meta in entries.items()
+            if meta.get("size") is not None and meta.get("modify") and previous_files.get(name) == meta
+        }
+        if not unchanged:
+            return None, set()
+        return previous_archive, unchanged
+
+    def _is_unchanged(self, entries: Optional[Dict[str, Dict[str, Any]]]) -> bool:
+        """
+        Prüft, ob die Verzeichnisliste genau der des letzten Backups entspricht
+        (gleiche Dateien mit gleicher Größe und Änderungszeit).
+        """
+        if not entries or any(meta.get("size") is None or not meta.get("modify") for meta in entries.values()):
+            return False
+        if self.store is not None:
+            previous = self.store.latest_snapshot()
+            previous_files = previous.get("files", {}) if previous else {}
+            return set(previous_files) == set(entries) and all(
+                previous_files[name].get("size") == meta["size"]
+                and previous_files[name].get("modify") == meta["modify"] for name, meta in entries.items())
+        manifest = self._load_manifest()
+        if not manifest or not os.path.isfile(os.path.join(self.backup_dir, manifest.get("archive", ""))):
             return False
+        return manifest.get("files") == entries
+
+    def _load_manifest(self) -> Optional[Dict[str, Any]]:
+        if not os.path.isfile(self.manifest_path):
+            return None
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            self.logger.log_warning(f"BackupLogic: Manifest nicht lesbar, vollständiges Backup: {e}")
+            return None
+
+    def _save_manifest(self, archive_name: str, files: Dict[str, Dict[str, Any]]):
+        temp_path = self.manifest_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"archive": archive_name, "files": files}, f, indent=4)
+        os.replace(temp_path, self.manifest_path)
+
+    def _stream_into_zip(self, zipf: zipfile.ZipFile, filename: str, hasher: Optional[StreamHasher] = None) -> bool:
+        """
+        Lädt eine Datei vom FTP-Server in eine SpooledTemporaryFile (kleine
+        Dateien im Speicher, große unter backup_dir) und schreibt sie erst nach
+        vollständigem Download als Eintrag in das ZIP-Archiv. Ein fehlgeschlagener
+        Download hinterlässt so keinen halben Eintrag.
+
+        Args:
+            zipf (zipfile.ZipFile): Zum Schreiben geöffnetes Archiv.
+            filename (str): Name der Datei im FTP-Verzeichnis.
+            hasher (StreamHasher, optional): Wird mit jedem empfangenen Block fortgeschrieben.
+
+        Returns:
+            bool: True bei Erfolg, False bei Fehlern.
+        """
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_THRESHOLD, dir=self.backup_dir) as spool:
+            if self.ftp_worker.download_stream(filename, spool.write, hasher=hasher) is None:
+                return False
+            spool.seek(0)
+            with self.compression.open_entry(zipf, filename) as entry:
+                shutil.copyfileobj(spool, entry)
+        return True
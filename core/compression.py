@@ -0,0 +1,169 @@
+"""
+core/compression.py
+
+Wählbare Kompression für ZIP-Backups.
+
+Enshrouded-Spielstände sind meist bereits komprimiert; sie erneut mit
+Deflate zu packen kostet viel CPU-Zeit bei kaum Platzgewinn. Unterstützt
+werden "store", "deflate" (Stufe 0-9), "bzip2" (Stufe 1-9), "lzma", "zstd"
+(sofern das zipfile-Modul es unterstützt, ab Python 3.14) und "auto": pro
+Datei wird eine Stichprobe schnell komprimiert und die Datei nur dann mit
+Deflate gepackt, wenn sich das lohnt, sonst unkomprimiert abgelegt.
+"""
+
+import time
+import zipfile
+import zlib
+from typing import Optional, Tuple
+
+from core.logger import Logger
+
+ZIP_ZSTANDARD = getattr(zipfile, "ZIP_ZSTANDARD", None)
+ZSTD_AVAILABLE = ZIP_ZSTANDARD is not None
+
+METHODS = {
+    "store": zipfile.ZIP_STORED,
+    "deflate": zipfile.ZIP_DEFLATED,
+    "bzip2": zipfile.ZIP_BZIP2,
+    "lzma": zipfile.ZIP_LZMA,
+}
+if ZSTD_AVAILABLE:
+    METHODS["zstd"] = ZIP_ZSTANDARD
+
+# Gültige Stufen je Methode; lzma hat in zipfile keine einstellbare Stufe
+LEVEL_RANGES = {
+    "deflate": (0, 9),
+    "bzip2": (1, 9),
+    "zstd": (-7, 22),
+    "auto": (0, 9),
+}
+
+
+class CompressionPolicy:
+    """
+    Legt Methode und Stufe für ZIP-Einträge fest.
+    """
+
+    def __init__(self, method: str = "deflate", level: Optional[int] = None, sample_size: int = 64 * 1024,
+                 min_saving: float = 0.05, logger: Optional[Logger] = None):
+        """
+        Args:
+            method (str): "store", "deflate", "bzip2", "lzma", "zstd" oder "auto".
+            level (int, optional): Kompressionsstufe (Standard der jeweiligen Methode bei None).
+            sample_size (int): Größe der Stichprobe im Modus "auto" (Bytes).
+            min_saving (float): Mindestersparnis der Stichprobe (Anteil), ab der
+                im Modus "auto" komprimiert wird.
+            logger (Logger, optional): Logger für Protokollierung.
+        """
+        if method == "zstd" and not ZSTD_AVAILABLE:
+            if logger:
+                logger.log_warning("Compression: zstd wird von dieser Python-Version nicht unterstützt, "
+                                   "verwende deflate.")
+            method, level = "deflate", None
+        if method not in METHODS and method != "auto":
+            raise ValueError(f"Unbekannte Kompressionsmethode: {method}")
+        if level is not None:
+            if method not in LEVEL_RANGES:
+                if logger:
+                    logger.log_warning(f"Compression: Methode {method} hat keine einstellbare Stufe, "
+                                       f"Stufe {level} wird ignoriert.")
+                level = None
+            else:
+                low, high = LEVEL_RANGES[method]
+                if not low <= level <= high:
+                    raise ValueError(f"Kompressionsstufe {level} für {method} außerhalb von {low}-{high}")
+        self.method = method
+        self.level = level
+        self.sample_size = sample_size
+        self.min_saving = min_saving
+
+    @classmethod
+    def from_settings(cls, method: Optional[str], level: Optional[int] = None,
+                      logger: Optional[Logger] = None) -> "CompressionPolicy":
+        return cls(method or "deflate", level, logger=logger)
+
+    @property
+    def is_auto(self) -> bool:
+        return self.method == "auto"
+
+    def zip_arguments(self) -> Tuple[int, Optional[int]]:
+        """
+        Methode und Stufe als Argumente für zipfile.ZipFile (compression, compresslevel).
+        Im Modus "auto" ist das Deflate; die Entscheidung fällt pro Eintrag.
+        """
+        if self.is_auto:
+            return zipfile.ZIP_DEFLATED, self.level
+        return METHODS[self.method], self.level
+
+    def choose(self, sample: bytes) -> Tuple[int, Optional[int]]:
+        """
+        Liefert Methode und Stufe für einen Eintrag anhand seiner ersten Bytes.
+        """
+        if not self.is_auto:
+            return self.zip_arguments()
+        if not sample:
+            return zipfile.ZIP_STORED, None
+        compressed = len(zlib.compress(sample, 1))
+        if compressed > len(sample) * (1.0 - self.min_saving):
+            return zipfile.ZIP_STORED, None
+        return zipfile.ZIP_DEFLATED, self.level
+
+    def open_entry(self, zipf: zipfile.ZipFile, name: str) -> "EntryWriter":
+        """
+        Öffnet einen Eintrag zum blockweisen Schreiben. Als Kontextmanager verwenden.
+        """
+        return EntryWriter(zipf, name, self)
+
+
+class EntryWriter:
+    """
+    Schreibt einen ZIP-Eintrag blockweise. Im Modus "auto" werden die ersten
+    Bytes gepuffert, bis die Stichprobe vollständig ist; erst dann wird die
+    Methode gewählt und der Eintrag geöffnet.
+    """
+
+    def __init__(self, zipf: zipfile.ZipFile, name: str, policy: CompressionPolicy):
+        self.zipf = zipf
+        self.name = name
+        self.policy = policy
+        self.compress_type: Optional[int] = None
+        self._entry = None
+        self._sample = bytearray()
+        if not policy.is_auto:
+            self._open(b"")
+
+    def _open(self, sample: bytes):
+        compress_type, level = self.policy.choose(sample)
+        info = zipfile.ZipInfo(self.name, date_time=time.localtime(time.time())[:6])
+        info.compress_type = compress_type
+        info.external_attr = 0o600 << 16
+        # Ab Python 3.13 heißt das Attribut compress_level
+        if hasattr(info, "compress_level"):
+            info.compress_level = level
+        else:
+            info._compresslevel = level
+        self.compress_type = compress_type
+        self._entry = self.zipf.open(info, "w", force_zip64=True)
+        if sample:
+            self._entry.write(sample)
+
+    def write(self, block: bytes):
+        if self._entry is not None:
+            self._entry.write(block)
+            return
+        self._sample += block
+        if len(self._sample) >= self.policy.sample_size:
+            sample, self._sample = bytes(self._sample), bytearray()
+            self._open(sample)
+
+    def close(self):
+        if self._entry is None:
+            sample, self._sample = bytes(self._sample), bytearray()
+            self._open(sample)
+        self._entry.close()
+
+    def __enter__(self) -> "EntryWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -9,7 +9,7 @@ Konfigurationsmanagement:
 
 import json
 import os
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 class ConfigHandler:
     def __init__(self, filepath: str):
@@ -55,6 +55,10 @@ class ConfigHandler:
             "backup": {
                 "enabled": True,
                 "backup_dir": "",
+            },
+            "servers": [],
+            "fleet": {
+                "max_concurrency": 4,
             }
         }
 
@@ -79,6 +83,60 @@ class ConfigHandler:
         except IOError:
             return False
 
+    def get_servers(self) -> List[Dict[str, Any]]:
+        """
+        Liefert alle konfigurierten FTP-Ziele in einheitlicher Form.
+
+        Mehrere Server werden als Liste unter "servers" eingetragen:
+            {"servers": [{"name": "srv1", "host": "...", "port": 21, "username": "...",
+                          "password": "...", "ftp_dir": "/", "backup_dir": "..."}, ...]}
+        Ohne "servers" wird das einzelne Ziel aus den flachen Schlüsseln der GUI
+        (ftp_host, ftp_user, ...) bzw. dem "ftp"-Abschnitt gebildet.
+
+        Returns:
+            List[Dict[str, Any]]: Server mit name, host, port, username, password, ftp_dir, backup_dir
+                und ftp_backend ("ftplib" oder "asyncio", global über "ftp_backend" wählbar)
+                sowie optional bandwidth_kib_s (eigene Bandbreitengrenze des Servers) und
+                verify_uploads (Uploads nach der Übertragung prüfen, global über "verify_uploads"),
+                transfer_blocksize_kib (feste statt gemessener Blockgröße) und socket_buffer_kib
+                (Socket-Puffer der Datenverbindung, sonst Systemstandard).
+        """
+        servers = self.config.get("servers")
+        if not servers:
+            ftp = self.config.get("ftp", {})
+            host = self.config.get("ftp_host") or ftp.get("host", "")
+            if not host:
+                return []
+            servers = [{
+                "name": host,
+                "host": host,
+                "port": self.config.get("ftp_port") or ftp.get("port", 21),
+                "username": self.config.get("ftp_user") or self.config.get("ftp_username") or ftp.get("username", ""),
+                "password": self.config.get("ftp_pass") or self.config.get("ftp_password") or ftp.get("password", ""),
+                "ftp_dir": self.config.get("ftp_dir") or ftp.get("remote_path") or "/",
+                "backup_dir": self.config.get("backup_folder", ""),
+            }]
+
+        result = []
+        for server in servers:
+            host = server.get("host", "")
+            result.append({
+                "name": server.get("name") or host,
+                "host": host,
+                "port": int(server.get("port") or 21),
+                "username": server.get("username") or server.get("user", ""),
+                "password": server.get("password", ""),
+                "ftp_dir": server.get("ftp_dir") or server.get("remote_path") or "/",
+                "backup_dir": server.get("backup_dir", ""),
+                "ftp_backend": server.get("ftp_backend") or self.config.get("ftp_backend") or "ftplib",
+                "bandwidth_kib_s": server.get("bandwidth_kib_s"),
+                "verify_uploads": server.get("verify_uploads", self.config.get("verify_uploads", True)),
+                "transfer_blocksize_kib": server.get("transfer_blocksize_kib",
+                                                     self.config.get("transfer_blocksize_kib")),
+                "socket_buffer_kib": server.get("socket_buffer_kib", self.config.get("socket_buffer_kib")),
+            })
+        return result
+
     def get(self, key: str, default=None):
         return self.config.get(key, default)
 
@@ -0,0 +1,148 @@
+"""
+core/fleet.py
+
+Batch-Betrieb über mehrere Spielserver.
+
+Führt die Index-Aktualisierung (UpdaterLogic) und optional Backups
+(BackupLogic) für alle konfigurierten Server gleichzeitig aus. Die Anzahl
+gleichzeitig bearbeiteter Server ist begrenzt, die Ergebnisse werden pro
+Server zurückgemeldet. Server mit dem asyncio-Backend werden bei reinen
+Index-Updates ohne eigenen Thread auf der gemeinsamen Event-Loop bearbeitet;
+die Grenze gilt für beide Wege gemeinsam.
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set
+
+from core.backup_logic import BackupLogic
+from core.ftp_pool import FTPConnectionPool, get_default_pool
+from core.ftp_worker import create_worker
+from core.logger import Logger
+from core.updater_logic import UpdaterLogic
+
+
+class FleetRunner:
+    """
+    Führt Updates und Backups für eine Liste von Servern parallel aus.
+    """
+
+    def __init__(self, servers: List[Dict[str, Any]], logger: Logger, max_concurrency: int = 4,
+                 backup_root: Optional[str] = None, pool: Optional[FTPConnectionPool] = None,
+                 tmp_dir: Optional[str] = None, backup_options: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            servers (List[Dict[str, Any]]): Server-Einträge (siehe ConfigHandler.get_servers).
+            logger (Logger): Logger für Protokollierung.
+            max_concurrency (int): Maximale Anzahl gleichzeitig bearbeiteter Server (in
+                Threads und auf der Event-Loop zusammen).
+            backup_root (str, optional): Basisordner für Backups; pro Server wird ein
+                Unterordner mit dem Servernamen verwendet, sofern der Server keinen
+                eigenen "backup_dir" hat.
+            pool (FTPConnectionPool, optional): Verbindungspool (Standard: prozessweiter Pool).
+            tmp_dir (str, optional): Ablage für angefangene Downloads.
+            backup_options (Dict[str, Any], optional): Zusätzliche Argumente für BackupLogic,
+                z.B. {"incremental": True, "parallel_connections": 2}.
+        """
+        self.servers = servers
+        self.logger = logger
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.backup_root = backup_root
+        self.pool = pool or get_default_pool()
+        self.tmp_dir = tmp_dir
+        self.backup_options = backup_options or {}
+
+    def backup_dir_for(self, server: Dict[str, Any]) -> Optional[str]:
+        if server.get("backup_dir"):
+            return server["backup_dir"]
+        if self.backup_root:
+            safe_name = "".join(c if c.isalnum() or c in "-_." else "_" for c in server["name"])
+            return os.path.join(self.backup_root, safe_name)
+        return None
+
+    def _run_server(self, server: Dict[str, Any], update: bool, backup: bool) -> Dict[str, Any]:
+        result = {"server": server["name"], "update": None, "backup": None, "duration": 0.0, "error": None}
+        start = time.monotonic()
+        worker = create_worker(server, self.logger, pool=self.pool, tmp_dir=self.tmp_dir)
+        try:
+            with worker.session():
+                if update:
+                    result["update"] = UpdaterLogic(worker, self.logger).process_index_file()
+                if backup:
+                    backup_dir = self.backup_dir_for(server)
+                    if backup_dir is None:
+                        result["error"] = "Kein Backup-Ordner konfiguriert"
+                        result["backup"] = False
+                    else:
+                        result["backup"] = BackupLogic(worker, backup_dir, self.logger,
+                                                       **self.backup_options).create_backup()
+        except Exception as e:
+            result["error"] = str(e)
+            self.logger.log_error(f"FleetRunner: Fehler bei Server {server['name']}: {e}")
+        result["duration"] = round(time.monotonic() - start, 3)
+        return result
+
+    async def _update_server_async(self, server: Dict[str, Any]) -> Dict[str, Any]:
+        result = {"server": server["name"], "update": None, "backup": None, "duration": 0.0, "error": None}
+        start = time.monotonic()
+        worker = create_worker(server, self.logger, tmp_dir=self.tmp_dir)
+        try:
+            result["update"] = await UpdaterLogic(worker, self.logger).process_index_file_async()
+        except Exception as e:
+            result["error"] = str(e)
+            self.logger.log_error(f"FleetRunner: Fehler bei Server {server['name']}: {e}")
+        result["duration"] = round(time.monotonic() - start, 3)
+        return result
+
+    async def _run_mixed(self, update: bool, backup: bool, native: Set[int]) -> List[Dict[str, Any]]:
+        # Ein Semaphor für beide Wege: Server aus `native` laufen als Coroutine,
+        # die übrigen in Threads, zusammen höchstens max_concurrency
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        loop = asyncio.get_running_loop()
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="fleet") as executor:
+            async def _run_one(index: int, server: Dict[str, Any]) -> Dict[str, Any]:
+                async with semaphore:
+                    if index in native:
+                        return await self._update_server_async(server)
+                    return await loop.run_in_executor(executor, self._run_server, server, update, backup)
+
+            return list(await asyncio.gather(*(_run_one(i, server) for i, server in enumerate(self.servers))))
+
+    def run(self, update: bool = True, backup: bool = False) -> List[Dict[str, Any]]:
+        """
+        Bearbeitet alle Server mit höchstens `max_concurrency` gleichzeitig.
+
+        Args:
+            update (bool): Index-Datei aktualisieren.
+            backup (bool): Backup erstellen.
+
+        Returns:
+            List[Dict[str, Any]]: Ein Ergebnis pro Server (Reihenfolge wie `servers`) mit
+                den Schlüsseln server, update, backup, duration und error.
+        """
+        if not self.servers:
+            self.logger.log_warning("FleetRunner: Keine Server konfiguriert.")
+            return []
+
+        self.logger.log_info(
+            f"FleetRunner: Starte {len(self.servers)} Server mit bis zu {self.max_concurrency} gleichzeitig...")
+        # Reine Updates auf dem asyncio-Backend laufen auf der Event-Loop, alles andere in Threads
+        native = {i for i, s in enumerate(self.servers)
+                  if update and not backup and s.get("ftp_backend") == "asyncio"}
+        if native:
+            from core.async_ftp import run_sync
+            results = run_sync(self._run_mixed(update, backup, native))
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="fleet") as executor:
+                results = list(executor.map(lambda s: self._run_server(s, update, backup), self.servers))
+
+        failed = [r["server"] for r in results
+                  if r["error"] or r["update"] is False or r["backup"] is False]
+        if failed:
+            self.logger.log_error(f"FleetRunner: Fehler bei {len(failed)} Server(n): {', '.join(failed)}")
+        else:
+            self.logger.log_info(f"FleetRunner: Alle {len(results)} Server erfolgreich bearbeitet.")
+        return results
@@ -0,0 +1,181 @@
+"""
+core/ftp_pool.py
+
+Pool für wiederverwendbare FTP-Sitzungen.
+
+Sitzungen werden nach Host, Port, Benutzer und Verzeichnis gruppiert.
+Vor der Ausgabe wird jede Sitzung per NOOP geprüft, abgelaufene oder
+tote Verbindungen werden verworfen und automatisch neu aufgebaut.
+Das spart TCP-Aufbau, Banner, Login und CWD bei jedem Zyklus und schont
+Server, die Logins drosseln.
+"""
+
+import ftplib
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from core.logger import Logger
+from core.transfer_tuning import TunedFTP
+
+PoolKey = Tuple[str, int, str, str]
+
+
+class FTPConnectionPool:
+    """
+    Thread-sicherer Pool für ftplib-Sitzungen mit Health-Check und Idle-Timeout.
+    """
+
+    def __init__(self, idle_timeout: float = 300, max_idle_per_key: int = 4,
+                 timeout: float = 10, logger: Optional[Logger] = None):
+        """
+        Args:
+            idle_timeout (float): Sekunden, nach denen eine unbenutzte Sitzung verworfen wird.
+            max_idle_per_key (int): Maximale Anzahl ruhender Sitzungen pro Ziel.
+            timeout (float): Socket-Timeout für neue Verbindungen in Sekunden.
+            logger (Logger, optional): Logger für Protokollierung.
+        """
+        self.idle_timeout = idle_timeout
+        self.max_idle_per_key = max_idle_per_key
+        self.timeout = timeout
+        self.logger = logger
+        self._idle: Dict[PoolKey, List[Tuple[ftplib.FTP, float]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(host: str, username: str, ftp_dir: str, port: int = 21) -> PoolKey:
+        return (host, int(port), username, ftp_dir or "/")
+
+    def _open(self, key: PoolKey, password: str) -> ftplib.FTP:
+        host, port, username, ftp_dir = key
+        ftp = TunedFTP()
+        ftp.connect(host, port, timeout=self.timeout)
+        ftp.login(username, password)
+        ftp.cwd(ftp_dir)
+        if self.logger:
+            self.logger.log_info(f"FTPPool: Neue Sitzung zu {host}:{port} ({ftp_dir}) aufgebaut")
+        return ftp
+
+    @staticmethod
+    def _close(ftp: ftplib.FTP):
+        try:
+            ftp.quit()
+        except Exception:
+            ftp.close()
+
+    @staticmethod
+    def _is_alive(ftp: ftplib.FTP) -> bool:
+        try:
+            ftp.voidcmd("NOOP")
+            return True
+        except Exception:
+            return False
+
+    def acquire(self, host: str, username: str, password: str, ftp_dir: str = "/", port: int = 21) -> ftplib.FTP:
+        """
+        Liefert eine geprüfte Sitzung für das Ziel. Ruhende Sitzungen werden
+        bevorzugt, sonst wird eine neue Verbindung aufgebaut.
+
+        Raises:
+            ftplib.Error, OSError: Wenn keine neue Verbindung aufgebaut werden kann.
+        """
+        key = self.make_key(host, username, ftp_dir, port)
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                ftp, last_used = idle.pop() if idle else (None, 0.0)
+            if ftp is None:
+                return self._open(key, password)
+            if now - last_used > self.idle_timeout:
+                self._close(ftp)
+                continue
+            if self._is_alive(ftp):
+                return ftp
+            if self.logger:
+                self.logger.log_warning(f"FTPPool: Tote Sitzung zu {host} verworfen, verbinde neu")
+            ftp.close()
+
+    def release(self, ftp: ftplib.FTP, host: str, username: str, ftp_dir: str = "/", port: int = 21,
+                broken: bool = False):
+        """
+        Gibt eine Sitzung an den Pool zurück. Defekte Sitzungen oder solche über
+        `max_idle_per_key` hinaus werden geschlossen.
+        """
+        if ftp is None:
+            return
+        if broken or ftp.sock is None:
+            ftp.close()
+            return
+        key = self.make_key(host, username, ftp_dir, port)
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_key:
+                idle.append((ftp, time.monotonic()))
+                return
+        self._close(ftp)
+
+    @contextmanager
+    def session(self, host: str, username: str, password: str, ftp_dir: str = "/", port: int = 21):
+        """
+        Kontextmanager: leiht eine Sitzung aus und gibt sie danach zurück.
+        Bei Verbindungsfehlern wird die Sitzung nicht wiederverwendet.
+        """
+        ftp = self.acquire(host, username, password, ftp_dir, port)
+        broken = False
+        try:
+            yield ftp
+        except (OSError, EOFError, ftplib.error_temp):
+            broken = True
+            raise
+        finally:
+            self.release(ftp, host, username, ftp_dir, port, broken=broken)
+
+    def keepalive(self):
+        """
+        Sendet NOOP an alle ruhenden Sitzungen und entfernt abgelaufene oder
+        tote Verbindungen. Kann periodisch vom Scheduler aufgerufen werden.
+        """
+        now = time.monotonic()
+        with self._lock:
+            items = [(key, entry) for key, idle in self._idle.items() for entry in idle]
+            self._idle = {}
+
+        survivors: Dict[PoolKey, List[Tuple[ftplib.FTP, float]]] = {}
+        for key, (ftp, last_used) in items:
+            if now - last_used > self.idle_timeout:
+                self._close(ftp)
+            elif self._is_alive(ftp):
+                survivors.setdefault(key, []).append((ftp, last_used))
+            else:
+                ftp.close()
+
+        with self._lock:
+            for key, entries in survivors.items():
+                self._idle.setdefault(key, []).extend(entries)
+
+    def close_all(self):
+        """
+        Schließt alle ruhenden Sitzungen.
+        """
+        with self._lock:
+            items = [ftp for idle in self._idle.values() for ftp, _ in idle]
+            self._idle = {}
+        for ftp in items:
+            self._close(ftp)
+
+
+_default_pool: Optional[FTPConnectionPool] = None
+_default_pool_lock = threading.Lock()
+
+
+def get_default_pool() -> FTPConnectionPool:
+    """
+    Liefert den prozessweiten Standard-Pool (wird bei Bedarf angelegt).
+    """
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = FTPConnectionPool()
+        return _default_pool
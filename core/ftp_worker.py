@@ -3,72 +3,640 @@
 import ftplib
 import io
 import os
+import posixpath
+import shutil
+import tempfile
+import time
 import zipfile
 import json
-from typing import Optional, List
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, List, Tuple
 from core.logger import Logger
+from core.compression import CompressionPolicy
+from core.ftp_pool import FTPConnectionPool
+from core.integrity import FTP_HASH_NAMES, StreamHasher
+from core.listing_cache import MLSD_FACTS, ListingCache, get_default_listing_cache
+from core.metrics import get_registry
+from core.rate_limit import RateLimiter, get_default_limiter
+from core.transfer_tuning import TransferTuner, TunedFTP, get_default_tuner
+
+# Fehler, nach denen sich ein erneuter Versuch lohnt (Verbindungsabbruch,
+# Timeout, temporäre 4xx-Antworten). 5xx-Antworten sind endgültig.
+RETRYABLE_ERRORS = (ftplib.error_temp, ftplib.error_reply, OSError, EOFError)
+
+FTP_OPERATION_SECONDS = get_registry().histogram(
+    "ftp_operation_duration_seconds", "Dauer von FTP-Vorgängen in Sekunden", ["server", "operation"])
+FTP_OPERATIONS = get_registry().counter(
+    "ftp_operations_total", "Anzahl FTP-Vorgänge nach Ergebnis", ["server", "operation", "outcome"])
+FTP_BYTES = get_registry().counter(
+    "ftp_transferred_bytes_total", "Übertragene Bytes", ["server", "operation"])
+
+# "ftplib": blockierend, eine Sitzung pro Thread; "asyncio": alle Sitzungen
+# auf einer gemeinsamen Event-Loop (siehe core/async_ftp.py)
+BACKENDS = ("ftplib", "asyncio")
+
+
+def _kib(value: Any) -> Optional[int]:
+    # KiB aus der Konfiguration in Bytes (leer/0 = nicht gesetzt)
+    return int(float(value) * 1024) if value else None
 
 class FTPWorker:
-    def __init__(self, host: str, username: str, password: str, ftp_dir: str = "/", logger: Logger = None):
+    def __init__(self, host: str, username: str, password: str, ftp_dir: str = "/", logger: Logger = None,
+                 port: int = 21, pool: Optional[FTPConnectionPool] = None, tmp_dir: Optional[str] = None,
+                 max_retries: int = 3, retry_backoff: float = 1.0, rate_limiter: Optional[RateLimiter] = None,
+                 verify_uploads: bool = True, hash_algorithm: str = "sha256", tuner: Optional[TransferTuner] = None,
+                 blocksize: Optional[int] = None, socket_buffer: Optional[int] = None,
+                 listing_cache: Optional[ListingCache] = None):
+        """
+        Args:
+            tmp_dir (str, optional): Ablage für angefangene Downloads (*.part), die
+                bei einem späteren Versuch per REST fortgesetzt werden.
+            max_retries (int): Wiederholungen bei Verbindungsabbrüchen.
+            retry_backoff (float): Wartezeit vor der ersten Wiederholung in Sekunden,
+                verdoppelt sich mit jedem weiteren Versuch.
+            rate_limiter (RateLimiter, optional): Bandbreitenbegrenzung (Standard: prozessweiter Limiter).
+            verify_uploads (bool): Uploads nach der Übertragung per HASH, XCRC oder SIZE prüfen.
+            hash_algorithm (str): Hash der Übertragungen ("sha256" oder "blake2b").
+            tuner (TransferTuner, optional): Misst Übertragungen und wählt die Blockgröße
+                (Standard: prozessweiter Tuner).
+            blocksize (int, optional): Feste Blockgröße in Bytes statt der gemessenen.
+            socket_buffer (int, optional): Socket-Puffer der Datenverbindung in Bytes
+                (Standard: Systemstandard mit automatischer Fenstergröße).
+            listing_cache (ListingCache, optional): Cache für Verzeichnislisten (Standard:
+                prozessweiter Cache, den alle Worker teilen).
+        """
         self.host = host
         self.username = username
         self.password = password
-        self.ftp_dir = ftp_dir
+        self.ftp_dir = ftp_dir or "/"
         self.logger = logger
+        self.port = port
+        self.pool = pool
+        self.tmp_dir = tmp_dir or tempfile.gettempdir()
+        # Vom Server abgelehnte optionale Befehle (XCRC, HASH) nicht erneut senden
+        self.unsupported_commands = set()
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.rate_limiter = rate_limiter or get_default_limiter()
+        self.verify_uploads = verify_uploads
+        self.hash_algorithm = hash_algorithm
+        self.tuner = tuner or get_default_tuner()
+        self.blocksize = blocksize
+        self.socket_buffer = socket_buffer
+        self.listing_cache = listing_cache or get_default_listing_cache()
         self.ftp = None
 
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any], logger: Logger = None,
+                      pool: Optional[FTPConnectionPool] = None, tmp_dir: Optional[str] = None) -> "FTPWorker":
+        """
+        Erzeugt einen Worker aus einem Server-Eintrag (siehe ConfigHandler.get_servers).
+        """
+        return cls(settings.get("host", ""), settings.get("username", ""), settings.get("password", ""),
+                   settings.get("ftp_dir", "/"), logger, port=int(settings.get("port") or 21),
+                   pool=pool, tmp_dir=tmp_dir, verify_uploads=settings.get("verify_uploads", True),
+                   blocksize=_kib(settings.get("transfer_blocksize_kib")),
+                   socket_buffer=_kib(settings.get("socket_buffer_kib")))
+
     def connect(self) -> bool:
+        started = time.monotonic()
         try:
-            self.ftp = ftplib.FTP(self.host, timeout=10)
-            self.ftp.login(self.username, self.password)
-            self.ftp.cwd(self.ftp_dir)
+            if self.pool:
+                # Sitzung aus dem Pool leihen (per NOOP geprüft, ggf. neu aufgebaut)
+                self.ftp = self.pool.acquire(self.host, self.username, self.password, self.ftp_dir, self.port)
+            else:
+                self.ftp = self._open_session()
             if self.logger:
                 self.logger.log_info(f"FTPWorker: Verbunden mit {self.host} und Verzeichnis {self.ftp_dir}")
+            self._record_operation("connect", started)
             return True
         except Exception as e:
             if self.logger:
                 self.logger.log_error(f"FTPWorker Verbindungsfehler: {e}")
+            self._record_operation("connect", started, "error", error=str(e))
             return False
 
+    def _open_session(self) -> ftplib.FTP:
+        """
+        Baut eine neue Sitzung auf (ohne Pool). Alternative Backends
+        überschreiben diese Methode und liefern ein ftplib-kompatibles Objekt.
+        """
+        ftp = TunedFTP()
+        ftp.connect(self.host, self.port, timeout=10)
+        ftp.login(self.username, self.password)
+        ftp.cwd(self.ftp_dir)
+        return ftp
+
     def disconnect(self):
-        if self.ftp:
+        if not self.ftp:
+            return
+        if self.pool:
+            # Sitzung für den nächsten Zyklus im Pool behalten
+            self.pool.release(self.ftp, self.host, self.username, self.ftp_dir, self.port)
+            self.ftp = None
+            return
+        try:
+            self.ftp.quit()
+            if self.logger:
+                self.logger.log_info("FTPWorker: Verbindung geschlossen")
+        except Exception as e:
+            if self.logger:
+                self.logger.log_error(f"FTPWorker Fehler beim Trennen: {e}")
+        finally:
+            self.ftp = None
+
+    def clone(self) -> "FTPWorker":
+        """
+        Erzeugt einen unverbundenen Worker mit denselben Verbindungsdaten,
+        z.B. für parallele Downloads mit eigener Sitzung.
+        """
+        worker = type(self)(self.host, self.username, self.password, self.ftp_dir, self.logger,
+                            port=self.port, pool=self.pool, tmp_dir=self.tmp_dir,
+                            max_retries=self.max_retries, retry_backoff=self.retry_backoff,
+                            rate_limiter=self.rate_limiter, verify_uploads=self.verify_uploads,
+                            hash_algorithm=self.hash_algorithm, tuner=self.tuner, blocksize=self.blocksize,
+                            socket_buffer=self.socket_buffer, listing_cache=self.listing_cache)
+        worker.unsupported_commands = self.unsupported_commands
+        return worker
+
+    def _reconnect(self):
+        """
+        Verwirft die aktuelle (vermutlich tote) Sitzung und verbindet neu.
+        """
+        if self.ftp is not None:
+            if self.pool:
+                self.pool.release(self.ftp, self.host, self.username, self.ftp_dir, self.port, broken=True)
+            else:
+                self.ftp.close()
+            self.ftp = None
+        if not self.connect():
+            raise ConnectionError(f"Keine Verbindung zu {self.host} möglich")
+
+    def _with_retries(self, description: str, operation):
+        """
+        Führt `operation` aus und wiederholt sie bei Verbindungsfehlern mit
+        exponentiellem Backoff. Vor jeder Wiederholung wird neu verbunden.
+        """
+        delay = self.retry_backoff
+        attempt = 0
+        while True:
             try:
-                self.ftp.quit()
-                if self.logger:
-                    self.logger.log_info("FTPWorker: Verbindung geschlossen")
-            except Exception as e:
+                if attempt:
+                    self._reconnect()
+                return operation()
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    raise
+                attempt += 1
                 if self.logger:
-                    self.logger.log_error(f"FTPWorker Fehler beim Trennen: {e}")
+                    self.logger.log_warning(
+                        f"FTPWorker: {description} unterbrochen ({e}), Versuch {attempt}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+                delay *= 2
+
+    def _transfer_settings(self, direction: str) -> int:
+        """
+        Wählt die Blockgröße für die nächste Übertragung (ein fester Wert des
+        Servers hat Vorrang vor dem gemessenen) und setzt einen konfigurierten
+        Socket-Puffer auf der Sitzung. Ohne Konfiguration bleibt der
+        Systemstandard mit automatischer Fenstergröße.
+        """
+        buffer = self.socket_buffer
+        set_buffers = getattr(self.ftp, "set_socket_buffers", None)
+        if set_buffers is not None:
+            set_buffers(buffer if direction == "download" else None, buffer if direction == "upload" else None)
+        return self.blocksize or self.tuner.blocksize_for(f"{self.host}:{self.port}", direction)
+
+    def _record_transfer(self, direction: str, blocksize: int, transferred: int, started: float, throttle):
+        # Gedrosselte Übertragungen messen das Limit, nicht die Leitung
+        if self.blocksize or throttle.waited:
+            return
+        self.tuner.record(f"{self.host}:{self.port}", direction, blocksize, transferred, time.monotonic() - started)
+
+    def _record_operation(self, operation: str, started: float, outcome: str = "ok", **fields):
+        """
+        Schreibt Metriken und ein strukturiertes Ereignis mit Server und Dauer
+        seit `started` (time.monotonic()).
+        """
+        duration = time.monotonic() - started
+        FTP_OPERATION_SECONDS.observe(duration, server=self.host, operation=operation)
+        FTP_OPERATIONS.inc(server=self.host, operation=operation, outcome=outcome)
+        if fields.get("bytes") and operation in ("download", "upload"):
+            FTP_BYTES.inc(fields["bytes"], server=self.host, operation=operation)
+        if self.logger:
+            self.logger.log_event(operation, outcome=outcome, server=self.host,
+                                  duration_ms=round(duration * 1000, 1), **fields)
+
+    def is_connected(self) -> bool:
+        return self.ftp is not None and self.ftp.sock is not None
+
+    @contextmanager
+    def session(self):
+        """
+        Stellt für die Dauer des Blocks eine Verbindung sicher. Ist der Worker
+        bereits verbunden, bleibt die Verbindung danach bestehen; andernfalls
+        wird sie anschließend wieder getrennt bzw. an den Pool zurückgegeben.
+
+        Raises:
+            ConnectionError: Wenn keine Verbindung aufgebaut werden kann.
+        """
+        if self.is_connected():
+            yield self
+            return
+        if not self.connect():
+            raise ConnectionError(f"Keine Verbindung zu {self.host} möglich")
+        try:
+            yield self
+        finally:
+            self.disconnect()
 
     def download_file(self, filename: str) -> Optional[bytes]:
+        with io.BytesIO() as bio:
+            if self.download_stream(filename, bio.write, hasher=StreamHasher(self.hash_algorithm)) is None:
+                return None
+            return bio.getvalue()
+
+    def download_stream(self, filename: str, callback, offset: int = 0,
+                        hasher: Optional[StreamHasher] = None) -> Optional[int]:
+        """
+        Lädt eine Datei blockweise herunter und reicht jeden Block direkt an
+        `callback` weiter, ohne die Datei im Speicher zu sammeln. Bricht die
+        Verbindung ab, wird neu verbunden und per REST ab dem letzten
+        empfangenen Byte fortgesetzt.
+
+        Args:
+            filename (str): Name der Datei im FTP-Verzeichnis.
+            callback: Callable, die jeden empfangenen Block (bytes) erhält.
+            offset (int): Startposition in der Datei (REST), z.B. für angefangene Downloads.
+            hasher (StreamHasher, optional): Wird mit jedem Block fortgeschrieben; der
+                Hash landet im Ereignis des Downloads.
+
+        Returns:
+            Optional[int]: Anzahl übertragener Bytes (ab `offset`) oder None bei Fehler.
+        """
+        received = 0
+        started = time.monotonic()
+        throttle = self.rate_limiter.transfer(self.host)
+
+        def _on_block(block: bytes):
+            nonlocal received
+            received += len(block)
+            if hasher is not None:
+                hasher.update(block)
+            throttle.consume(len(block))
+            callback(block)
+
+        def _retrieve():
+            position = offset + received
+            blocksize = self._transfer_settings("download")
+            self.ftp.retrbinary(f"RETR {filename}", _on_block, blocksize=blocksize, rest=position or None)
+            return blocksize
+
         try:
-            with io.BytesIO() as bio:
-                self.ftp.retrbinary(f"RETR {filename}", bio.write)
-                data = bio.getvalue()
-                if self.logger:
-                    self.logger.log_info(f"FTPWorker: Datei {filename} heruntergeladen ({len(data)} Bytes)")
-                return data
+            blocksize = self._with_retries(f"Download {filename}", _retrieve)
+            self._record_transfer("download", blocksize, received, started, throttle)
+            if self.logger:
+                self.logger.log_info(f"FTPWorker: Datei {filename} heruntergeladen ({received} Bytes)")
+            digest = {"hash": hasher.digest_string()} if hasher is not None else {}
+            self._record_operation("download", started, file=filename, bytes=received, offset=offset, **digest)
+            return received
         except Exception as e:
             if self.logger:
                 self.logger.log_error(f"FTPWorker Fehler beim Download {filename}: {e}")
+            self._record_operation("download", started, "error", file=filename, bytes=received, offset=offset,
+                            error=str(e))
             return None
 
+    def download_to_file(self, filename: str, local_path: str) -> bool:
+        """
+        Lädt eine Datei in eine lokale Datei herunter. Der Download wird unter
+        `tmp_dir` als *.part zwischengespeichert und bei einem späteren Aufruf
+        per REST fortgesetzt, solange sich die entfernte Datei nicht geändert hat.
+
+        Args:
+            filename (str): Name der Datei im FTP-Verzeichnis.
+            local_path (str): Zielpfad der fertigen Datei.
+
+        Returns:
+            bool: True bei Erfolg, False bei Fehlern.
+        """
+        safe_name = f"{self.host}_{self.port}_{self.ftp_dir}_{filename}".replace("/", "_").replace("\\", "_")
+        part_path = os.path.join(self.tmp_dir, safe_name + ".part")
+        meta_path = part_path + ".json"
+
+        # Metadaten ebenfalls mit Wiederholung holen, damit eine tote Sitzung
+        # nicht zu einem unnötigen Neustart des Downloads führt
+        self._with_retries("NOOP", lambda: self.ftp.voidcmd("NOOP"))
+        remote_size = self._remote_size(filename)
+        remote_modify = self._remote_mdtm(filename)
+        offset = 0
+        if os.path.exists(part_path):
+            try:
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+            except (json.JSONDecodeError, IOError):
+                meta = {}
+            offset = os.path.getsize(part_path)
+            unchanged = meta.get("modify") == remote_modify and meta.get("size") == remote_size
+            if not unchanged or remote_size is None or offset > remote_size:
+                offset = 0
+
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"size": remote_size, "modify": remote_modify}, f)
+
+        if offset and self.logger:
+            self.logger.log_info(f"FTPWorker: Setze Download {filename} bei {offset} Bytes fort")
+
+        with open(part_path, "ab" if offset else "wb") as part:
+            received = self.download_stream(filename, part.write, offset=offset)
+        if received is None:
+            # *.part bleibt für den nächsten Versuch liegen
+            return False
+
+        os.replace(part_path, local_path)
+        os.remove(meta_path)
+        return True
+
     def upload_file(self, filename: str, data: bytes) -> bool:
+        with io.BytesIO(data) as bio:
+            return self.upload_fileobj(filename, bio)
+
+    def upload_fileobj(self, filename: str, fp, size: Optional[int] = None) -> bool:
+        """
+        Lädt den Inhalt eines lesbaren, seekbaren Dateiobjekts hoch. Bricht die
+        Verbindung ab, wird neu verbunden, die bereits übertragene Größe per SIZE
+        ermittelt und der Rest per APPE angehängt. Lehnt der Server APPE ab,
+        wird die Datei vollständig neu gesendet. Der Hash entsteht während der
+        Übertragung; anschließend wird die Datei per HASH, XCRC oder SIZE
+        geprüft (siehe verify_remote).
+
+        Args:
+            filename (str): Zielname im FTP-Verzeichnis.
+            fp: Lesbares, seekbares Dateiobjekt (ab Position 0).
+            size (int, optional): Bekannte Größe; erspart das Spulen ans Ende
+                (teuer z.B. bei Einträgen aus ZIP-Archiven).
+
+        Returns:
+            bool: True bei Erfolg, False bei Fehlern oder abweichender Prüfsumme.
+        """
+        if size is None:
+            fp.seek(0, os.SEEK_END)
+            size = fp.tell()
+        total = size
+        first_attempt = True
+        started = time.monotonic()
+        throttle = self.rate_limiter.transfer(self.host)
+        hasher = StreamHasher(self.hash_algorithm)
+
+        def _on_block(block: bytes):
+            hasher.update(block)
+            throttle.consume(len(block))
+
+        def _restart_hash(offset: int):
+            # Beim Fortsetzen den bereits übertragenen Anfang lokal nachhashen
+            nonlocal hasher
+            hasher = StreamHasher(self.hash_algorithm)
+            fp.seek(0)
+            remaining = offset
+            while remaining > 0:
+                block = fp.read(min(remaining, 1024 * 1024))
+                if not block:
+                    break
+                hasher.update(block)
+                remaining -= len(block)
+            fp.seek(offset)
+
+        def _store():
+            nonlocal first_attempt
+            offset = 0
+            if not first_attempt:
+                remote_size = self._remote_size(filename)
+                if remote_size and remote_size < total:
+                    offset = remote_size
+            first_attempt = False
+
+            _restart_hash(offset)
+            blocksize = self._transfer_settings("upload")
+            if offset:
+                if self.logger:
+                    self.logger.log_info(f"FTPWorker: Setze Upload {filename} bei {offset} Bytes fort")
+                try:
+                    self.ftp.storbinary(f"APPE {filename}", fp, blocksize, callback=_on_block)
+                    return blocksize
+                except ftplib.error_perm:
+                    _restart_hash(0)
+            self.ftp.storbinary(f"STOR {filename}", fp, blocksize, callback=_on_block)
+            return blocksize
+
         try:
-            with io.BytesIO(data) as bio:
-                bio.seek(0)
-                self.ftp.storbinary(f"STOR {filename}", bio)
+            blocksize = self._with_retries(f"Upload {filename}", _store)
+            self.invalidate_listing(filename)
+            self._record_transfer("upload", blocksize, total, started, throttle)
+        except Exception as e:
+            # Auch ein abgebrochener Upload kann eine Teildatei hinterlassen
+            self.invalidate_listing(filename)
+            if self.logger:
+                self.logger.log_error(f"FTPWorker Fehler beim Upload {filename}: {e}")
+            self._record_operation("upload", started, "error", file=filename, bytes=total, error=str(e))
+            return False
+
+        method = None
+        if self.verify_uploads:
+            matches, method = self.verify_remote(filename, hasher)
+            if matches is False:
                 if self.logger:
-                    self.logger.log_info(f"FTPWorker: Datei {filename} hochgeladen ({len(data)} Bytes)")
+                    self.logger.log_error(f"FTPWorker: Upload {filename} fehlerhaft, Prüfung per {method} fehlgeschlagen")
+                self._record_operation("upload", started, "error", file=filename, bytes=total,
+                                       hash=hasher.digest_string(), verified=method, error="Prüfsumme weicht ab")
+                return False
+        if self.logger:
+            checked = f", geprüft per {method}" if method else ""
+            self.logger.log_info(f"FTPWorker: Datei {filename} hochgeladen ({total} Bytes{checked})")
+        self._record_operation("upload", started, file=filename, bytes=total, hash=hasher.digest_string(),
+                               verified=method)
+        return True
+
+    def verify_remote(self, filename: str, hasher: StreamHasher) -> Tuple[Optional[bool], Optional[str]]:
+        """
+        Vergleicht eine entfernte Datei mit einem lokal berechneten Hash: per
+        HASH (sofern der Algorithmus dort verfügbar ist), sonst per XCRC, sonst
+        nur die Größe per SIZE.
+
+        Returns:
+            Tuple[Optional[bool], Optional[str]]: Ergebnis (None, wenn keine Prüfung
+                möglich war) und der verwendete Befehl.
+        """
+        ftp_algorithm = FTP_HASH_NAMES.get(hasher.algorithm)
+        if ftp_algorithm:
+            remote_hash = self.get_hash(filename, ftp_algorithm)
+            if remote_hash is not None:
+                return remote_hash == hasher.hexdigest(), "HASH"
+        remote_crc = self.get_crc32(filename)
+        if remote_crc is not None:
+            return remote_crc == hasher.crc32, "XCRC"
+        remote_size = self._remote_size(filename)
+        if remote_size is not None:
+            return remote_size == hasher.size, "SIZE"
+        return None, None
+
+    def rename_file(self, old_name: str, new_name: str) -> bool:
+        """
+        Benennt eine Datei per RNFR/RNTO um. Lehnt der Server das Überschreiben
+        einer bestehenden Zieldatei ab (RNTO verweigert), wird diese gelöscht und
+        erneut umbenannt. Fehlt die Quelle (RNFR verweigert), bleibt das Ziel
+        unangetastet.
+
+        Returns:
+            bool: True bei Erfolg, False bei Fehlern.
+        """
+        started = time.monotonic()
+        try:
+            # RNFR prüft, dass die Quelle existiert; erst danach darf das Ziel weichen
+            self._rename_from(old_name)
+            try:
+                self.ftp.voidcmd(f"RNTO {new_name}")
+            except ftplib.error_perm:
+                self.ftp.delete(new_name)
+                self._rename_from(old_name)
+                self.ftp.voidcmd(f"RNTO {new_name}")
+            self.invalidate_listing(old_name, new_name)
+            if self.logger:
+                self.logger.log_info(f"FTPWorker: Datei {old_name} in {new_name} umbenannt")
+            self._record_operation("rename", started, file=new_name, source=old_name)
             return True
         except Exception as e:
+            self.invalidate_listing(old_name, new_name)
             if self.logger:
-                self.logger.log_error(f"FTPWorker Fehler beim Upload {filename}: {e}")
+                self.logger.log_error(f"FTPWorker Fehler beim Umbenennen {old_name} -> {new_name}: {e}")
+            self._record_operation("rename", started, "error", file=new_name, source=old_name, error=str(e))
             return False
 
-    def list_files(self) -> Optional[List[str]]:
+    def _rename_from(self, old_name: str):
+        response = self.ftp.sendcmd(f"RNFR {old_name}")
+        if response[:1] != "3":
+            raise ftplib.error_reply(response)
+
+    def delete_file(self, filename: str) -> bool:
         try:
-            files = self.ftp.nlst()
+            self.ftp.delete(filename)
+            self.invalidate_listing(filename)
+            if self.logger:
+                self.logger.log_info(f"FTPWorker: Datei {filename} gelöscht")
+            return True
+        except Exception as e:
+            if self.logger:
+                self.logger.log_error(f"FTPWorker Fehler beim Löschen {filename}: {e}")
+            return False
+
+    def get_size(self, filename: str) -> Optional[int]:
+        """
+        Liefert die Dateigröße per SIZE oder None, falls der Server SIZE nicht
+        unterstützt bzw. die Datei fehlt.
+        """
+        return self._remote_size(filename)
+
+    def get_crc32(self, filename: str) -> Optional[int]:
+        """
+        Liefert die CRC32-Prüfsumme der entfernten Datei per XCRC oder None,
+        falls der Server XCRC nicht unterstützt.
+        """
+        if "XCRC" in self.unsupported_commands:
+            return None
+        try:
+            response = self.ftp.sendcmd(f"XCRC {filename}")
+        except ftplib.error_perm as e:
+            if str(e).startswith(("500", "502")):
+                self.unsupported_commands.add("XCRC")
+            return None
+        except ftplib.all_errors:
+            return None
+        try:
+            return int(response.split()[-1], 16)
+        except (IndexError, ValueError):
+            return None
+
+    def get_hash(self, filename: str, algorithm: str = "SHA-256") -> Optional[str]:
+        """
+        Liefert den Hash der entfernten Datei per HASH (draft-bryan-ftpext-hash)
+        als Hex-String oder None, falls der Server HASH bzw. den Algorithmus
+        nicht unterstützt.
+        """
+        if "HASH" in self.unsupported_commands:
+            return None
+        try:
+            self.ftp.sendcmd(f"OPTS HASH {algorithm}")
+            response = self.ftp.sendcmd(f"HASH {filename}")
+        except ftplib.error_perm as e:
+            if str(e).startswith(("500", "502")):
+                self.unsupported_commands.add("HASH")
+            return None
+        except ftplib.all_errors:
+            return None
+        # 213 SHA-256 0-49 <hex> <dateiname>
+        parts = response.split(maxsplit=4)
+        if len(parts) >= 4 and parts[0] == "213" and parts[1].upper() == algorithm.upper():
+            return parts[3].lower()
+        return None
+
+    def invalidate_listing(self, *paths: str):
+        """
+        Verwirft gecachte Verzeichnislisten nach Änderungen an `paths`, die
+        nicht über diesen Worker liefen (z.B. über eine eigene asyncio-Sitzung).
+        """
+        for path in paths:
+            self.listing_cache.invalidate(self.host, self.port, self.ftp_dir, path)
+
+    def _listing_key(self, path: str = ""):
+        return self.listing_cache.make_key(self.host, self.port, self.username, self.ftp_dir, path)
+
+    def _listing(self, path: str = "", fresh: bool = False) -> Tuple[Dict[str, Dict[str, str]], str]:
+        """
+        Liste eines Verzeichnisses: Name -> MLSD-Fakten, dazu die Quelle
+        ("MLSD", oder "NLST" ohne Fakten, wenn der Server kein MLSD kann).
+        Innerhalb der TTL kommt sie aus dem Cache, ohne Befehl an den Server;
+        bei `fresh` immer vom Server (der Cache wird dabei aufgefrischt).
+
+        Raises:
+            ftplib.Error, OSError: Wenn das Verzeichnis nicht gelistet werden kann.
+        """
+        key = self._listing_key(path)
+        cached = None if fresh else self.listing_cache.get(key)
+        if cached is not None:
+            return cached
+        directory = path.strip("/")
+        try:
+            listing = {name: facts for name, facts in self.ftp.mlsd(directory, facts=MLSD_FACTS)
+                       if name not in (".", "..") and facts.get("type", "").lower() not in ("cdir", "pdir")}
+            source = "MLSD"
+        except ftplib.error_perm:
+            names = self.ftp.nlst(directory) if directory else self.ftp.nlst()
+            listing = {posixpath.basename(name.rstrip("/")): {} for name in names}
+            source = "NLST"
+        self.listing_cache.put(key, listing, source)
+        return listing, source
+
+    def list_facts(self, path: str = "") -> Optional[Dict[str, Dict[str, str]]]:
+        """
+        Liefert alle Einträge eines Verzeichnisses mit den MLSD-Fakten des
+        Servers (z.B. type, size, modify, perm, unique; ohne MLSD leer).
+
+        Args:
+            path (str): Verzeichnis relativ zum FTP-Verzeichnis ("" = FTP-Verzeichnis).
+
+        Returns:
+            Optional[Dict[str, Dict[str, str]]]: Name -> Fakten oder None bei Fehler.
+        """
+        try:
+            return self._listing(path)[0]
+        except Exception as e:
+            if self.logger:
+                self.logger.log_error(f"FTPWorker Fehler beim Auflisten von {path or self.ftp_dir}: {e}")
+            return None
+
+    def list_files(self, fresh: bool = False) -> Optional[List[str]]:
+        try:
+            listing, _ = self._listing(fresh=fresh)
+            files = [name for name, facts in listing.items() if facts.get("type", "file").lower() == "file"]
             if self.logger:
                 self.logger.log_info(f"FTPWorker: Verzeichnisinhalt abgerufen ({len(files)} Dateien)")
             return files
@@ -77,20 +645,163 @@ class FTPWorker:
                 self.logger.log_error(f"FTPWorker Fehler beim Auflisten der Dateien: {e}")
             return None
 
-    def download_and_zip(self, filenames: List[str], zip_name: str) -> Optional[bytes]:
+    def list_entries(self, fresh: bool = False) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Liefert die Dateien des Verzeichnisses mit Metadaten (Größe, Änderungszeit).
+        Nutzt MLSD; unterstützt der Server das nicht, wird auf NLST mit SIZE/MDTM
+        pro Datei zurückgegriffen. Beides wird zwischengespeichert (siehe ListingCache).
+
+        Args:
+            fresh (bool): Am Cache vorbei vom Server listen, z.B. wenn davon abhängt,
+                welche Dateien gesichert werden.
+
+        Returns:
+            Optional[Dict[str, Dict[str, Any]]]: Dateiname -> {"size": int|None, "modify": str|None}
+                oder None bei Fehler.
+        """
+        try:
+            listing, source = self._listing(fresh=fresh)
+            if source == "NLST":
+                # SIZE/MDTM pro Datei nachholen und als Fakten im Cache ablegen
+                for name, facts in listing.items():
+                    size, modify = self._remote_size(name), self._remote_mdtm(name)
+                    facts.update({key: value for key, value in (("size", size), ("modify", modify))
+                                  if value is not None})
+                source = "NLST/SIZE/MDTM"
+                self.listing_cache.put(self._listing_key(), listing, source)
+            entries = {}
+            for name, facts in listing.items():
+                if facts.get("type", "file").lower() != "file":
+                    continue
+                size = facts.get("size")
+                entries[name] = {
+                    "size": int(size) if size is not None else None,
+                    "modify": facts.get("modify"),
+                }
+            if self.logger:
+                self.logger.log_info(f"FTPWorker: Verzeichnisinhalt per {source} abgerufen ({len(entries)} Dateien)")
+            return entries
+        except Exception as e:
+            if self.logger:
+                self.logger.log_error(f"FTPWorker Fehler beim Auflisten der Dateien: {e}")
+            return None
+
+    def list_tree(self, path: str = "", recursive: bool = True,
+                  fresh: bool = False) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Liefert Dateien und Unterverzeichnisse per MLSD, bei `recursive` auch
+        aus allen Unterverzeichnissen. Unterstützt der Server kein MLSD, wird
+        nur die oberste Ebene per NLST/SIZE/MDTM gelistet.
+
+        Args:
+            path (str): Startverzeichnis relativ zum FTP-Verzeichnis ("" = FTP-Verzeichnis).
+            recursive (bool): Unterverzeichnisse einbeziehen.
+            fresh (bool): Am Cache vorbei vom Server listen (siehe list_entries).
+
+        Returns:
+            Optional[Dict[str, Dict[str, Any]]]: Relativer Pfad ("a/b.sav") ->
+                {"type": "file"|"dir", "size": int|None, "modify": str|None} oder None bei Fehler.
+        """
+        tree: Dict[str, Dict[str, Any]] = {}
+        pending = [path.strip("/")]
+        try:
+            while pending:
+                directory = pending.pop()
+                listing, source = self._listing(directory, fresh=fresh)
+                if source != "MLSD":
+                    if directory != path.strip("/") or tree:
+                        raise ftplib.error_perm(f"550 MLSD für {directory} nicht verfügbar")
+                    entries = self.list_entries(fresh=fresh)
+                    if entries is None:
+                        return None
+                    if self.logger:
+                        self.logger.log_warning("FTPWorker: Server unterstützt kein MLSD, "
+                                                "Unterverzeichnisse werden nicht gelistet.")
+                    return {name: dict(meta, type="file") for name, meta in entries.items()}
+                for name, facts in listing.items():
+                    kind = facts.get("type", "file").lower()
+                    relative = f"{directory}/{name}" if directory else name
+                    size = facts.get("size")
+                    tree[relative] = {
+                        "type": "dir" if kind == "dir" else "file",
+                        "size": int(size) if size is not None and kind != "dir" else None,
+                        "modify": facts.get("modify"),
+                    }
+                    if kind == "dir" and recursive:
+                        pending.append(relative)
+            if self.logger:
+                self.logger.log_info(f"FTPWorker: Verzeichnisbaum per MLSD abgerufen ({len(tree)} Einträge)")
+            return tree
+        except Exception as e:
+            if self.logger:
+                self.logger.log_error(f"FTPWorker Fehler beim Auflisten des Verzeichnisbaums: {e}")
+            return None
+
+    def make_dirs(self, path: str) -> bool:
+        """
+        Legt ein Verzeichnis samt fehlender Elternverzeichnisse per MKD an.
+        Bereits vorhandene Verzeichnisse gelten als Erfolg.
+        """
+        current = ""
+        for part in [p for p in path.split("/") if p]:
+            current = f"{current}/{part}" if current else part
+            try:
+                self.ftp.mkd(current)
+                self.invalidate_listing(current)
+            except ftplib.error_perm:
+                # 550: existiert bereits (oder keine Rechte, dann scheitert der Upload)
+                pass
+            except Exception as e:
+                if self.logger:
+                    self.logger.log_error(f"FTPWorker Fehler beim Anlegen von {current}: {e}")
+                return False
+        return True
+
+    def _remote_size(self, filename: str) -> Optional[int]:
+        try:
+            return self.ftp.size(filename)
+        except ftplib.all_errors:
+            return None
+
+    def _remote_mdtm(self, filename: str) -> Optional[str]:
+        try:
+            response = self.ftp.sendcmd(f"MDTM {filename}")
+            return response.split(maxsplit=1)[1].strip() if response.startswith("213") else None
+        except ftplib.all_errors:
+            return None
+
+    def download_and_zip(self, filenames: List[str], zip_name: str, parallel_connections: int = 1,
+                         compression: Optional[CompressionPolicy] = None) -> Optional[bytes]:
         """
         Lädt mehrere Dateien herunter und gibt ein ZIP-Archiv als Bytes zurück.
+        Mit `parallel_connections` > 1 werden die Dateien über eigene Sitzungen
+        parallel geladen; die Reihenfolge im Archiv bleibt die der Eingabeliste.
+        `compression` legt Methode und Stufe fest (Standard: deflate).
         """
+        compression = compression or CompressionPolicy(logger=self.logger)
         try:
             with io.BytesIO() as zip_buffer:
-                with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                    for filename in filenames:
-                        data = self.download_file(filename)
-                        if data is not None:
-                            zipf.writestr(filename, data)
-                        else:
-                            if self.logger:
-                                self.logger.log_error(f"FTPWorker: Datei {filename} konnte nicht geladen werden, wird nicht ins ZIP gepackt.")
+                method, level = compression.zip_arguments()
+                with zipfile.ZipFile(zip_buffer, 'w', compression=method, compresslevel=level) as zipf:
+                    if parallel_connections > 1:
+                        from core.parallel_download import ParallelDownloader
+                        downloader = ParallelDownloader(self, parallel_connections)
+                        for filename, spool in downloader.iter_downloads(filenames):
+                            if spool is None:
+                                if self.logger:
+                                    self.logger.log_error(f"FTPWorker: Datei {filename} konnte nicht geladen werden, wird nicht ins ZIP gepackt.")
+                                continue
+                            with spool, compression.open_entry(zipf, filename) as entry:
+                                shutil.copyfileobj(spool, entry)
+                    else:
+                        for filename in filenames:
+                            data = self.download_file(filename)
+                            if data is not None:
+                                with compression.open_entry(zipf, filename) as entry:
+                                    entry.write(data)
+                            else:
+                                if self.logger:
+                                    self.logger.log_error(f"FTPWorker: Datei {filename} konnte nicht geladen werden, wird nicht ins ZIP gepackt.")
                 zip_data = zip_buffer.getvalue()
                 if self.logger:
                     self.logger.log_info(f"FTPWorker: ZIP-Archiv {zip_name} erstellt ({len(zip_data)} Bytes)")
@@ -99,3 +810,19 @@ class FTPWorker:
             if self.logger:
                 self.logger.log_error(f"FTPWorker Fehler beim Erstellen des ZIP-Archivs: {e}")
             return None
+
+
+def create_worker(settings: Dict[str, Any], logger: Logger = None, pool: Optional[FTPConnectionPool] = None,
+                  tmp_dir: Optional[str] = None) -> FTPWorker:
+    """
+    Erzeugt einen Worker für einen Server-Eintrag mit dem dort gewählten
+    Backend ("ftp_backend": "ftplib" oder "asyncio"). Das asyncio-Backend
+    verwaltet seine Sitzungen selbst und nutzt den Pool nicht.
+    """
+    backend = settings.get("ftp_backend") or "ftplib"
+    if backend not in BACKENDS:
+        raise ValueError(f"Unbekanntes FTP-Backend: {backend}")
+    if backend == "asyncio":
+        from core.async_ftp import AsyncFTPWorker
+        return AsyncFTPWorker.from_settings(settings, logger, tmp_dir=tmp_dir)
+    return FTPWorker.from_settings(settings, logger, pool=pool, tmp_dir=tmp_dir)
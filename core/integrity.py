@@ -0,0 +1,97 @@
+"""
+core/integrity.py
+
+Prüfsummen für Übertragungen und Backups ohne zweiten Lesedurchgang.
+
+StreamHasher wird blockweise in den Callbacks der Übertragung gefüttert und
+berechnet gleichzeitig einen kryptografischen Hash (SHA-256 oder BLAKE2b),
+CRC32 und die Größe. Damit prüft FTPWorker Uploads gegen HASH bzw. XCRC des
+Servers (sonst SIZE), und BackupLogic legt die Hashes aller Einträge als
+Manifest im ZIP-Archiv ab.
+"""
+
+import hashlib
+import json
+import time
+import zipfile
+import zlib
+from typing import Any, Dict, Optional
+
+HASH_ALGORITHMS = {
+    "sha256": hashlib.sha256,
+    "blake2b": hashlib.blake2b,
+}
+
+# Algorithmusnamen für den FTP-Befehl HASH (draft-bryan-ftpext-hash)
+FTP_HASH_NAMES = {
+    "sha256": "SHA-256",
+}
+
+# Manifest im ZIP-Archiv: Größe und Hash aller Einträge
+ARCHIVE_MANIFEST_NAME = ".backup_manifest.json"
+
+
+class StreamHasher:
+    """
+    Hash, CRC32 und Größe eines Datenstroms, blockweise fortgeschrieben.
+    """
+
+    def __init__(self, algorithm: str = "sha256"):
+        """
+        Args:
+            algorithm (str): "sha256" oder "blake2b".
+        """
+        if algorithm not in HASH_ALGORITHMS:
+            raise ValueError(f"Unbekannter Hash-Algorithmus: {algorithm}")
+        self.algorithm = algorithm
+        self._hash = HASH_ALGORITHMS[algorithm]()
+        self.crc32 = 0
+        self.size = 0
+
+    def update(self, block: bytes):
+        self._hash.update(block)
+        self.crc32 = zlib.crc32(block, self.crc32)
+        self.size += len(block)
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+    def digest_string(self) -> str:
+        """
+        Hash mit Algorithmus-Präfix, z.B. "sha256:9f86d0...".
+        """
+        return f"{self.algorithm}:{self.hexdigest()}"
+
+
+class HashingWriter:
+    """
+    Reicht geschriebene Blöcke an `target` weiter und aktualisiert dabei den Hasher.
+    """
+
+    def __init__(self, target, hasher: StreamHasher):
+        self.target = target
+        self.hasher = hasher
+
+    def write(self, block: bytes):
+        self.hasher.update(block)
+        self.target.write(block)
+
+
+def write_archive_manifest(zipf: zipfile.ZipFile, files: Dict[str, Dict[str, Any]], algorithm: str):
+    """
+    Schreibt das Manifest (Dateiname -> {"size", "hash"}) als letzten Eintrag ins Archiv.
+    """
+    manifest = {"algorithm": algorithm, "created": int(time.time()), "files": files}
+    zipf.writestr(ARCHIVE_MANIFEST_NAME, json.dumps(manifest, indent=2))
+
+
+def read_archive_manifest(zipf: zipfile.ZipFile) -> Optional[Dict[str, Any]]:
+    """
+    Liest das Manifest eines zum Lesen geöffneten Archivs (None bei älteren Archiven ohne Manifest).
+    """
+    if ARCHIVE_MANIFEST_NAME not in zipf.NameToInfo:
+        return None
+    try:
+        return json.loads(zipf.read(ARCHIVE_MANIFEST_NAME).decode("utf-8"))
+    except (ValueError, zipfile.BadZipFile):
+        return None
@@ -0,0 +1,122 @@
+"""
+core/listing_cache.py
+
+Zwischenspeicher für Verzeichnislisten (MLSD bzw. NLST) mit Ablaufzeit.
+
+Backup, Index-Update und die Oberfläche listen innerhalb weniger Sekunden
+dasselbe Verzeichnis. Der Cache hält jede Liste samt MLSD-Fakten für `ttl`
+Sekunden, pro Server, Benutzer, FTP-Verzeichnis und Unterverzeichnis (je
+Benutzer kann der Server ein anderes Wurzelverzeichnis und andere Rechte
+zeigen). Eigene Änderungen (Upload, Umbenennen, Löschen, MKD) verwerfen die
+betroffenen Verzeichnisse sofort; Änderungen anderer Clients werden erst nach
+Ablauf der TTL sichtbar. Backups listen deshalb immer frisch vom Server.
+"""
+
+import copy
+import posixpath
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from core.metrics import get_registry
+
+DEFAULT_TTL = 30.0
+MAX_ENTRIES = 256
+
+# Fakten, die per OPTS MLST angefordert werden (unbekannte ignoriert der Server)
+MLSD_FACTS = ["type", "size", "modify", "perm", "unique"]
+
+CacheKey = Tuple[str, int, str, str, str]
+Listing = Dict[str, Dict[str, str]]
+
+LISTING_CACHE_LOOKUPS = get_registry().counter(
+    "ftp_listing_cache_lookups_total", "Abfragen des Verzeichnis-Caches nach Ergebnis", ["server", "result"])
+
+
+def _directory_of(path: str) -> str:
+    return posixpath.dirname(path.strip("/"))
+
+
+class ListingCache:
+    """
+    Thread-sicherer Cache: (Host, Port, Benutzer, FTP-Verzeichnis,
+    Unterverzeichnis) -> (Liste, Quelle). Die Quelle ist "MLSD", "NLST" oder "NLST/SIZE/MDTM".
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL, max_entries: int = MAX_ENTRIES):
+        """
+        Args:
+            ttl (float): Gültigkeit einer Liste in Sekunden (0 = Cache aus).
+            max_entries (int): Höchstzahl gespeicherter Verzeichnisse; die ältesten fallen heraus.
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict[CacheKey, Tuple[float, Listing, str]] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, ttl: float = DEFAULT_TTL):
+        """
+        Setzt die TTL (zur Laufzeit möglich) und leert den Cache.
+        """
+        self.ttl = float(ttl)
+        self.clear()
+
+    @staticmethod
+    def make_key(host: str, port: int, username: str, ftp_dir: str, path: str = "") -> CacheKey:
+        return (host, int(port), username, ftp_dir or "/", path.strip("/"))
+
+    def get(self, key: CacheKey) -> Optional[Tuple[Listing, str]]:
+        """
+        Liefert (Liste, Quelle) als Kopie oder None, wenn nichts Gültiges vorliegt.
+        """
+        if self.ttl <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+        LISTING_CACHE_LOOKUPS.inc(server=key[0], result="hit" if entry else "miss")
+        if entry is None:
+            return None
+        return copy.deepcopy(entry[1]), entry[2]
+
+    def put(self, key: CacheKey, listing: Listing, source: str):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), copy.deepcopy(listing), source)
+            if len(self._entries) > self.max_entries:
+                oldest = min(self._entries, key=lambda k: self._entries[k][0])
+                del self._entries[oldest]
+
+    def invalidate(self, host: str, port: int, ftp_dir: str, path: str):
+        """
+        Verwirft die Liste des Verzeichnisses, in dem `path` liegt, sowie `path`
+        selbst samt Unterverzeichnissen (falls es ein Verzeichnis ist), für alle
+        Benutzer: andere Konten sehen auf demselben Server oft dieselben Dateien.
+        """
+        server = (host, int(port))
+        directory = ftp_dir or "/"
+        parent = _directory_of(path)
+        target = path.strip("/")
+        with self._lock:
+            for key in list(self._entries):
+                if key[:2] != server or key[3] != directory:
+                    continue
+                if key[4] in (parent, target) or key[4].startswith(target + "/"):
+                    del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+
+
+_default_cache = ListingCache()
+
+
+def get_default_listing_cache() -> ListingCache:
+    """
+    Liefert den prozessweiten Cache, den alle FTPWorker standardmäßig teilen.
+    """
+    return _default_cache
@@ -1,30 +1,189 @@
 # core/logger.py
 
+import atexit
+import json
 import logging
+import logging.handlers
+import os
+import queue
 import sys
+import threading
 from datetime import datetime
 
+LOGGER_NAME = "UpdaterLogger"
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Gemeinsame Pipeline aller Logger-Instanzen: die Aufrufer legen Einträge nur
+# in die Queue, ein einzelner Hintergrund-Thread schreibt Konsole und Dateien.
+_lock = threading.RLock()
+_queue = queue.SimpleQueue()
+_queue_handler = None
+_listener = None
+_handlers = {}
+_json_enabled = False
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formatiert strukturierte Ereignisse (siehe Logger.log_event) als eine
+    JSON-Zeile pro Eintrag.
+    """
+
+    def format(self, record) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+        }
+        entry.update(getattr(record, "event", {}))
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def _is_text_record(record) -> bool:
+    # Strukturierte Ereignisse erscheinen nur in der JSON-Datei
+    return not hasattr(record, "event")
+
+
+def _is_event_record(record) -> bool:
+    return hasattr(record, "event")
+
+
+class SizedTimedRotatingFileHandler(logging.handlers.TimedRotatingFileHandler):
+    """
+    Rotiert nach Zeit (z.B. täglich) und zusätzlich, sobald die Datei
+    `max_bytes` überschreitet. Mehrere Rotationen im selben Zeitraum erhalten
+    eine laufende Nummer (app.log.2025-06-19, app.log.2025-06-19.1, ...).
+    """
+
+    def __init__(self, filename: str, max_bytes: int = 0, when: str = "midnight",
+                 backup_count: int = 0, encoding: str = "utf-8"):
+        super().__init__(filename, when=when, backupCount=backup_count, encoding=encoding, delay=True)
+        self.max_bytes = max_bytes
+
+    def shouldRollover(self, record) -> bool:
+        if super().shouldRollover(record):
+            return True
+        if self.max_bytes <= 0:
+            return False
+        if self.stream is None:
+            self.stream = self._open()
+        message = "%s\n" % self.format(record)
+        return self.stream.tell() + len(message.encode(self.encoding or "utf-8")) >= self.max_bytes
+
+    def rotation_filename(self, default_name: str) -> str:
+        name = super().rotation_filename(default_name)
+        counter = 1
+        candidate = name
+        while os.path.exists(candidate):
+            candidate = f"{name}.{counter}"
+            counter += 1
+        return candidate
+
+
+def _start_listener():
+    global _listener
+    with _lock:
+        if _listener is None and _handlers:
+            _listener = logging.handlers.QueueListener(
+                _queue, *_handlers.values(), respect_handler_level=True)
+            _listener.start()
+
+
+def _stop_listener():
+    global _listener
+    with _lock:
+        if _listener is not None:
+            # Leert die Queue, bevor der Thread endet
+            _listener.stop()
+            _listener = None
+
+
+def _add_handler(key: str, handler: logging.Handler, structured: bool = False):
+    # Muss mit gehaltenem _lock aufgerufen werden
+    global _json_enabled
+    if structured:
+        handler.setFormatter(JsonFormatter())
+        handler.addFilter(_is_event_record)
+        _json_enabled = True
+    else:
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        handler.addFilter(_is_text_record)
+    _handlers[key] = handler
+    _stop_listener()
+    _start_listener()
+
+
+def shutdown_logging():
+    """
+    Schreibt alle ausstehenden Einträge und schließt die Log-Dateien.
+    Wird beim Programmende automatisch aufgerufen.
+    """
+    global _json_enabled
+    with _lock:
+        _stop_listener()
+        for handler in _handlers.values():
+            handler.close()
+        _handlers.clear()
+        _json_enabled = False
+
+
+atexit.register(shutdown_logging)
+if hasattr(os, "register_at_fork"):
+    # Der Listener-Thread überlebt fork() nicht (z.B. headless --daemon)
+    os.register_at_fork(before=_stop_listener, after_in_parent=_start_listener,
+                        after_in_child=_start_listener)
+
+
 class Logger:
     """
     Logger-Klasse zur zentralen Protokollierung.
     Unterstützt verschiedene Level: INFO, WARNING, ERROR.
+
+    Alle Instanzen teilen sich eine Queue-basierte Pipeline: log_*-Aufrufe
+    (auch aus FTP-Callbacks) blockieren nicht auf Konsole oder Datei. Jeder
+    Handler wird nur einmal angelegt, egal wie viele Instanzen es gibt.
+
+    Optional werden strukturierte Ereignisse (Übertragungen, Updates, Backups)
+    als JSON-Zeilen in eine eigene Datei geschrieben.
     """
 
-    def __init__(self, log_file: str = None, level=logging.INFO):
-        self.logger = logging.getLogger("UpdaterLogger")
+    def __init__(self, log_file: str = None, level=logging.INFO, max_bytes: int = 10 * 1024 * 1024,
+                 backup_count: int = 7, when: str = "midnight", json_file: str = None):
+        """
+        :param log_file: Optionale Log-Datei (rotiert nach Zeit und Größe)
+        :param level: Log-Level
+        :param max_bytes: Maximale Größe der Log-Datei vor der Rotation (0 = unbegrenzt)
+        :param backup_count: Anzahl aufbewahrter rotierter Dateien
+        :param when: Zeitbasierte Rotation, siehe TimedRotatingFileHandler (z.B. "midnight")
+        :param json_file: Optionale Datei für strukturierte Ereignisse (JSON Lines)
+        """
+        global _queue_handler
+        self.logger = logging.getLogger(LOGGER_NAME)
         self.logger.setLevel(level)
-        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
 
-        # Konsolenausgabe
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setFormatter(formatter)
-        self.logger.addHandler(console_handler)
+        with _lock:
+            if _queue_handler is None:
+                _queue_handler = logging.handlers.QueueHandler(_queue)
+            if _queue_handler not in self.logger.handlers:
+                self.logger.addHandler(_queue_handler)
 
-        # Optional: Datei-Logging
-        if log_file:
-            file_handler = logging.FileHandler(log_file, encoding='utf-8')
-            file_handler.setFormatter(formatter)
-            self.logger.addHandler(file_handler)
+            # Konsolenausgabe
+            if "console" not in _handlers:
+                _add_handler("console", logging.StreamHandler(sys.stdout))
+
+            # Optional: Datei-Logging
+            if log_file:
+                log_file = os.path.abspath(log_file)
+                if log_file not in _handlers:
+                    _add_handler(log_file, SizedTimedRotatingFileHandler(
+                        log_file, max_bytes=max_bytes, when=when, backup_count=backup_count))
+
+            # Optional: strukturierte Ereignisse als JSON Lines
+            if json_file:
+                json_file = os.path.abspath(json_file)
+                if json_file not in _handlers:
+                    _add_handler(json_file, SizedTimedRotatingFileHandler(
+                        json_file, max_bytes=max_bytes, when=when, backup_count=backup_count),
+                        structured=True)
 
     def log_info(self, message: str):
         self.logger.info(message)
@@ -34,3 +193,20 @@ class Logger:
 
     def log_error(self, message: str):
         self.logger.error(message)
+
+    def log_event(self, operation: str, outcome: str = "ok", **fields):
+        """
+        Schreibt ein strukturiertes Ereignis in die JSON-Datei, z.B.
+        log_event("download", file="a.sav", bytes=1024, duration_ms=12.5, server="host").
+        Ohne json_file wird nichts getan.
+
+        :param operation: Art des Vorgangs (download, upload, rename, backup, index_update, ...)
+        :param outcome: "ok" oder "error"
+        :param fields: Weitere Felder wie file, bytes, duration_ms, server, error
+        """
+        if not _json_enabled:
+            return
+        level = logging.INFO if outcome == "ok" else logging.ERROR
+        event = {"operation": operation, "outcome": outcome}
+        event.update(fields)
+        self.logger.log(level, operation, extra={"event": event})
@@ -0,0 +1,114 @@
+"""
+core/parallel_download.py
+
+Paralleler Download mehrerer Dateien über eigene FTP-Sitzungen.
+
+Jeder Worker-Thread nutzt einen eigenen FTPWorker (und damit eine eigene
+Steuerverbindung). Die Ergebnisse werden in der Reihenfolge der Eingabeliste
+geliefert, sobald sie fertig sind, sodass Archive deterministisch aufgebaut
+werden. Fertige Dateien liegen in SpooledTemporaryFiles: kleine Dateien im
+Speicher, große auf der Platte.
+"""
+
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Iterator, List, Optional, Tuple
+
+from core.ftp_worker import FTPWorker
+from core.logger import Logger
+
+
+class ParallelDownloader:
+    """
+    Begrenzter Thread-Pool für Downloads mit einer FTP-Sitzung pro Worker.
+    """
+
+    def __init__(self, ftp_worker: FTPWorker, max_connections: int = 4,
+                 spool_dir: Optional[str] = None, spool_threshold: int = 1024 * 1024,
+                 logger: Optional[Logger] = None):
+        """
+        Args:
+            ftp_worker (FTPWorker): Vorlage für die Verbindungsdaten der Worker.
+            max_connections (int): Anzahl paralleler FTP-Verbindungen.
+            spool_dir (str, optional): Verzeichnis für ausgelagerte Zwischendateien.
+            spool_threshold (int): Ab dieser Größe (Bytes) wird auf die Platte ausgelagert.
+            logger (Logger, optional): Logger für Protokollierung.
+        """
+        self.ftp_worker = ftp_worker
+        self.max_connections = max(1, int(max_connections))
+        self.spool_dir = spool_dir
+        self.spool_threshold = spool_threshold
+        self.logger = logger or ftp_worker.logger
+        self._local = threading.local()
+        self._workers: List[FTPWorker] = []
+        self._workers_lock = threading.Lock()
+
+    def _get_worker(self) -> FTPWorker:
+        worker = getattr(self._local, "worker", None)
+        if worker is None or not worker.is_connected():
+            worker = self.ftp_worker.clone()
+            if not worker.connect():
+                raise ConnectionError(f"Keine Verbindung zu {worker.host} möglich")
+            self._local.worker = worker
+            with self._workers_lock:
+                self._workers.append(worker)
+        return worker
+
+    def _download(self, filename: str) -> Optional[IO[bytes]]:
+        spool = tempfile.SpooledTemporaryFile(max_size=self.spool_threshold, dir=self.spool_dir)
+        try:
+            received = self._get_worker().download_stream(filename, spool.write)
+        except Exception as e:
+            if self.logger:
+                self.logger.log_error(f"ParallelDownloader: Fehler bei {filename}: {e}")
+            received = None
+        if received is None:
+            spool.close()
+            return None
+        spool.seek(0)
+        return spool
+
+    def iter_downloads(self, filenames: List[str]) -> Iterator[Tuple[str, Optional[IO[bytes]]]]:
+        """
+        Lädt die Dateien parallel herunter und liefert sie in Eingabereihenfolge.
+
+        Es sind höchstens doppelt so viele Dateien unterwegs wie Verbindungen,
+        damit der Zwischenspeicher begrenzt bleibt. Der Aufrufer muss die
+        gelieferten Dateiobjekte schließen. Bei Fehlern wird None geliefert.
+
+        Yields:
+            Tuple[str, Optional[IO[bytes]]]: Dateiname und Inhalt (positioniert auf 0).
+        """
+        window = self.max_connections * 2
+        pending = deque()
+        names = iter(filenames)
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_connections,
+                                    thread_name_prefix="ftp-download") as executor:
+                for filename in names:
+                    pending.append((filename, executor.submit(self._download, filename)))
+                    if len(pending) >= window:
+                        break
+                while pending:
+                    filename, future = pending.popleft()
+                    next_name = next(names, None)
+                    if next_name is not None:
+                        pending.append((next_name, executor.submit(self._download, next_name)))
+                    yield filename, future.result()
+        finally:
+            for _, future in pending:
+                result = future.result() if future.done() else None
+                if result is not None:
+                    result.close()
+            self.close()
+
+    def close(self):
+        """
+        Trennt alle Worker-Verbindungen bzw. gibt sie an den Pool zurück.
+        """
+        with self._workers_lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.disconnect()
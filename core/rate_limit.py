@@ -0,0 +1,259 @@
+"""
+core/rate_limit.py
+
+Bandbreitenbegrenzung für FTP-Übertragungen (Token-Bucket).
+
+Jeder übertragene Block wird nacheinander gegen drei Buckets gebucht: einen
+pro Übertragung, einen pro Server (Host) und einen globalen. Die Grenzen
+sind zur Laufzeit änderbar und können über einen Zeitplan gesteuert werden,
+z.B. nachts volle Geschwindigkeit und während der Spielzeiten gedrosselt.
+Ohne Konfiguration ist nichts begrenzt und die Prüfung kostet nur einen
+Attributzugriff pro Block.
+
+Konfiguration ("bandwidth" in der config.json, Werte in KiB/s, 0 = unbegrenzt):
+    {"global_kib_s": 0, "server_kib_s": 4096, "transfer_kib_s": 0,
+     "schedule": [{"from": "16:00", "to": "01:00", "server_kib_s": 512}]}
+"""
+
+import threading
+import time
+from datetime import datetime
+from datetime import time as dtime
+from typing import Any, Dict, List, Optional
+
+from core.logger import Logger
+from core.metrics import get_registry
+
+# Mindestgröße des Buckets, damit übliche Blockgrößen ohne Wartezeit passen
+MIN_BURST = 64 * 1024
+# Bucket-Größe als Anteil der Rate (in Sekunden)
+BURST_SECONDS = 0.25
+# Wie oft (Sekunden) der Zeitplan höchstens neu ausgewertet wird
+SCHEDULE_CHECK_INTERVAL = 5.0
+
+LIMITS = ("global", "server", "transfer")
+
+RATE_LIMIT_WAIT_SECONDS = get_registry().counter(
+    "ftp_rate_limit_wait_seconds_total", "Wartezeit durch Bandbreitenbegrenzung in Sekunden", ["server"])
+
+
+def kib_to_rate(value: Any) -> Optional[float]:
+    """
+    Wandelt KiB/s aus der Konfiguration in Bytes/s um (0 bzw. None = unbegrenzt).
+    """
+    return float(value) * 1024 if value else None
+
+
+class TokenBucket:
+    """
+    Thread-sicherer Token-Bucket. Verbraucher dürfen den Bucket überziehen
+    und warten dann, bis die Schuld abgetragen ist; so werden auch Blöcke
+    größer als der Bucket korrekt begrenzt.
+    """
+
+    def __init__(self, rate: Optional[float] = None, burst: Optional[float] = None):
+        """
+        Args:
+            rate (float, optional): Bytes pro Sekunde (None = unbegrenzt).
+            burst (float, optional): Bucket-Größe in Bytes (Standard: abhängig von der Rate).
+        """
+        self._lock = threading.Lock()
+        self.rate: Optional[float] = None
+        self.set_rate(rate, burst)
+
+    def set_rate(self, rate: Optional[float], burst: Optional[float] = None):
+        with self._lock:
+            self.rate = float(rate) if rate else None
+            self.burst = float(burst) if burst else max(MIN_BURST, (self.rate or 0) * BURST_SECONDS)
+            self._tokens = self.burst
+            self._updated = time.monotonic()
+
+    def consume(self, amount: int) -> float:
+        """
+        Bucht `amount` Bytes und wartet bei Bedarf.
+
+        Returns:
+            float: Gewartete Zeit in Sekunden.
+        """
+        if self.rate is None:
+            return 0.0
+        with self._lock:
+            rate = self.rate
+            if rate is None:
+                return 0.0
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * rate)
+            self._updated = now
+            self._tokens -= amount
+            wait = -self._tokens / rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class BandwidthRule:
+    """
+    Zeitfenster mit eigenen Grenzen; fehlende Grenzen gelten wie ohne Zeitplan.
+    Fenster dürfen über Mitternacht reichen ("from": "22:00", "to": "06:00").
+    """
+
+    def __init__(self, start: dtime, end: dtime, limits: Dict[str, Optional[float]]):
+        self.start = start
+        self.end = end
+        self.limits = limits
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any]) -> "BandwidthRule":
+        start = datetime.strptime(settings["from"], "%H:%M").time()
+        end = datetime.strptime(settings["to"], "%H:%M").time()
+        limits = {name: kib_to_rate(settings[f"{name}_kib_s"]) for name in LIMITS if f"{name}_kib_s" in settings}
+        return cls(start, end, limits)
+
+    def matches(self, moment: dtime) -> bool:
+        if self.start <= self.end:
+            return self.start <= moment < self.end
+        return moment >= self.start or moment < self.end
+
+
+class Transfer:
+    """
+    Begrenzung einer einzelnen Übertragung; consume() als Block-Callback verwenden.
+    """
+
+    def __init__(self, limiter: "RateLimiter", server: str):
+        self.limiter = limiter
+        self.server = server
+        self.bucket = TokenBucket(limiter.limits["transfer"])
+        self.buckets = [self.bucket, limiter.server_bucket(server), limiter.global_bucket]
+        self.waited = 0.0
+
+    def consume(self, amount: int):
+        self.limiter.refresh()
+        if self.bucket.rate != self.limiter.limits["transfer"]:
+            self.bucket.set_rate(self.limiter.limits["transfer"])
+        waited = 0.0
+        for bucket in self.buckets:
+            waited += bucket.consume(amount)
+        if waited:
+            self.waited += waited
+            RATE_LIMIT_WAIT_SECONDS.inc(waited, server=self.server)
+
+
+class RateLimiter:
+    """
+    Verwaltet globale und Server-Buckets sowie den Zeitplan.
+    """
+
+    def __init__(self, global_rate: Optional[float] = None, server_rate: Optional[float] = None,
+                 transfer_rate: Optional[float] = None, schedule: Optional[List[BandwidthRule]] = None,
+                 logger: Optional[Logger] = None):
+        """
+        Args:
+            global_rate (float, optional): Grenze für alle Übertragungen zusammen (Bytes/s).
+            server_rate (float, optional): Grenze pro Server (Bytes/s).
+            transfer_rate (float, optional): Grenze pro Übertragung (Bytes/s).
+            schedule (List[BandwidthRule], optional): Zeitfenster mit abweichenden Grenzen
+                (die erste passende Regel gilt).
+            logger (Logger, optional): Logger für Protokollierung.
+        """
+        self.logger = logger
+        self._lock = threading.Lock()
+        self.base = {"global": global_rate, "server": server_rate, "transfer": transfer_rate}
+        self.schedule = schedule or []
+        self.limits: Dict[str, Optional[float]] = dict(self.base)
+        self.global_bucket = TokenBucket(global_rate)
+        self._server_buckets: Dict[str, TokenBucket] = {}
+        self._server_overrides: Dict[str, Optional[float]] = {}
+        self._checked = 0.0
+        self.refresh(force=True)
+
+    def apply_settings(self, settings: Optional[Dict[str, Any]], logger: Optional[Logger] = None):
+        """
+        Übernimmt die Grenzen aus dem Abschnitt "bandwidth" der Konfiguration
+        (zur Laufzeit möglich, laufende Übertragungen passen sich an).
+        """
+        settings = settings or {}
+        if logger is not None:
+            self.logger = logger
+        self.configure(kib_to_rate(settings.get("global_kib_s")), kib_to_rate(settings.get("server_kib_s")),
+                       kib_to_rate(settings.get("transfer_kib_s")),
+                       [BandwidthRule.from_settings(rule) for rule in settings.get("schedule", [])])
+
+    def configure(self, global_rate: Optional[float] = None, server_rate: Optional[float] = None,
+                  transfer_rate: Optional[float] = None, schedule: Optional[List[BandwidthRule]] = None):
+        with self._lock:
+            self.base = {"global": global_rate, "server": server_rate, "transfer": transfer_rate}
+            self.schedule = schedule or []
+        self.refresh(force=True)
+
+    def set_server_rate(self, server: str, rate: Optional[float]):
+        """
+        Eigene Grenze für einen Server (Bytes/s, 0 = unbegrenzt); None hebt sie auf,
+        dann gilt wieder die allgemeine Server-Grenze. Hat Vorrang vor dem Zeitplan.
+        """
+        with self._lock:
+            if rate is None:
+                self._server_overrides.pop(server, None)
+            else:
+                self._server_overrides[server] = rate or None
+            bucket = self._server_buckets.get(server)
+        if bucket is not None:
+            bucket.set_rate(self._server_rate(server))
+
+    def _server_rate(self, server: str) -> Optional[float]:
+        return self._server_overrides.get(server, self.limits["server"])
+
+    def server_bucket(self, server: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._server_buckets.get(server)
+            if bucket is None:
+                bucket = self._server_buckets[server] = TokenBucket(self._server_rate(server))
+            return bucket
+
+    def transfer(self, server: str) -> Transfer:
+        return Transfer(self, server)
+
+    def current_limits(self, moment: Optional[datetime] = None) -> Dict[str, Optional[float]]:
+        """
+        Grenzen zum Zeitpunkt `moment` (Standard: jetzt) unter Berücksichtigung des Zeitplans.
+        """
+        moment = (moment or datetime.now()).time()
+        for rule in self.schedule:
+            if rule.matches(moment):
+                return dict(self.base, **rule.limits)
+        return dict(self.base)
+
+    def refresh(self, force: bool = False):
+        """
+        Wertet den Zeitplan aus (höchstens alle SCHEDULE_CHECK_INTERVAL Sekunden)
+        und passt die Buckets bei geänderten Grenzen an.
+        """
+        now = time.monotonic()
+        if not force and now - self._checked < SCHEDULE_CHECK_INTERVAL:
+            return
+        with self._lock:
+            self._checked = now
+            limits = self.current_limits()
+            if limits == self.limits and not force:
+                return
+            self.limits = limits
+            buckets = list(self._server_buckets.items())
+        if self.global_bucket.rate != limits["global"]:
+            self.global_bucket.set_rate(limits["global"])
+        for server, bucket in buckets:
+            rate = self._server_rate(server)
+            if bucket.rate != rate:
+                bucket.set_rate(rate)
+        if self.logger and not force:
+            self.logger.log_info("RateLimiter: Bandbreite angepasst (KiB/s: " + ", ".join(
+                f"{name}={int(value / 1024) if value else 'unbegrenzt'}" for name, value in limits.items()) + ")")
+
+
+_default_limiter = RateLimiter()
+
+
+def get_default_limiter() -> RateLimiter:
+    """
+    Liefert den prozessweiten RateLimiter (ohne Konfiguration unbegrenzt).
+    """
+    return _default_limiter
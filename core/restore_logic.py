@@ -0,0 +1,251 @@
+"""
+core/restore_logic.py
+
+Wiederherstellung von Backups auf den FTP-Server.
+
+Ausgewählte Einträge eines ZIP-Archivs oder Snapshots werden direkt aus dem
+Archiv bzw. Blob-Speicher hochgeladen, ohne sie vorher auf die Platte zu
+entpacken. Jede Datei wird unter einem temporären Namen hochgeladen, per
+HASH, XCRC oder SIZE geprüft und dann per RNFR/RNTO an ihren Platz gebracht. Dateien, deren
+entfernte Kopie laut XCRC bzw. HASH bereits identisch ist, werden
+übersprungen.
+"""
+
+import hashlib
+import os
+import threading
+import time
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Any, Dict, List, Optional
+
+from core.ftp_worker import FTPWorker
+from core.integrity import ARCHIVE_MANIFEST_NAME, read_archive_manifest
+from core.logger import Logger
+from core.snapshot_store import SnapshotStore
+
+TEMP_SUFFIX = ".restore.tmp"
+
+
+class RestoreLogic:
+    """
+    Spielt Dateien aus ZIP-Backups oder Snapshots auf den FTP-Server zurück.
+    """
+
+    def __init__(self, ftp_worker: FTPWorker, backup_dir: str, logger: Logger, parallel_connections: int = 1):
+        """
+        Args:
+            ftp_worker (FTPWorker): FTP-Worker des Zielservers.
+            backup_dir (str): Backup-Ordner (ZIP-Archive bzw. `store/` für Snapshots).
+            logger (Logger): Logger für Protokollierung.
+            parallel_connections (int): Anzahl paralleler Upload-Verbindungen.
+        """
+        self.ftp_worker = ftp_worker
+        self.backup_dir = backup_dir
+        self.logger = logger
+        self.parallel_connections = max(1, int(parallel_connections))
+        store_dir = os.path.join(backup_dir, "store")
+        self.store = SnapshotStore(store_dir, logger) if os.path.isdir(store_dir) else None
+        self._local = threading.local()
+        self._workers: List[FTPWorker] = []
+        self._archives: List[zipfile.ZipFile] = []
+        self._workers_lock = threading.Lock()
+
+    # --- Quelle ------------------------------------------------------------
+
+    def _is_archive(self, backup_name: str) -> bool:
+        return backup_name.endswith(".zip")
+
+    def list_backup_entries(self, backup_name: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Liefert die Dateien eines Backups mit Größe und Prüfsumme, ohne sie zu entpacken.
+
+        Returns:
+            Optional[Dict[str, Dict[str, Any]]]: Dateiname -> {"size", "crc32"} (ZIP)
+                bzw. {"size", "sha256"} (Snapshot); None, falls das Backup fehlt.
+        """
+        try:
+            if self._is_archive(backup_name):
+                with zipfile.ZipFile(os.path.join(self.backup_dir, backup_name)) as zipf:
+                    entries = {info.filename: {"size": info.file_size, "crc32": info.CRC}
+                               for info in zipf.infolist()
+                               if not info.is_dir() and info.filename != ARCHIVE_MANIFEST_NAME}
+                    # SHA-256 aus dem Manifest erspart das Nachrechnen für HASH
+                    manifest = read_archive_manifest(zipf) or {}
+                    for name, meta in manifest.get("files", {}).items():
+                        if name in entries and str(meta.get("hash", "")).startswith("sha256:"):
+                            entries[name]["sha256"] = meta["hash"][len("sha256:"):]
+                    return entries
+            if self.store is not None:
+                snapshot = self.store.load_snapshot(backup_name)
+                if snapshot is not None:
+                    return {name: {"size": meta["size"], "sha256": meta["hash"]}
+                            for name, meta in snapshot.get("files", {}).items()}
+        except (OSError, zipfile.BadZipFile) as e:
+            self.logger.log_error(f"RestoreLogic: Backup {backup_name} nicht lesbar: {e}")
+            return None
+        self.logger.log_error(f"RestoreLogic: Backup {backup_name} nicht gefunden.")
+        return None
+
+    def _open_entry(self, backup_name: str, filename: str, meta: Dict[str, Any]) -> IO[bytes]:
+        if not self._is_archive(backup_name):
+            return self.store.open_blob(meta["sha256"])
+        # Pro Thread ein eigenes ZipFile-Objekt, damit parallele Leser sich nicht stören
+        archives = getattr(self._local, "archives", None)
+        if archives is None:
+            archives = self._local.archives = {}
+        if backup_name not in archives:
+            archives[backup_name] = zipfile.ZipFile(os.path.join(self.backup_dir, backup_name))
+            with self._workers_lock:
+                self._archives.append(archives[backup_name])
+        return archives[backup_name].open(filename)
+
+    def _local_checksum(self, backup_name: str, filename: str, meta: Dict[str, Any], kind: str):
+        # Fehlende Prüfsumme (CRC32 bei Snapshots, SHA-256 bei ZIP) aus dem Inhalt berechnen
+        if kind in meta:
+            return meta[kind]
+        crc, digest = 0, hashlib.sha256()
+        with self._open_entry(backup_name, filename, meta) as source:
+            for block in iter(lambda: source.read(1024 * 1024), b""):
+                if kind == "crc32":
+                    crc = zlib.crc32(block, crc)
+                else:
+                    digest.update(block)
+        meta[kind] = crc if kind == "crc32" else digest.hexdigest()
+        return meta[kind]
+
+    def _is_identical(self, backup_name: str, filename: str, meta: Dict[str, Any]) -> bool:
+        """
+        Prüft per XCRC bzw. HASH, ob die entfernte Datei dem Backup entspricht.
+        Ohne Prüfsummenbefehl auf dem Server wird nie übersprungen.
+        """
+        remote_crc = self.ftp_worker.get_crc32(filename)
+        if remote_crc is not None:
+            return remote_crc == self._local_checksum(backup_name, filename, meta, "crc32")
+        remote_hash = self.ftp_worker.get_hash(filename, "SHA-256")
+        if remote_hash is not None:
+            return remote_hash == self._local_checksum(backup_name, filename, meta, "sha256")
+        return False
+
+    # --- Upload ------------------------------------------------------------
+
+    def _get_worker(self) -> FTPWorker:
+        if self.parallel_connections == 1:
+            return self.ftp_worker
+        worker = getattr(self._local, "worker", None)
+        if worker is None or not worker.is_connected():
+            worker = self.ftp_worker.clone()
+            if not worker.connect():
+                raise ConnectionError(f"Keine Verbindung zu {worker.host} möglich")
+            self._local.worker = worker
+            with self._workers_lock:
+                self._workers.append(worker)
+        return worker
+
+    def _upload(self, backup_name: str, filename: str, meta: Dict[str, Any]) -> bool:
+        """
+        Lädt einen Eintrag unter temporärem Namen hoch (FTPWorker prüft ihn per
+        HASH, XCRC oder SIZE) und ersetzt dann die Zieldatei.
+        """
+        temp_name = filename + TEMP_SUFFIX
+        try:
+            worker = self._get_worker()
+            with self._open_entry(backup_name, filename, meta) as source:
+                if not worker.upload_fileobj(temp_name, source, size=meta["size"]):
+                    worker.delete_file(temp_name)
+                    return False
+            return worker.rename_file(temp_name, filename)
+        except Exception as e:
+            self.logger.log_error(f"RestoreLogic: Fehler beim Wiederherstellen von {filename}: {e}")
+            return False
+
+    def _close_workers(self):
+        # Auch die ZipFile-Objekte der Upload-Threads schließen, nicht nur die eigenen
+        with self._workers_lock:
+            workers, self._workers = self._workers, []
+            archives, self._archives = self._archives, []
+        for worker in workers:
+            worker.disconnect()
+        for archive in archives:
+            archive.close()
+
+    def _verify_size(self, remote: Dict[str, Dict[str, Any]], filename: str, size: int) -> bool:
+        # Fehlt die Datei in der Liste, gilt sie als nicht wiederhergestellt;
+        # ohne Größe in der Liste wird per SIZE nachgefragt
+        if filename not in remote:
+            return False
+        remote_size = remote[filename].get("size")
+        if remote_size is None:
+            remote_size = self.ftp_worker.get_size(filename)
+        return remote_size in (None, size)
+
+    def restore(self, backup_name: str, filenames: Optional[List[str]] = None, skip_identical: bool = True) -> bool:
+        """
+        Stellt Dateien eines Backups auf dem FTP-Server wieder her.
+
+        Args:
+            backup_name (str): Name des ZIP-Archivs ("backup_...zip") oder Snapshots ("backup_...").
+            filenames (List[str], optional): Nur diese Dateien wiederherstellen (Standard: alle).
+            skip_identical (bool): Dateien überspringen, deren entfernte Kopie laut
+                XCRC/HASH bereits identisch ist.
+
+        Returns:
+            bool: True wenn alle gewählten Dateien wiederhergestellt (oder identisch) sind.
+        """
+        started = time.monotonic()
+        entries = self.list_backup_entries(backup_name)
+        if entries is None:
+            return False
+        selected = list(entries) if filenames is None else list(filenames)
+        missing = [name for name in selected if name not in entries]
+        if missing:
+            self.logger.log_error(f"RestoreLogic: Nicht im Backup enthalten: {', '.join(missing)}")
+            return False
+
+        try:
+            with self.ftp_worker.session():
+                to_upload = []
+                remote = (self.ftp_worker.list_entries() or {}) if skip_identical else {}
+                for name in selected:
+                    meta = entries[name]
+                    same_size = remote.get(name, {}).get("size") == meta["size"]
+                    if skip_identical and same_size and self._is_identical(backup_name, name, meta):
+                        continue
+                    to_upload.append(name)
+
+                skipped = len(selected) - len(to_upload)
+                self.logger.log_info(
+                    f"RestoreLogic: Stelle {len(to_upload)} Dateien aus {backup_name} wieder her "
+                    f"({skipped} bereits identisch)...")
+
+                try:
+                    if self.parallel_connections > 1 and len(to_upload) > 1:
+                        with ThreadPoolExecutor(max_workers=self.parallel_connections,
+                                                thread_name_prefix="ftp-restore") as executor:
+                            results = list(executor.map(
+                                lambda name: self._upload(backup_name, name, entries[name]), to_upload))
+                    else:
+                        results = [self._upload(backup_name, name, entries[name]) for name in to_upload]
+                finally:
+                    self._close_workers()
+
+                # Abschließende Prüfung der Größen über eine einzige Verzeichnisliste
+                remote = self.ftp_worker.list_entries(fresh=True) or {}
+                failed = [name for name, ok in zip(to_upload, results)
+                          if not ok or not self._verify_size(remote, name, entries[name]["size"])]
+        except Exception as e:
+            self.logger.log_error(f"RestoreLogic: Ausnahmefehler: {e}")
+            return False
+        finally:
+            self._close_workers()
+            self._local.archives = {}
+
+        self.logger.log_event("restore", outcome="error" if failed else "ok", server=self.ftp_worker.host,
+                              duration_ms=round((time.monotonic() - started) * 1000, 1), file=backup_name,
+                              files=len(to_upload) - len(failed), skipped=skipped, failed=len(failed))
+        if failed:
+            self.logger.log_error(f"RestoreLogic: Wiederherstellung fehlgeschlagen für: {', '.join(failed)}")
+            return False
+        self.logger.log_info(f"RestoreLogic: {backup_name} erfolgreich wiederhergestellt.")
+        return True
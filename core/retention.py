@@ -0,0 +1,157 @@
+"""
+core/retention.py
+
+Aufbewahrungsregeln für Backups (Großvater-Vater-Sohn).
+
+Backups werden allein anhand des Zeitstempels im Namen eingeordnet
+(backup_YYYY-mm-dd_HH-MM-SS[.zip]), ohne die Archive zu öffnen. Behalten
+werden die letzten N Backups und zusätzlich je das neueste Backup der
+letzten X Stunden, Tage, Wochen und Monate; alles andere wird gelöscht.
+"""
+
+import os
+import re
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from core.logger import Logger
+from core.snapshot_store import SnapshotStore
+
+BACKUP_NAME_PATTERN = re.compile(r"^backup_(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})(\.zip)?$")
+TIMESTAMP_FORMAT = "%Y-%m-%d_%H-%M-%S"
+
+
+def parse_backup_timestamp(name: str) -> Optional[datetime]:
+    """
+    Liest den Zeitstempel aus einem Backup-Namen (z.B. "backup_2025-06-19_16-43-49.zip").
+
+    Returns:
+        Optional[datetime]: Zeitpunkt oder None, wenn der Name nicht passt.
+    """
+    match = BACKUP_NAME_PATTERN.match(name)
+    if not match:
+        return None
+    try:
+        return datetime.strptime(match.group(1), TIMESTAMP_FORMAT)
+    except ValueError:
+        return None
+
+
+# Schlüssel je Stufe: alle Backups mit gleichem Schlüssel liegen im selben Zeitraum
+TIERS: List[Tuple[str, Callable[[datetime], Any]]] = [
+    ("hourly", lambda t: (t.year, t.month, t.day, t.hour)),
+    ("daily", lambda t: t.date()),
+    ("weekly", lambda t: t.isocalendar()[:2]),
+    ("monthly", lambda t: (t.year, t.month)),
+]
+
+
+class RetentionPolicy:
+    """
+    GFS-Aufbewahrung: die letzten `keep_last` Backups plus je ein Backup pro
+    Stunde/Tag/Woche/Monat für die jeweils angegebene Anzahl an Zeiträumen.
+    """
+
+    def __init__(self, keep_last: int = 10, hourly: int = 0, daily: int = 0, weekly: int = 0, monthly: int = 0):
+        """
+        Args:
+            keep_last (int): Anzahl der neuesten Backups, die immer behalten werden (mindestens 1).
+            hourly (int): Anzahl Stunden, für die je das neueste Backup behalten wird.
+            daily (int): Anzahl Tage, für die je das neueste Backup behalten wird.
+            weekly (int): Anzahl Wochen, für die je das neueste Backup behalten wird.
+            monthly (int): Anzahl Monate, für die je das neueste Backup behalten wird.
+        """
+        self.keep_last = max(1, int(keep_last))
+        self.limits = {"hourly": int(hourly), "daily": int(daily), "weekly": int(weekly), "monthly": int(monthly)}
+
+    @classmethod
+    def from_settings(cls, rotation: Optional[int], tiers: Optional[Dict[str, int]] = None) -> Optional["RetentionPolicy"]:
+        """
+        Erstellt die Regeln aus der Konfiguration ("backup_rotation" und
+        "backup_retention" = {"hourly", "daily", "weekly", "monthly"}).
+
+        Returns:
+            Optional[RetentionPolicy]: None, wenn keine Aufbewahrung konfiguriert ist.
+        """
+        tiers = tiers or {}
+        if not rotation and not any(tiers.values()):
+            return None
+        return cls(rotation or 1, **{name: tiers.get(name, 0) for name, _ in TIERS})
+
+    def select(self, names: List[str]) -> Set[str]:
+        """
+        Bestimmt die zu behaltenden Backups. Namen ohne gültigen Zeitstempel
+        werden nie gelöscht.
+
+        Returns:
+            Set[str]: Namen der zu behaltenden Backups.
+        """
+        dated = []
+        keep = set()
+        for name in names:
+            timestamp = parse_backup_timestamp(name)
+            if timestamp is None:
+                keep.add(name)
+            else:
+                dated.append((timestamp, name))
+        dated.sort(reverse=True)
+
+        keep.update(name for _, name in dated[:self.keep_last])
+        for tier, bucket_of in TIERS:
+            limit = self.limits[tier]
+            seen = set()
+            for timestamp, name in dated:
+                if len(seen) >= limit:
+                    break
+                bucket = bucket_of(timestamp)
+                if bucket not in seen:
+                    seen.add(bucket)
+                    keep.add(name)
+        return keep
+
+    def prune_directory(self, backup_dir: str, logger: Optional[Logger] = None,
+                        protected: Optional[Set[str]] = None) -> List[str]:
+        """
+        Löscht ZIP-Backups im Ordner, die nach den Regeln nicht behalten werden.
+
+        Args:
+            backup_dir (str): Backup-Ordner.
+            logger (Logger, optional): Logger für Protokollierung.
+            protected (Set[str], optional): Dateinamen, die nie gelöscht werden
+                (z.B. Basis des inkrementellen Backups).
+
+        Returns:
+            List[str]: Gelöschte Dateinamen.
+        """
+        names = [name for name in os.listdir(backup_dir)
+                 if name.endswith(".zip") and parse_backup_timestamp(name)]
+        keep = self.select(names) | (protected or set())
+        deleted = []
+        for name in sorted(set(names) - keep):
+            try:
+                os.remove(os.path.join(backup_dir, name))
+                deleted.append(name)
+            except OSError as e:
+                if logger:
+                    logger.log_error(f"Retention: {name} konnte nicht gelöscht werden: {e}")
+        if logger and deleted:
+            logger.log_info(f"Retention: {len(deleted)} alte Backups gelöscht, {len(names) - len(deleted)} behalten.")
+        return deleted
+
+    def prune_store(self, store: SnapshotStore, logger: Optional[Logger] = None) -> List[str]:
+        """
+        Entfernt Snapshots, die nach den Regeln nicht behalten werden, und
+        anschließend nicht mehr referenzierte Blobs.
+
+        Returns:
+            List[str]: Gelöschte Snapshot-Namen.
+        """
+        names = store.list_snapshots()
+        deleted = sorted(set(names) - self.select(names))
+        for name in deleted:
+            store.delete_snapshot(name)
+        if deleted:
+            store.gc()
+            if logger:
+                logger.log_info(f"Retention: {len(deleted)} alte Snapshots gelöscht, {len(names) - len(deleted)} behalten.")
+        return deleted
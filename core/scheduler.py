@@ -1,20 +1,194 @@
 # core/scheduler.py
 
+import heapq
+import itertools
 import threading
 import time
 import logging
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Set, Tuple
+
+from core.metrics import get_registry
+
+# Verhalten bei verpassten Läufen (Task lief länger als das Intervall,
+# Pause, Suspend des Rechners):
+# - skip: verpasste Läufe verwerfen, nächster regulärer Termin
+# - coalesce: alle verpassten Läufe zu einem sofortigen Lauf zusammenfassen
+# - catchup: jeden verpassten Lauf nachholen
+MISFIRE_SKIP = "skip"
+MISFIRE_COALESCE = "coalesce"
+MISFIRE_CATCHUP = "catchup"
+MISFIRE_POLICIES = (MISFIRE_SKIP, MISFIRE_COALESCE, MISFIRE_CATCHUP)
+
+# Obergrenze für nachzuholende Läufe pro Job
+MAX_MISSED_RUNS = 1000
+
+# Wanduhr-Trigger werden spätestens nach dieser Zeit neu geprüft (Uhrsprünge)
+MAX_WAIT_SECONDS = 30.0
+
+SCHEDULER_JOB_SECONDS = get_registry().histogram(
+    "scheduler_job_duration_seconds", "Laufzeit der Scheduler-Jobs in Sekunden", ["job"])
+SCHEDULER_JOB_RUNS = get_registry().counter(
+    "scheduler_job_runs_total", "Scheduler-Läufe nach Ergebnis (ok, error, overlap)", ["job", "outcome"])
+SCHEDULER_MISSED_RUNS = get_registry().counter(
+    "scheduler_missed_runs_total", "Verpasste Termine der Scheduler-Jobs", ["job"])
+
+class IntervalTrigger:
+    """
+    Trigger für feste Intervalle (in Sekunden). Arbeitet auf time.monotonic(),
+    damit Uhrsprünge (NTP, Sommerzeit) das Intervall nicht verfälschen. Die
+    Termine sind am Plan verankert (nicht am Ende des letzten Laufs) und
+    driften daher nicht.
+    """
+
+    clock = staticmethod(time.monotonic)
+
+    def __init__(self, seconds: float):
+        if seconds <= 0:
+            raise ValueError("Intervall muss größer als 0 sein")
+        self.seconds = seconds
+
+    def next_run(self, after: float) -> float:
+        return after + self.seconds
+
+    def __repr__(self):
+        return f"IntervalTrigger({self.seconds}s)"
+
+class MinuteOfHourTrigger:
+    """
+    Trigger für feste Minuten jeder Stunde (z.B. [5, 35] = xx:05 und xx:35).
+    """
+
+    clock = staticmethod(time.time)
+
+    def __init__(self, minutes: List[int]):
+        minutes = sorted(set(int(m) for m in minutes))
+        if not minutes or minutes[0] < 0 or minutes[-1] > 59:
+            raise ValueError("Minuten müssen zwischen 0 und 59 liegen")
+        self.minutes = minutes
+
+    def next_run(self, after: float) -> float:
+        current = datetime.fromtimestamp(after).replace(second=0, microsecond=0)
+        for minute in self.minutes:
+            candidate = current.replace(minute=minute)
+            if candidate.timestamp() > after:
+                return candidate.timestamp()
+        next_hour = current.replace(minute=self.minutes[0]) + timedelta(hours=1)
+        return next_hour.timestamp()
+
+    def __repr__(self):
+        return f"MinuteOfHourTrigger({self.minutes})"
+
+class CronTrigger:
+    """
+    Cron-ähnlicher Trigger mit fünf Feldern: Minute Stunde Tag Monat Wochentag.
+    Unterstützt "*", Listen ("1,15"), Bereiche ("1-5") und Schritte ("*/10", "0-30/5").
+    Wochentag 0 bzw. 7 ist Sonntag.
+    """
+
+    _RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+    clock = staticmethod(time.time)
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron-Ausdruck braucht 5 Felder: {expression}")
+        self.expression = expression
+        parsed = [self._parse_field(field, lo, hi) for field, (lo, hi) in zip(fields, self._RANGES)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = {0 if d == 7 else d for d in weekdays}
+        self._days_restricted = fields[2] != "*"
+        self._weekdays_restricted = fields[4] != "*"
+
+    @staticmethod
+    def _parse_field(field: str, lo: int, hi: int) -> Set[int]:
+        values = set()
+        for part in field.split(","):
+            part, _, step_text = part.partition("/")
+            step = int(step_text) if step_text else 1
+            if part == "*":
+                start, end = lo, hi
+            elif "-" in part:
+                start, end = (int(x) for x in part.split("-", 1))
+            else:
+                start = int(part)
+                end = hi if step_text else start
+            if start < lo or end > hi or start > end or step < 1:
+                raise ValueError(f"Ungültiges Cron-Feld: {field}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        if self._days_restricted and self._weekdays_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_run(self, after: float) -> float:
+        moment = datetime.fromtimestamp(after).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * 5)
+        while moment < limit:
+            if moment.month not in self.months:
+                year, month = (moment.year + 1, 1) if moment.month == 12 else (moment.year, moment.month + 1)
+                moment = moment.replace(year=year, month=month, day=1, hour=0, minute=0)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment.timestamp()
+        raise ValueError(f"Cron-Ausdruck trifft nie zu: {self.expression}")
+
+    def __repr__(self):
+        return f"CronTrigger('{self.expression}')"
+
+class Job:
+    """
+    Eine geplante Aufgabe mit eigenem Trigger. `next_run` ist in der Uhr des
+    Triggers angegeben (monotonic bei Intervallen, Wanduhr sonst).
+    """
+
+    def __init__(self, name: str, task: Callable[[], None], trigger, misfire: str = MISFIRE_SKIP):
+        if misfire not in MISFIRE_POLICIES:
+            raise ValueError(f"Unbekannte Misfire-Policy: {misfire}")
+        self.name = name
+        self.task = task
+        self.trigger = trigger
+        self.misfire = misfire
+        self.next_run: Optional[float] = None
+        # Letzter bereits als verpasst gezählter Termin (jeder Termin zählt nur einmal)
+        self.counted_until: Optional[float] = None
+        self.removed = False
+        # Garantiert, dass zwei Läufe desselben Jobs nie überlappen
+        self.lock = threading.Lock()
+
+    def seconds_until_due(self) -> float:
+        return self.next_run - self.trigger.clock()
 
 class Scheduler:
     """
-    Ein einfacher Scheduler, der eine wiederkehrende Aufgabe in einem eigenen Thread ausführt.
+    Scheduler mit einem einzigen Timer-Thread und einer Prioritätswarteschlange
+    (Heap) von Jobs. Jeder Job hat seinen eigenen Trigger (Intervall, feste
+    Minuten pro Stunde oder Cron-Ausdruck); Jobs werden nacheinander im
+    Scheduler-Thread ausgeführt; zwei Läufe desselben Jobs überlappen nie,
+    auch nicht mit einem manuellen run_now().
     Unterstützt Start, Stop, Pause, und Intervalldynamik.
+
+    Für Abwärtskompatibilität legt Scheduler(interval_seconds, task) direkt
+    einen Intervall-Job namens "default" an.
     """
 
-    def __init__(self, interval_seconds: int, task, logger=None):
+    DEFAULT_JOB = "default"
+
+    def __init__(self, interval_seconds: int = None, task=None, logger=None, misfire: str = MISFIRE_SKIP):
         """
-        :param interval_seconds: Intervall in Sekunden zwischen den Ausführungen der Aufgabe
-        :param task: Callable, die periodisch ausgeführt wird (ohne Parameter)
+        :param interval_seconds: Optional: Intervall in Sekunden für den Standard-Job
+        :param task: Optional: Callable (ohne Parameter) für den Standard-Job
         :param logger: Optionaler Logger, falls None wird logging.getLogger(__name__) verwendet
+        :param misfire: Verhalten bei verpassten Läufen des Standard-Jobs (skip, coalesce, catchup)
         """
         self.interval_seconds = interval_seconds
         self.task = task
@@ -23,28 +197,207 @@ class Scheduler:
         self._stop_event = threading.Event()
         self._pause_event = threading.Event()
         self._pause_event.set()  # Nicht pausiert am Anfang
+        self._condition = threading.Condition()
+        self._jobs = {}
+        self._heap = []
+        self._counter = itertools.count()
+
+        if interval_seconds and task is not None:
+            # Wie bisher: erster Lauf direkt nach dem Start
+            self.add_job(self.DEFAULT_JOB, task, IntervalTrigger(interval_seconds),
+                         run_immediately=True, misfire=misfire)
+
+    # --- Job-Verwaltung --------------------------------------------------
+
+    def add_job(self, name: str, task: Callable[[], None], trigger, run_immediately: bool = False,
+                misfire: str = MISFIRE_SKIP) -> Job:
+        """
+        Fügt einen Job hinzu oder ersetzt einen bestehenden Job gleichen Namens.
+        Der erste Lauf erfolgt beim nächsten Zeitpunkt des Triggers bzw. sofort
+        nach dem Start, wenn `run_immediately` gesetzt ist.
+
+        :param misfire: Verhalten bei verpassten Läufen (skip, coalesce, catchup)
+        """
+        job = Job(name, task, trigger, misfire)
+        with self._condition:
+            old = self._jobs.get(name)
+            if old:
+                old.removed = True
+                # Laufende Ausführung des alten Jobs blockiert auch den neuen
+                job.lock = old.lock
+            self._jobs[name] = job
+            if run_immediately:
+                job.next_run = trigger.clock()
+                self._push(job)
+            else:
+                self._schedule(job, trigger.clock())
+            self._condition.notify()
+        self._logger.info("Scheduler: Job '%s' geplant (%r).", name, trigger)
+        return job
+
+    def remove_job(self, name: str):
+        with self._condition:
+            job = self._jobs.pop(name, None)
+            if job:
+                job.removed = True
+                self._condition.notify()
+
+    def get_jobs(self) -> List[Job]:
+        with self._condition:
+            return list(self._jobs.values())
+
+    def _push(self, job: Job):
+        # Muss mit gehaltenem Lock aufgerufen werden. Der Heap ist nach
+        # monotoner Zeit sortiert, auch für Wanduhr-Trigger.
+        deadline = time.monotonic() + job.seconds_until_due()
+        heapq.heappush(self._heap, (deadline, next(self._counter), job))
+
+    def _schedule(self, job: Job, after: float):
+        # Muss mit gehaltenem Lock aufgerufen werden
+        job.next_run = job.trigger.next_run(after)
+        self._push(job)
+
+    def _passed_slots(self, job: Job, slot: float, now: float) -> Tuple[int, float]:
+        """
+        Zählt die Termine nach `slot`, die bis `now` verstrichen sind. Noch nicht
+        gezählte werden als verpasst gemeldet.
+
+        Returns:
+            Tuple[int, float]: Anzahl verstrichener Termine und der letzte davon
+                (bzw. `slot`, wenn keiner verstrichen ist).
+        """
+        passed, new, last = 0, 0, slot
+        following = job.trigger.next_run(slot)
+        while following <= now and passed < MAX_MISSED_RUNS:
+            passed += 1
+            last = following
+            if job.counted_until is None or following > job.counted_until:
+                new += 1
+            following = job.trigger.next_run(following)
+        if new:
+            job.counted_until = last
+            SCHEDULER_MISSED_RUNS.inc(new, job=job.name)
+            self._logger.warning("Scheduler: Job '%s' hat %d Lauf/Läufe verpasst (Policy: %s).",
+                                 job.name, new, job.misfire)
+        return passed, last
+
+    def _resolve_misfire(self, job: Job) -> Tuple[bool, float]:
+        """
+        Prüft beim Fälligwerden, ob seit dem geplanten Termin weitere Termine
+        verstrichen sind (Scheduler pausiert, Rechner im Suspend), und wendet
+        die Misfire-Policy des Jobs an.
+
+        Returns:
+            Tuple[bool, float]: Ob jetzt ausgeführt wird, und der Termin, ab dem
+                der nächste Lauf berechnet wird.
+        """
+        passed, last = self._passed_slots(job, job.next_run, job.trigger.clock())
+        if not passed or job.misfire == MISFIRE_CATCHUP:
+            return True, job.next_run
+        if job.misfire == MISFIRE_COALESCE:
+            return True, last
+        return False, last
+
+    def _reschedule(self, job: Job, anchor: float):
+        """
+        Plant den nächsten Lauf nach Ende der Ausführung. Termine, die während
+        des Laufs verstrichen sind, werden nach der Misfire-Policy behandelt:
+        skip plant den nächsten Termin nach dem Ende, coalesce einen sofortigen
+        Lauf für alle, catchup jeden einzeln direkt hintereinander.
+        Muss mit gehaltenem Lock aufgerufen werden.
+        """
+        passed, last = self._passed_slots(job, anchor, job.trigger.clock())
+        if passed and job.misfire == MISFIRE_CATCHUP:
+            job.next_run = job.trigger.next_run(anchor)
+        elif passed and job.misfire == MISFIRE_COALESCE:
+            job.next_run = last
+        else:
+            job.next_run = job.trigger.next_run(last)
+        self._push(job)
+
+    # --- Hauptschleife ---------------------------------------------------
+
+    def _next_due_job(self) -> Optional[Job]:
+        """
+        Wartet bis der nächste Job fällig ist und liefert ihn, oder None bei Stop.
+        """
+        with self._condition:
+            while not self._stop_event.is_set():
+                if not self._pause_event.is_set() or not self._heap:
+                    self._condition.wait()
+                    continue
+                deadline, _, job = self._heap[0]
+                if job.removed:
+                    heapq.heappop(self._heap)
+                    continue
+                delay = job.seconds_until_due()
+                if abs(time.monotonic() + delay - deadline) > 1.0:
+                    # Wanduhr ist gesprungen: Job mit korrigierter Frist neu einsortieren
+                    heapq.heappop(self._heap)
+                    self._push(job)
+                    continue
+                if delay > 0:
+                    self._condition.wait(timeout=min(delay, MAX_WAIT_SECONDS))
+                    continue
+                heapq.heappop(self._heap)
+                return job
+        return None
 
     def _run(self):
-        self._logger.info("Scheduler gestartet mit Intervall %d Sekunden.", self.interval_seconds)
+        self._logger.info("Scheduler gestartet mit %d Job(s).", len(self._jobs))
         while not self._stop_event.is_set():
-            self._pause_event.wait()  # Falls pausiert, hier warten
-
-            start_time = time.time()
-            try:
-                self.task()
-            except Exception as e:
-                self._logger.error("Fehler bei der Ausführung des Scheduler-Tasks: %s", e)
-
-            elapsed = time.time() - start_time
-            sleep_time = self.interval_seconds - elapsed
-            if sleep_time > 0:
-                # Warten, aber stop_event überwachen
-                stopped = self._stop_event.wait(timeout=sleep_time)
-                if stopped:
-                    break
+            job = self._next_due_job()
+            if job is None:
+                break
+
+            should_run, anchor = self._resolve_misfire(job)
+            if should_run:
+                self._execute(job)
+
+            with self._condition:
+                if not job.removed:
+                    self._reschedule(job, anchor)
 
         self._logger.info("Scheduler beendet.")
 
+    def _execute(self, job: Job) -> bool:
+        """
+        Führt einen Job aus, sofern er nicht bereits läuft.
+
+        Returns:
+            bool: True wenn ausgeführt, False wenn ein Lauf bereits aktiv war.
+        """
+        if not job.lock.acquire(blocking=False):
+            self._logger.warning("Scheduler: Job '%s' läuft noch, Ausführung übersprungen.", job.name)
+            SCHEDULER_JOB_RUNS.inc(job=job.name, outcome="overlap")
+            return False
+        started = time.monotonic()
+        outcome = "ok"
+        try:
+            job.task()
+        except Exception as e:
+            outcome = "error"
+            self._logger.error("Fehler bei der Ausführung des Scheduler-Tasks '%s': %s", job.name, e)
+        finally:
+            job.lock.release()
+            SCHEDULER_JOB_SECONDS.observe(time.monotonic() - started, job=job.name)
+            SCHEDULER_JOB_RUNS.inc(job=job.name, outcome=outcome)
+        return True
+
+    def run_now(self, name: str = DEFAULT_JOB) -> bool:
+        """
+        Führt einen Job sofort im aufrufenden Thread aus (z.B. "Jetzt ausführen").
+        Läuft der Job gerade, wird nichts getan.
+
+        Returns:
+            bool: True wenn ausgeführt, False wenn der Job unbekannt ist oder bereits läuft.
+        """
+        with self._condition:
+            job = self._jobs.get(name)
+        if job is None:
+            return False
+        return self._execute(job)
+
     def start(self):
         """
         Scheduler-Thread starten.
@@ -65,8 +418,10 @@ class Scheduler:
         Scheduler stoppen (Thread wird beendet).
         """
         self._logger.debug("Scheduler wird gestoppt.")
-        self._stop_event.set()
-        self._pause_event.set()  # Falls pausiert, wecken zum Beenden
+        with self._condition:
+            self._stop_event.set()
+            self._pause_event.set()  # Falls pausiert, wecken zum Beenden
+            self._condition.notify_all()
         if self._thread:
             self._thread.join()
             self._thread = None
@@ -85,14 +440,22 @@ class Scheduler:
         """
         if not self._pause_event.is_set():
             self._logger.debug("Scheduler wird fortgesetzt.")
-            self._pause_event.set()
+            with self._condition:
+                self._pause_event.set()
+                self._condition.notify_all()
 
-    def set_interval(self, interval_seconds: int):
+    def set_interval(self, interval_seconds: int, name: str = DEFAULT_JOB):
         """
-        Intervall ändern. Neue Intervalle wirken ab dem nächsten Intervallzyklus.
+        Intervall eines Jobs ändern (Standard: Standard-Job). Der Job wird
+        ab jetzt neu eingeplant.
         """
         self._logger.info("Scheduler-Intervall geändert: %d Sekunden.", interval_seconds)
-        self.interval_seconds = interval_seconds
+        with self._condition:
+            job = self._jobs.get(name)
+        if name == self.DEFAULT_JOB:
+            self.interval_seconds = interval_seconds
+        if job:
+            self.add_job(name, job.task, IntervalTrigger(interval_seconds), misfire=job.misfire)
 
     def is_running(self) -> bool:
         """
@@ -0,0 +1,271 @@
+"""
+core/snapshot_store.py
+
+Inhaltsadressierter, deduplizierter Backup-Speicher.
+
+Dateiinhalte werden genau einmal unter ihrem SHA-256-Hash im Objektverzeichnis
+abgelegt. Ein Backup ist nur noch ein kleines Snapshot-Manifest (JSON), das
+Dateinamen auf Hashes abbildet. Hunderte Snapshots kosten daher kaum mehr
+Platz als einer, und ein neuer Snapshot schreibt nur neue Blobs.
+
+Aufbau des Speicherordners:
+- objects/<2 Zeichen>/<restlicher Hash>
+- snapshots/backup_<Zeitstempel>.json
+- tmp/ (unfertige Blobs)
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from typing import Any, Dict, IO, List, Optional
+
+from core.compression import CompressionPolicy
+from core.integrity import write_archive_manifest
+from core.logger import Logger
+from core.utils import ensure_dir_exists
+
+
+class BlobWriter:
+    """
+    Nimmt Daten blockweise entgegen, berechnet dabei den Hash und legt den Blob
+    beim Abschluss im Objektverzeichnis ab (falls noch nicht vorhanden).
+    """
+
+    def __init__(self, store: "SnapshotStore"):
+        self.store = store
+        self._hash = hashlib.sha256()
+        self.size = 0
+        self.digest: Optional[str] = None
+        self._discarded = False
+        fd, self._temp_path = tempfile.mkstemp(dir=store.tmp_dir, suffix=".blob")
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, block: bytes):
+        self._hash.update(block)
+        self._file.write(block)
+        self.size += len(block)
+
+    def discard(self):
+        """
+        Verwirft den Blob (z.B. nach einem abgebrochenen Download).
+        """
+        self._discarded = True
+
+    def commit(self) -> str:
+        """
+        Schließt den Blob ab und liefert seinen Hash. Existiert der Inhalt bereits,
+        wird die temporäre Datei verworfen.
+        """
+        self._file.close()
+        self.digest = self._hash.hexdigest()
+        target = self.store.blob_path(self.digest)
+        if os.path.exists(target):
+            os.remove(self._temp_path)
+        else:
+            ensure_dir_exists(os.path.dirname(target))
+            os.replace(self._temp_path, target)
+        return self.digest
+
+    def __enter__(self) -> "BlobWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None and not self._discarded:
+            self.commit()
+            return
+        self._file.close()
+        if os.path.exists(self._temp_path):
+            os.remove(self._temp_path)
+
+
+class SnapshotStore:
+    """
+    Verwaltung von Blobs und Snapshot-Manifesten in einem lokalen Ordner.
+    """
+
+    def __init__(self, root_dir: str, logger: Optional[Logger] = None):
+        """
+        Args:
+            root_dir (str): Wurzelverzeichnis des Speichers.
+            logger (Logger, optional): Logger für Protokollierung.
+        """
+        self.root_dir = root_dir
+        self.logger = logger
+        self.objects_dir = os.path.join(root_dir, "objects")
+        self.snapshots_dir = os.path.join(root_dir, "snapshots")
+        self.tmp_dir = os.path.join(root_dir, "tmp")
+        for path in (self.objects_dir, self.snapshots_dir, self.tmp_dir):
+            ensure_dir_exists(path)
+
+    # --- Blobs -----------------------------------------------------------
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], digest[2:])
+
+    def has_blob(self, digest: str) -> bool:
+        return os.path.isfile(self.blob_path(digest))
+
+    def new_blob(self) -> BlobWriter:
+        """
+        Startet einen neuen Blob. Als Kontextmanager verwenden; beim fehlerfreien
+        Verlassen wird der Blob übernommen.
+        """
+        return BlobWriter(self)
+
+    def open_blob(self, digest: str) -> IO[bytes]:
+        return open(self.blob_path(digest), "rb")
+
+    # --- Snapshots -------------------------------------------------------
+
+    def snapshot_path(self, name: str) -> str:
+        if not name.endswith(".json"):
+            name += ".json"
+        return os.path.join(self.snapshots_dir, name)
+
+    def write_snapshot(self, name: str, files: Dict[str, Dict[str, Any]]) -> str:
+        """
+        Schreibt ein Snapshot-Manifest atomar.
+
+        Args:
+            name (str): Snapshot-Name, z.B. "backup_2025-06-19_16-43-49".
+            files (Dict[str, Dict[str, Any]]): Dateiname -> {"hash", "size", ...}.
+
+        Returns:
+            str: Pfad des Manifests.
+        """
+        path = self.snapshot_path(name)
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"name": name, "files": files}, f, indent=4)
+        os.replace(temp_path, path)
+        return path
+
+    def list_snapshots(self) -> List[str]:
+        """
+        Liefert alle Snapshot-Namen aufsteigend sortiert (ältester zuerst).
+        """
+        return sorted(
+            name[:-len(".json")] for name in os.listdir(self.snapshots_dir)
+            if name.endswith(".json")
+        )
+
+    def load_snapshot(self, name: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.snapshot_path(name), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            if self.logger:
+                self.logger.log_error(f"SnapshotStore: Snapshot {name} nicht lesbar: {e}")
+            return None
+
+    def latest_snapshot(self) -> Optional[Dict[str, Any]]:
+        names = self.list_snapshots()
+        return self.load_snapshot(names[-1]) if names else None
+
+    def delete_snapshot(self, name: str):
+        """
+        Entfernt ein Snapshot-Manifest. Nicht mehr referenzierte Blobs
+        werden erst durch gc() gelöscht.
+        """
+        path = self.snapshot_path(name)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def gc(self) -> int:
+        """
+        Löscht Blobs, die von keinem Snapshot mehr referenziert werden.
+
+        Returns:
+            int: Anzahl gelöschter Blobs.
+        """
+        referenced = set()
+        for name in self.list_snapshots():
+            snapshot = self.load_snapshot(name)
+            if snapshot is None:
+                # Im Zweifel nichts löschen
+                return 0
+            referenced.update(meta["hash"] for meta in snapshot.get("files", {}).values())
+
+        removed = 0
+        for prefix in os.listdir(self.objects_dir):
+            prefix_dir = os.path.join(self.objects_dir, prefix)
+            for rest in os.listdir(prefix_dir):
+                if prefix + rest not in referenced:
+                    os.remove(os.path.join(prefix_dir, rest))
+                    removed += 1
+            if not os.listdir(prefix_dir):
+                os.rmdir(prefix_dir)
+        if self.logger and removed:
+            self.logger.log_info(f"SnapshotStore: {removed} nicht referenzierte Blobs gelöscht")
+        return removed
+
+    # --- Wiederherstellung und Export -------------------------------------
+
+    def restore(self, name: str, target_dir: str, filenames: Optional[List[str]] = None) -> bool:
+        """
+        Stellt Dateien eines Snapshots in einem lokalen Verzeichnis wieder her.
+
+        Args:
+            name (str): Snapshot-Name.
+            target_dir (str): Zielverzeichnis.
+            filenames (List[str], optional): Nur diese Dateien wiederherstellen.
+
+        Returns:
+            bool: True bei Erfolg, False bei Fehlern.
+        """
+        snapshot = self.load_snapshot(name)
+        if snapshot is None:
+            return False
+        try:
+            ensure_dir_exists(target_dir)
+            for filename, meta in snapshot.get("files", {}).items():
+                if filenames is not None and filename not in filenames:
+                    continue
+                target = os.path.join(target_dir, filename)
+                with self.open_blob(meta["hash"]) as source, open(target + ".part", "wb") as dest:
+                    shutil.copyfileobj(source, dest)
+                os.replace(target + ".part", target)
+            if self.logger:
+                self.logger.log_info(f"SnapshotStore: Snapshot {name} nach {target_dir} wiederhergestellt")
+            return True
+        except Exception as e:
+            if self.logger:
+                self.logger.log_error(f"SnapshotStore: Fehler beim Wiederherstellen von {name}: {e}")
+            return False
+
+    def export_zip(self, name: str, zip_path: str, compression: Optional[CompressionPolicy] = None) -> bool:
+        """
+        Exportiert einen Snapshot als ZIP-Archiv. `compression` legt Methode und
+        Stufe fest (Standard: deflate).
+
+        Returns:
+            bool: True bei Erfolg, False bei Fehlern.
+        """
+        snapshot = self.load_snapshot(name)
+        if snapshot is None:
+            return False
+        compression = compression or CompressionPolicy(logger=self.logger)
+        temp_path = zip_path + ".part"
+        try:
+            method, level = compression.zip_arguments()
+            with zipfile.ZipFile(temp_path, "w", compression=method, compresslevel=level) as zipf:
+                for filename, meta in snapshot.get("files", {}).items():
+                    with self.open_blob(meta["hash"]) as source, \
+                            compression.open_entry(zipf, filename) as entry:
+                        shutil.copyfileobj(source, entry)
+                write_archive_manifest(zipf, {filename: {"size": meta["size"], "hash": f"sha256:{meta['hash']}"}
+                                              for filename, meta in snapshot.get("files", {}).items()}, "sha256")
+            os.replace(temp_path, zip_path)
+            if self.logger:
+                self.logger.log_info(f"SnapshotStore: Snapshot {name} als {zip_path} exportiert")
+            return True
+        except Exception as e:
+            if self.logger:
+                self.logger.log_error(f"SnapshotStore: Fehler beim Export von {name}: {e}")
+            return False
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
@@ -0,0 +1,282 @@
+"""
+core/sync_engine.py
+
+Inkrementeller Abgleich zwischen FTP-Verzeichnis und lokalem Spiegel.
+
+Beide Seiten werden als Baum mit Größe und Änderungszeit erfasst (entfernt
+per MLSD, rekursiv); übertragen wird nur, was sich seit dem letzten Abgleich
+geändert hat. Der Stand des letzten Abgleichs liegt als JSON im lokalen
+Spiegel, so dass auch Änderungen erkannt werden, bei denen nur eine Seite
+ihre Zeitstempel ändert. Richtung "download" spiegelt den Server lokal,
+"upload" den lokalen Ordner auf den Server, "both" überträgt in die
+Richtung der jeweils geänderten Seite (bei Konflikten gewinnt die neuere).
+"""
+
+import calendar
+import json
+import os
+import posixpath
+import time
+from typing import Any, Dict, List, Optional
+
+from core.ftp_worker import FTPWorker
+from core.logger import Logger
+from core.utils import ensure_dir_exists
+
+DIRECTIONS = ("download", "upload", "both")
+STATE_FILENAME = ".ftp_sync_state.json"
+
+# Toleranz beim Vergleich von Zeitstempeln (MLSD hat nur Sekundenauflösung,
+# FAT-Dateisysteme nur zwei Sekunden)
+MTIME_TOLERANCE = 2
+
+
+def parse_mlsd_time(value: Optional[str]) -> Optional[float]:
+    """
+    Wandelt einen MLSD/MDTM-Zeitstempel (YYYYMMDDHHMMSS[.sss], UTC) in
+    Sekunden seit der Epoche um.
+    """
+    if not value:
+        return None
+    try:
+        seconds = calendar.timegm(time.strptime(value[:14], "%Y%m%d%H%M%S"))
+    except ValueError:
+        return None
+    fraction = value[15:] if len(value) > 15 and value[14] == "." else ""
+    return seconds + (float("0." + fraction) if fraction.isdigit() else 0.0)
+
+
+class SyncEngine:
+    """
+    Gleicht ein FTP-Verzeichnis (rekursiv) mit einem lokalen Ordner ab.
+    """
+
+    def __init__(self, ftp_worker: FTPWorker, local_dir: str, logger: Logger, direction: str = "download",
+                 delete: bool = False, remote_dir: str = ""):
+        """
+        Args:
+            ftp_worker (FTPWorker): FTP-Worker des Servers.
+            local_dir (str): Lokaler Spiegelordner.
+            logger (Logger): Logger für Protokollierung.
+            direction (str): "download", "upload" oder "both".
+            delete (bool): Auf der Gegenseite fehlende bzw. gelöschte Dateien ebenfalls löschen.
+            remote_dir (str): Unterverzeichnis relativ zum FTP-Verzeichnis ("" = FTP-Verzeichnis).
+        """
+        if direction not in DIRECTIONS:
+            raise ValueError(f"Unbekannte Sync-Richtung: {direction}")
+        self.ftp_worker = ftp_worker
+        self.local_dir = os.path.abspath(local_dir)
+        self.logger = logger
+        self.direction = direction
+        self.delete = delete
+        self.remote_dir = remote_dir.strip("/")
+        self.state_path = os.path.join(self.local_dir, STATE_FILENAME)
+
+    # --- Bestandsaufnahme ---------------------------------------------------
+
+    def remote_snapshot(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Dateien auf dem Server: relativer Pfad -> {"size", "mtime"}. Immer frisch
+        vom Server gelistet, eine gecachte Liste könnte neuere Spielstände verbergen.
+        """
+        tree = self.ftp_worker.list_tree(self.remote_dir, fresh=True)
+        if tree is None:
+            return None
+        prefix = self.remote_dir + "/" if self.remote_dir else ""
+        return {path[len(prefix):]: {"size": meta["size"], "mtime": parse_mlsd_time(meta["modify"])}
+                for path, meta in tree.items() if meta["type"] == "file"}
+
+    def local_snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Dateien im lokalen Spiegel: relativer Pfad (mit "/") -> {"size", "mtime"}.
+        """
+        snapshot = {}
+        for directory, _, filenames in os.walk(self.local_dir):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                relative = os.path.relpath(path, self.local_dir).replace(os.sep, "/")
+                if relative == STATE_FILENAME:
+                    continue
+                st = os.stat(path)
+                snapshot[relative] = {"size": st.st_size, "mtime": st.st_mtime}
+        return snapshot
+
+    def load_state(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f).get("files", {})
+        except (json.JSONDecodeError, IOError, AttributeError):
+            return {}
+
+    def _save_state(self, remote: Dict[str, Dict[str, Any]], local: Dict[str, Dict[str, Any]]):
+        # Nur Pfade, die nach dem Abgleich auf beiden Seiten gleich groß vorliegen
+        files = {path: {"size": meta["size"], "remote_mtime": meta["mtime"], "local_mtime": local[path]["mtime"]}
+                 for path, meta in remote.items()
+                 if path in local and local[path]["size"] == meta["size"]}
+        temp_path = self.state_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"remote_dir": self.remote_dir, "files": files}, f, indent=4)
+        os.replace(temp_path, self.state_path)
+
+    # --- Vergleich ----------------------------------------------------------
+
+    @staticmethod
+    def _same_time(a: Optional[float], b: Optional[float]) -> bool:
+        return a is None or b is None or abs(a - b) <= MTIME_TOLERANCE
+
+    def _changed(self, meta: Optional[Dict[str, Any]], state: Optional[Dict[str, Any]], key: str) -> bool:
+        if meta is None or state is None:
+            return True
+        return meta["size"] != state["size"] or not self._same_time(meta["mtime"], state[key])
+
+    def diff(self, remote: Dict[str, Dict[str, Any]], local: Dict[str, Dict[str, Any]],
+             state: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, List[str]]:
+        """
+        Ermittelt die nötigen Übertragungen.
+
+        Returns:
+            Dict[str, List[str]]: Pfadlisten unter "download", "upload",
+                "delete_local", "delete_remote" und "conflicts" (davon betroffene
+                Pfade stehen zusätzlich unter der gewählten Richtung).
+        """
+        state = state or {}
+        plan: Dict[str, List[str]] = {"download": [], "upload": [], "delete_local": [], "delete_remote": [],
+                                      "conflicts": []}
+        for path in sorted(set(remote) | set(local)):
+            r, l, s = remote.get(path), local.get(path), state.get(path)
+            if r and l and s is None and r["size"] == l["size"]:
+                # Ohne früheren Stand: gleich groß und (beim Download) gleich alt gilt als abgeglichen
+                if self.direction == "upload" and (r["mtime"] is None or r["mtime"] >= l["mtime"] - MTIME_TOLERANCE):
+                    continue
+                if self.direction != "upload" and self._same_time(r["mtime"], l["mtime"]):
+                    continue
+            remote_changed = r is not None and self._changed(r, s, "remote_mtime")
+            local_changed = l is not None and self._changed(l, s, "local_mtime")
+
+            if self.direction == "download":
+                if r is None:
+                    if self.delete:
+                        plan["delete_local"].append(path)
+                elif remote_changed or local_changed or l is None:
+                    plan["download"].append(path)
+            elif self.direction == "upload":
+                if l is None:
+                    if self.delete:
+                        plan["delete_remote"].append(path)
+                elif remote_changed or local_changed or r is None:
+                    plan["upload"].append(path)
+            elif r and l:
+                if remote_changed and local_changed:
+                    plan["conflicts"].append(path)
+                    newer_remote = (r["mtime"] or 0) > l["mtime"]
+                    plan["download" if newer_remote else "upload"].append(path)
+                elif remote_changed:
+                    plan["download"].append(path)
+                elif local_changed:
+                    plan["upload"].append(path)
+            elif r:
+                # Lokal fehlend: seit dem letzten Abgleich gelöscht oder neu auf dem Server
+                if s is not None and self.delete and not remote_changed:
+                    plan["delete_remote"].append(path)
+                else:
+                    plan["download"].append(path)
+            else:
+                if s is not None and self.delete and not local_changed:
+                    plan["delete_local"].append(path)
+                else:
+                    plan["upload"].append(path)
+        return plan
+
+    # --- Abgleich -----------------------------------------------------------
+
+    def _remote_path(self, path: str) -> str:
+        return posixpath.join(self.remote_dir, path) if self.remote_dir else path
+
+    def _download(self, path: str, meta: Dict[str, Any]) -> bool:
+        local_path = os.path.join(self.local_dir, *path.split("/"))
+        ensure_dir_exists(os.path.dirname(local_path))
+        if not self.ftp_worker.download_to_file(self._remote_path(path), local_path):
+            return False
+        if meta["mtime"] is not None:
+            # Änderungszeit des Servers übernehmen, damit ein verlorener Stand nicht alles neu lädt
+            os.utime(local_path, (meta["mtime"], meta["mtime"]))
+        return True
+
+    def _upload(self, path: str, meta: Dict[str, Any]) -> bool:
+        remote_path = self._remote_path(path)
+        directory = posixpath.dirname(remote_path)
+        if directory and not self.ftp_worker.make_dirs(directory):
+            return False
+        with open(os.path.join(self.local_dir, *path.split("/")), "rb") as f:
+            return self.ftp_worker.upload_fileobj(remote_path, f, size=meta["size"])
+
+    def _delete_local(self, path: str) -> bool:
+        try:
+            os.remove(os.path.join(self.local_dir, *path.split("/")))
+            self.logger.log_info(f"SyncEngine: Lokale Datei {path} gelöscht")
+            return True
+        except OSError as e:
+            self.logger.log_error(f"SyncEngine: Lokale Datei {path} konnte nicht gelöscht werden: {e}")
+            return False
+
+    def sync(self, dry_run: bool = False) -> Optional[Dict[str, List[str]]]:
+        """
+        Führt den Abgleich aus.
+
+        Args:
+            dry_run (bool): Nur ermitteln und protokollieren, nichts übertragen.
+
+        Returns:
+            Optional[Dict[str, List[str]]]: Der ausgeführte Plan (siehe diff) oder
+                None bei Fehlern.
+        """
+        started = time.monotonic()
+        ensure_dir_exists(self.local_dir)
+        try:
+            with self.ftp_worker.session():
+                remote = self.remote_snapshot()
+                if remote is None:
+                    return None
+                local = self.local_snapshot()
+                plan = self.diff(remote, local, self.load_state())
+                self.logger.log_info(
+                    f"SyncEngine: {len(plan['download'])} Downloads, {len(plan['upload'])} Uploads, "
+                    f"{len(plan['delete_local']) + len(plan['delete_remote'])} Löschungen "
+                    f"({len(remote)} Dateien entfernt, {len(local)} lokal)")
+                for path in plan["conflicts"]:
+                    self.logger.log_warning(f"SyncEngine: {path} auf beiden Seiten geändert, neuere Version gewinnt")
+                if dry_run:
+                    return plan
+
+                failed = []
+                for path in plan["download"]:
+                    if not self._download(path, remote[path]):
+                        failed.append(path)
+                for path in plan["upload"]:
+                    if not self._upload(path, local[path]):
+                        failed.append(path)
+                for path in plan["delete_local"]:
+                    if not self._delete_local(path):
+                        failed.append(path)
+                for path in plan["delete_remote"]:
+                    if not self.ftp_worker.delete_file(self._remote_path(path)):
+                        failed.append(path)
+
+                # Stand nach dem Abgleich festhalten (eine weitere MLSD-Runde)
+                if any(plan[key] for key in ("download", "upload", "delete_local", "delete_remote")):
+                    remote = self.remote_snapshot() or remote
+                    local = self.local_snapshot()
+                self._save_state(remote, local)
+        except Exception as e:
+            self.logger.log_error(f"SyncEngine: Ausnahmefehler: {e}")
+            return None
+
+        self.logger.log_event("sync", outcome="error" if failed else "ok", server=self.ftp_worker.host,
+                              duration_ms=round((time.monotonic() - started) * 1000, 1), direction=self.direction,
+                              downloads=len(plan["download"]), uploads=len(plan["upload"]),
+                              deletes=len(plan["delete_local"]) + len(plan["delete_remote"]), failed=len(failed))
+        if failed:
+            self.logger.log_error(f"SyncEngine: Abgleich fehlgeschlagen für: {', '.join(failed)}")
+            return None
+        self.logger.log_info(f"SyncEngine: Abgleich mit {self.local_dir} abgeschlossen.")
+        return plan
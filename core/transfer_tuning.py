@@ -0,0 +1,246 @@
+"""
+core/transfer_tuning.py
+
+Blockgröße und Socket-Puffer für FTP-Übertragungen.
+
+ftplib liest und schreibt standardmäßig in 8-KiB-Blöcken. TransferTuner wertet
+jede größere Übertragung aus und wählt für jeden Server und jede Richtung die
+schnellste Blockgröße (schrittweise Suche über BLOCK_SIZES). Die Werte liegen
+als JSON auf der Platte und gelten beim nächsten Start sofort wieder.
+
+Socket-Puffer werden nicht automatisch gesetzt: ein fester SO_RCVBUF bzw.
+SO_SNDBUF schaltet unter Linux die automatische Fenstergröße ab und begrenzt
+das Fenster unter tcp_rmem/tcp_wmem. Nur ein ausdrücklich konfigurierter
+Puffer (socket_buffer_kib) wird gesetzt, und zwar vor dem Verbindungsaufbau
+der Datenverbindung, da die Fensterskalierung beim Verbindungsaufbau (SYN)
+ausgehandelt wird. TunedFTP ist ein ftplib.FTP, das so verfährt.
+"""
+
+import ftplib
+import json
+import os
+import socket
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from core.logger import Logger
+from core.metrics import get_registry
+
+BLOCK_SIZES = tuple(2 ** n * 1024 for n in range(3, 11))  # 8 KiB .. 1 MiB
+DEFAULT_BLOCKSIZE = 64 * 1024
+# Kleinere Übertragungen sagen nichts über den Durchsatz aus
+MIN_SAMPLE_BYTES = 1024 * 1024
+# Gewicht einer neuen Messung im gleitenden Mittel
+SAMPLE_WEIGHT = 0.5
+# Eine andere Blockgröße muss mindestens so viel schneller sein, um zu wechseln
+SWITCH_MARGIN = 0.05
+# Wie oft (Sekunden) der Stand höchstens gespeichert wird
+SAVE_INTERVAL = 60.0
+
+DIRECTIONS = ("download", "upload")
+TUNING_FILENAME = "transfer_tuning.json"
+
+TUNED_BLOCKSIZE = get_registry().gauge(
+    "ftp_transfer_blocksize_bytes", "Gewählte Blockgröße für Übertragungen", ["server", "direction"])
+
+
+def apply_socket_buffers(sock: socket.socket, rcvbuf: Optional[int] = None, sndbuf: Optional[int] = None):
+    """
+    Setzt die Puffer eines noch nicht verbundenen Sockets (None = Systemstandard
+    mit automatischer Fenstergröße). Nach dem Verbindungsaufbau gesetzt,
+    vergrößern sie die ausgehandelte Fensterskalierung nicht mehr.
+    """
+    try:
+        if rcvbuf:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, int(rcvbuf))
+        if sndbuf:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, int(sndbuf))
+    except OSError:
+        pass
+
+
+def connect_data_socket(address: Tuple[str, int], timeout: Optional[float], rcvbuf: Optional[int] = None,
+                        sndbuf: Optional[int] = None) -> socket.socket:
+    """
+    Wie socket.create_connection(), setzt die Puffer aber vor dem Verbindungsaufbau.
+    """
+    error = None
+    for family, type_, proto, _, sockaddr in socket.getaddrinfo(address[0], address[1], 0, socket.SOCK_STREAM):
+        sock = socket.socket(family, type_, proto)
+        try:
+            apply_socket_buffers(sock, rcvbuf, sndbuf)
+            sock.settimeout(timeout)
+            sock.connect(sockaddr)
+            return sock
+        except OSError as e:
+            error = e
+            sock.close()
+    raise error or OSError(f"Keine Adresse für {address[0]}")
+
+
+class TunedFTP(ftplib.FTP):
+    """
+    ftplib.FTP mit einstellbaren Socket-Puffern für die Datenverbindung (nur
+    im Passivmodus; ohne Puffer verhält es sich wie ftplib.FTP).
+    """
+
+    rcvbuf: Optional[int] = None
+    sndbuf: Optional[int] = None
+
+    def set_socket_buffers(self, rcvbuf: Optional[int] = None, sndbuf: Optional[int] = None):
+        self.rcvbuf = rcvbuf
+        self.sndbuf = sndbuf
+
+    def ntransfercmd(self, cmd, rest=None):
+        if not (self.rcvbuf or self.sndbuf) or not self.passiveserver:
+            return super().ntransfercmd(cmd, rest)
+        # Wie ftplib.FTP.ntransfercmd im Passivmodus, nur mit eigenem Verbindungsaufbau
+        conn = connect_data_socket(self.makepasv(), self.sock.gettimeout(), self.rcvbuf, self.sndbuf)
+        try:
+            if rest is not None:
+                self.sendcmd(f"REST {rest}")
+            response = self.sendcmd(cmd)
+            if response[0] == "2":
+                response = self.getresp()
+            if response[0] != "1":
+                raise ftplib.error_reply(response)
+        except BaseException:
+            conn.close()
+            raise
+        return conn, ftplib.parse150(response) if response[:3] == "150" else None
+
+
+class TransferTuner:
+    """
+    Merkt sich pro Server und Richtung den Durchsatz je Blockgröße und leitet
+    daraus die Blockgröße der nächsten Übertragung ab.
+    """
+
+    def __init__(self, path: Optional[str] = None, enabled: bool = True, logger: Optional[Logger] = None):
+        """
+        Args:
+            path (str, optional): JSON-Datei für den gemessenen Stand (None = nur im Speicher).
+            enabled (bool): Bei False gilt immer DEFAULT_BLOCKSIZE.
+            logger (Logger, optional): Logger für Protokollierung.
+        """
+        self._lock = threading.Lock()
+        self._profiles: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._saved = 0.0
+        self._dirty = False
+        self.path = None
+        self.enabled = enabled
+        self.logger = logger
+        self.configure(path, enabled, logger)
+
+    def configure(self, path: Optional[str] = None, enabled: bool = True, logger: Optional[Logger] = None):
+        """
+        Setzt Ablage und Schalter (zur Laufzeit möglich) und lädt den gespeicherten Stand.
+        """
+        if logger is not None:
+            self.logger = logger
+        with self._lock:
+            self.enabled = enabled
+            if path != self.path:
+                self.path = path
+                self._profiles = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        if not self.path:
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f).get("servers", {})
+        except (json.JSONDecodeError, IOError, AttributeError):
+            return {}
+
+    def save(self):
+        """
+        Schreibt den gemessenen Stand auf die Platte (sofern geändert).
+        """
+        with self._lock:
+            if not self.path or not self._dirty:
+                return
+            data = json.dumps({"servers": self._profiles}, indent=4)
+            self._dirty = False
+            self._saved = time.monotonic()
+        try:
+            temp_path = self.path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            if self.logger:
+                self.logger.log_warning(f"TransferTuner: Stand konnte nicht gespeichert werden: {e}")
+
+    def _profile(self, server: str, direction: str) -> Dict[str, Any]:
+        return self._profiles.setdefault(server, {}).setdefault(
+            direction, {"blocksize": DEFAULT_BLOCKSIZE, "throughput": {}})
+
+    def blocksize_for(self, server: str, direction: str) -> int:
+        """
+        Blockgröße für die nächste Übertragung.
+        """
+        if not self.enabled:
+            return DEFAULT_BLOCKSIZE
+        with self._lock:
+            return self._profile(server, direction)["blocksize"]
+
+    def record(self, server: str, direction: str, blocksize: int, transferred: int, seconds: float):
+        """
+        Wertet eine abgeschlossene Übertragung aus und passt die Werte für den
+        Server an. Gedrosselte Übertragungen nicht melden, sie messen das Limit.
+        """
+        if not self.enabled or transferred < MIN_SAMPLE_BYTES or seconds <= 0:
+            return
+        rate = transferred / seconds
+        with self._lock:
+            profile = self._profile(server, direction)
+            samples = profile["throughput"]
+            key = str(blocksize)
+            samples[key] = rate if key not in samples else samples[key] + (rate - samples[key]) * SAMPLE_WEIGHT
+            previous = profile["blocksize"]
+            profile["blocksize"] = self._next_blocksize(samples, blocksize)
+            changed = profile["blocksize"] != previous
+            self._dirty = True
+            due = changed or time.monotonic() - self._saved > SAVE_INTERVAL
+        TUNED_BLOCKSIZE.set(profile["blocksize"], server=server, direction=direction)
+        if changed and self.logger:
+            self.logger.log_info(
+                f"TransferTuner: {server} ({direction}): {rate / 1048576:.1f} MiB/s mit {blocksize // 1024} KiB, "
+                f"nächste Übertragung mit {profile['blocksize'] // 1024} KiB Blöcken")
+        if due:
+            self.save()
+
+    @staticmethod
+    def _next_blocksize(samples: Dict[str, float], current: int) -> int:
+        # Schrittweise Suche: ausgehend von der bisher schnellsten Blockgröße
+        # den größeren, dann den kleineren Nachbarn messen, sonst dabei bleiben
+        best = max((int(size) for size in samples), key=lambda size: samples[str(size)])
+        if best not in BLOCK_SIZES:
+            return DEFAULT_BLOCKSIZE
+        index = BLOCK_SIZES.index(best)
+        for neighbour in (index + 1, index - 1):
+            if 0 <= neighbour < len(BLOCK_SIZES) and str(BLOCK_SIZES[neighbour]) not in samples:
+                return BLOCK_SIZES[neighbour]
+        # Messrauschen soll nicht zwischen fast gleich schnellen Größen hin- und herschalten
+        if current in BLOCK_SIZES and samples.get(str(current), 0) >= samples[str(best)] * (1 - SWITCH_MARGIN):
+            return current
+        return best
+
+    def profile(self, server: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Gemessener Stand eines Servers (Kopie), z.B. für Diagnose.
+        """
+        with self._lock:
+            return json.loads(json.dumps(self._profiles.get(server, {})))
+
+
+_default_tuner = TransferTuner()
+
+
+def get_default_tuner() -> TransferTuner:
+    """
+    Liefert den prozessweiten TransferTuner (ohne Konfiguration nur im Speicher).
+    """
+    return _default_tuner
@@ -1,9 +1,70 @@
 # core/updater_logic.py
 
+import ftplib
+import io
 import json
-from typing import Optional
+import re
+import time
+from typing import Any, Dict, Optional
 from core.ftp_worker import FTPWorker
 from core.logger import Logger
+from core.metrics import get_registry
+
+INDEX_UPDATE_SECONDS = get_registry().histogram(
+    "index_update_duration_seconds", "Dauer einer Index-Aktualisierung in Sekunden", ["server"])
+INDEX_UPDATES = get_registry().counter(
+    "index_updates_total", "Anzahl Index-Aktualisierungen nach Ergebnis", ["server", "outcome"])
+INDEX_LATEST = get_registry().gauge(
+    "index_latest", "Zuletzt geschriebener Wert von 'latest'", ["server"])
+
+def replace_top_level_int(text: str, key: str, value: int) -> Optional[str]:
+    """
+    Ersetzt den Integer-Wert eines Schlüssels auf oberster Ebene eines
+    JSON-Objekts, ohne den restlichen Text (Einrückung, Reihenfolge,
+    Zeilenenden) anzufassen.
+
+    Args:
+        text (str): JSON-Text.
+        key (str): Schlüssel auf oberster Ebene.
+        value (int): Neuer Wert.
+
+    Returns:
+        Optional[str]: Geänderter Text oder None, wenn der Schlüssel nicht
+            eindeutig mit Integer-Wert auf oberster Ebene gefunden wurde.
+            Kommt der Schlüssel mehrfach vor (json.loads nimmt den letzten),
+            ist das Ergebnis ebenfalls None.
+    """
+    pattern = re.compile(r'"' + re.escape(key) + r'"(\s*:\s*)(-?\d+)(?![\d.eE])')
+    key_pattern = re.compile(r'"' + re.escape(key) + r'"\s*:')
+    found = None
+    depth = 0
+    in_string = False
+    escaped = False
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char in "{[":
+            depth += 1
+        elif char in "}]":
+            depth -= 1
+        elif char == '"':
+            if depth == 1 and key_pattern.match(text, i):
+                match = pattern.match(text, i)
+                if found is not None or not match:
+                    return None
+                found = match
+            in_string = True
+        i += 1
+    if found is None:
+        return None
+    return text[:found.start(2)] + str(value) + text[found.end(2):]
 
 class UpdaterLogic:
     """
@@ -24,43 +85,169 @@ class UpdaterLogic:
     def process_index_file(self) -> bool:
         """
         Holt die Index-Datei vom FTP-Server, liest 'latest' aus, reduziert ihn um 1,
-        schreibt die Datei zurück und loggt den Vorgang.
+        schreibt die Datei zurück und loggt den Vorgang. Die FTP-Sitzung wird bei
+        Bedarf aus dem Pool des FTPWorkers geliehen.
 
         Returns:
             bool: True bei Erfolg, False bei Fehlern.
         """
+        started = time.monotonic()
+        event: Dict[str, Any] = {}
+        success = self._process_index_file(event)
+        self._record_result(started, success, event)
+        return success
+
+    async def process_index_file_async(self) -> bool:
+        """
+        Wie process_index_file, aber als Coroutine auf der Event-Loop des
+        asyncio-Backends (ftp_worker muss ein AsyncFTPWorker sein). So werden
+        viele Server nebenläufig aktualisiert, ohne einen Thread pro Verbindung.
+
+        Returns:
+            bool: True bei Erfolg, False bei Fehlern.
+        """
+        started = time.monotonic()
+        event: Dict[str, Any] = {}
+        success = await self._process_index_file_async(event)
+        self._record_result(started, success, event)
+        return success
+
+    def _record_result(self, started: float, success: bool, event: Dict[str, Any]):
+        duration = time.monotonic() - started
+        server = self.ftp_worker.host
+        outcome = "ok" if success else "error"
+        INDEX_UPDATE_SECONDS.observe(duration, server=server)
+        INDEX_UPDATES.inc(server=server, outcome=outcome)
+        if success:
+            INDEX_LATEST.set(event["latest_after"], server=server)
+        self.logger.log_event("index_update", outcome=outcome, server=server, duration_ms=round(duration * 1000, 1),
+                              file=self.index_filename, **event)
+
+    def _process_index_file(self, event: Dict[str, Any]) -> bool:
+        """
+        Führt die Aktualisierung aus und trägt alten/neuen Wert und Größe in `event` ein.
+        """
         try:
-            self.logger.log_info("UpdaterLogic: Lade Index-Datei herunter...")
-            content = self.ftp_worker.download_file(self.index_filename)
-            if content is None:
-                self.logger.log_error("UpdaterLogic: Index-Datei nicht gefunden oder leer.")
-                return False
+            with self.ftp_worker.session():
+                self.logger.log_info("UpdaterLogic: Lade Index-Datei herunter...")
+                content = self.ftp_worker.download_file(self.index_filename)
+                if content is None:
+                    self.logger.log_error("UpdaterLogic: Index-Datei nicht gefunden oder leer.")
+                    return False
 
-            data = json.loads(content.decode('utf-8'))
-            if 'latest' not in data:
-                self.logger.log_error("UpdaterLogic: 'latest' Schlüssel nicht gefunden.")
-                return False
+                updated_content = self._build_update(content, event)
+                if updated_content is None:
+                    return False
 
-            original_latest = data['latest']
-            if not isinstance(original_latest, int):
-                self.logger.log_error("UpdaterLogic: 'latest' ist kein Integer.")
-                return False
+                if not self._replace_atomically(updated_content):
+                    self.logger.log_error("UpdaterLogic: Fehler beim Hochladen der aktualisierten Datei.")
+                    return False
 
-            new_latest = max(0, original_latest - 1)
-            data['latest'] = new_latest
+                self.logger.log_info("UpdaterLogic: Index-Datei erfolgreich aktualisiert und hochgeladen.")
+                return True
 
-            updated_content = json.dumps(data, indent=2).encode('utf-8')
+        except Exception as e:
+            self.logger.log_error(f"UpdaterLogic: Ausnahmefehler: {e}")
+            event["error"] = str(e)
+            return False
 
-            self.logger.log_info(f"UpdaterLogic: Aktualisiere 'latest' von {original_latest} auf {new_latest}.")
+    async def _process_index_file_async(self, event: Dict[str, Any]) -> bool:
+        """
+        Asynchrone Variante von _process_index_file über eine eigene Sitzung
+        (ohne Wiederholungen; ein Fehler wird im Ergebnis gemeldet).
+        """
+        client = None
+        try:
+            client = await self.ftp_worker.open_client()
+            self.logger.log_info("UpdaterLogic: Lade Index-Datei herunter...")
+            chunks = []
+            await client.retrieve(f"RETR {self.index_filename}", chunks.append)
+            updated_content = self._build_update(b"".join(chunks), event)
+            if updated_content is None:
+                return False
 
-            upload_result = self.ftp_worker.upload_file(self.index_filename, updated_content)
-            if not upload_result:
-                self.logger.log_error("UpdaterLogic: Fehler beim Hochladen der aktualisierten Datei.")
+            temp_name = f"{self.index_filename}.tmp"
+            await client.store(f"STOR {temp_name}", io.BytesIO(updated_content))
+            try:
+                verified = await client.size(temp_name) == len(updated_content)
+            except ftplib.error_perm:
+                readback = []
+                await client.retrieve(f"RETR {temp_name}", readback.append)
+                verified = b"".join(readback) == updated_content
+            if not verified:
+                self.logger.log_error("UpdaterLogic: Prüfung der temporären Index-Datei fehlgeschlagen.")
+                await client.delete(temp_name)
                 return False
+            await client.replace(temp_name, self.index_filename)
 
             self.logger.log_info("UpdaterLogic: Index-Datei erfolgreich aktualisiert und hochgeladen.")
             return True
-
         except Exception as e:
             self.logger.log_error(f"UpdaterLogic: Ausnahmefehler: {e}")
+            event["error"] = str(e)
             return False
+        finally:
+            self.ftp_worker.invalidate_listing(f"{self.index_filename}.tmp", self.index_filename)
+            if client is not None:
+                await client.quit()
+
+    def _build_update(self, content: bytes, event: Dict[str, Any]) -> Optional[bytes]:
+        """
+        Reduziert 'latest' im Inhalt der Index-Datei um 1 und trägt alten/neuen
+        Wert und Größe in `event` ein.
+
+        Returns:
+            Optional[bytes]: Neuer Inhalt oder None, wenn die Datei ungültig ist.
+        """
+        data = json.loads(content.decode('utf-8'))
+        if 'latest' not in data:
+            self.logger.log_error("UpdaterLogic: 'latest' Schlüssel nicht gefunden.")
+            return None
+
+        original_latest = data['latest']
+        if not isinstance(original_latest, int):
+            self.logger.log_error("UpdaterLogic: 'latest' ist kein Integer.")
+            return None
+
+        new_latest = max(0, original_latest - 1)
+
+        # Nur die Ziffern von 'latest' ersetzen, Formatierung bleibt erhalten
+        updated_text = replace_top_level_int(content.decode('utf-8'), 'latest', new_latest)
+        if updated_text is None:
+            data['latest'] = new_latest
+            updated_text = json.dumps(data, indent=2)
+        if json.loads(updated_text).get('latest') != new_latest:
+            self.logger.log_error("UpdaterLogic: 'latest' konnte nicht eindeutig ersetzt werden.")
+            return None
+        updated_content = updated_text.encode('utf-8')
+
+        self.logger.log_info(f"UpdaterLogic: Aktualisiere 'latest' von {original_latest} auf {new_latest}.")
+        event.update(latest_before=original_latest, latest_after=new_latest, bytes=len(updated_content))
+        return updated_content
+
+    def _replace_atomically(self, content: bytes) -> bool:
+        """
+        Lädt den neuen Inhalt unter einem temporären Namen hoch, prüft ihn per SIZE
+        (oder Rücklesen, falls SIZE nicht verfügbar ist) und benennt ihn dann per
+        RNFR/RNTO über die Live-Datei. Der Spielserver sieht so nie eine halb
+        geschriebene Index-Datei; ein Wiederholungsversuch überschreibt nur die
+        temporäre Datei.
+
+        Returns:
+            bool: True bei Erfolg, False bei Fehlern.
+        """
+        temp_name = f"{self.index_filename}.tmp"
+        if not self.ftp_worker.upload_file(temp_name, content):
+            return False
+
+        remote_size = self.ftp_worker.get_size(temp_name)
+        if remote_size is not None:
+            verified = remote_size == len(content)
+        else:
+            verified = self.ftp_worker.download_file(temp_name) == content
+        if not verified:
+            self.logger.log_error("UpdaterLogic: Prüfung der temporären Index-Datei fehlgeschlagen.")
+            self.ftp_worker.delete_file(temp_name)
+            return False
+
+        return self.ftp_worker.rename_file(temp_name, self.index_filename)
@@ -0,0 +1,347 @@
+# headless.py
+
+"""
+Headless-Einstiegspunkt ohne GUI (importiert kein PyQt6).
+
+Für Server ohne Display: lädt config.json, führt den Scheduler im Vordergrund
+oder als Daemon aus und bietet einmalige Befehle.
+
+Beispiele:
+    python headless.py test-connection
+    python headless.py update
+    python headless.py backup --server srv1
+    python headless.py restore backup_2025-06-19_16-43-49.zip --server srv1 --files 3ad85aea-index
+    python headless.py sync ./spiegel --server srv1 --direction download --delete
+    python headless.py run --daemon --pid-file /run/enshrouded-updater.pid
+"""
+
+import argparse
+import os
+import signal
+import sys
+import threading
+from typing import Any, Dict, List
+
+from core.config_handler import ConfigHandler
+from core.fleet import FleetRunner
+from core.ftp_pool import get_default_pool
+from core.ftp_worker import create_worker
+from core.listing_cache import DEFAULT_TTL, get_default_listing_cache
+from core.logger import Logger
+from core.metrics import MetricsServer
+from core.rate_limit import get_default_limiter
+from core.restore_logic import RestoreLogic
+from core.retention import RetentionPolicy
+from core.scheduler import CronTrigger, IntervalTrigger, MinuteOfHourTrigger, Scheduler
+from core.sync_engine import DIRECTIONS, SyncEngine
+from core.transfer_tuning import TUNING_FILENAME, get_default_tuner
+from core.utils import ensure_dir_exists
+
+CONFIG_FILE = "config.json"
+TMP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tmp")
+
+
+def select_servers(config: ConfigHandler, name: str = None) -> List[Dict[str, Any]]:
+    servers = config.get_servers()
+    if name:
+        servers = [s for s in servers if s["name"] == name]
+    return servers
+
+
+def backup_options(config: ConfigHandler) -> Dict[str, Any]:
+    """
+    Liest die optionalen Backup-Einstellungen aus der Konfiguration.
+    """
+    return {
+        "parallel_connections": config.get("backup_parallel_connections", 1),
+        "incremental": config.get("backup_incremental", False),
+        "backend": config.get("backup_backend", "zip"),
+        "compression": config.get("backup_compression", "deflate"),
+        "compression_level": config.get("backup_compression_level"),
+        "hash_algorithm": config.get("backup_hash_algorithm", "sha256"),
+        "skip_unchanged": config.get("backup_skip_unchanged", False),
+        "retention": RetentionPolicy.from_settings(config.get("backup_rotation"), config.get("backup_retention")),
+    }
+
+
+def apply_bandwidth(config: ConfigHandler, logger: Logger):
+    """
+    Überträgt "bandwidth" und die Grenzen einzelner Server ("bandwidth_kib_s",
+    0 = unbegrenzt) auf den prozessweiten RateLimiter.
+    """
+    limiter = get_default_limiter()
+    limiter.apply_settings(config.get("bandwidth"), logger)
+    for server in config.get_servers():
+        if server.get("bandwidth_kib_s") is not None:
+            limiter.set_server_rate(server["host"], float(server["bandwidth_kib_s"]) * 1024)
+
+
+def apply_transfer_tuning(config: ConfigHandler, logger: Logger):
+    """
+    Aktiviert die gemessene Blockgröße ("transfer_tuning", Standard an;
+    der Stand liegt unter TMP_DIR und gilt auch für spätere Läufe) und setzt die
+    TTL des Verzeichnis-Caches ("listing_cache_ttl" in Sekunden, 0 = aus).
+    """
+    get_default_tuner().configure(os.path.join(TMP_DIR, TUNING_FILENAME),
+                                  enabled=config.get("transfer_tuning", True), logger=logger)
+    get_default_listing_cache().configure(config.get("listing_cache_ttl", DEFAULT_TTL))
+
+
+def update_trigger(config: ConfigHandler, interval_minutes: int = None):
+    """
+    Ermittelt den Trigger für das Index-Update: ein Intervall von der
+    Kommandozeile, sonst die festen Minuten aus der GUI-Konfiguration
+    (update_interval_30 / update_interval_60) oder "update_cron".
+    """
+    if interval_minutes:
+        return IntervalTrigger(interval_minutes * 60)
+    if config.get("update_interval_30", False):
+        return MinuteOfHourTrigger([config.get("update_30_time_1", 0), 30 + config.get("update_30_time_2", 0)])
+    if config.get("update_interval_60", False):
+        return MinuteOfHourTrigger([config.get("update_60_time", 0)])
+    if config.get("update_cron"):
+        return CronTrigger(config.get("update_cron"))
+    if config.get("update_interval"):
+        return IntervalTrigger(int(config.get("update_interval")) * 60)
+    return None
+
+
+def backup_trigger(config: ConfigHandler, interval_minutes: int = None):
+    if interval_minutes is not None:
+        return IntervalTrigger(interval_minutes * 60) if interval_minutes > 0 else None
+    if config.get("backup_cron"):
+        return CronTrigger(config.get("backup_cron"))
+    if config.get("backup_interval"):
+        return IntervalTrigger(int(config.get("backup_interval")) * 60)
+    return None
+
+
+def create_runner(config: ConfigHandler, args, logger: Logger) -> FleetRunner:
+    fleet = config.get("fleet", {}) or {}
+    backup_root = config.get("backup_folder") or os.path.join(os.getcwd(), "backups")
+    return FleetRunner(
+        select_servers(config, args.server),
+        logger,
+        max_concurrency=fleet.get("max_concurrency", 4),
+        backup_root=os.path.abspath(backup_root),
+        tmp_dir=TMP_DIR,
+        backup_options=backup_options(config),
+    )
+
+
+def report(results: List[Dict[str, Any]]) -> int:
+    exit_code = 0
+    for result in results:
+        ok = not result["error"] and result["update"] is not False and result["backup"] is not False
+        if not ok:
+            exit_code = 1
+        status = "OK" if ok else f"FEHLER ({result['error'] or 'siehe Log'})"
+        print(f"{result['server']}: {status} [{result['duration']:.2f}s]")
+    return exit_code
+
+
+def cmd_test_connection(config: ConfigHandler, args, logger: Logger) -> int:
+    servers = select_servers(config, args.server)
+    if not servers:
+        print("Keine Server konfiguriert.")
+        return 1
+    exit_code = 0
+    for server in servers:
+        worker = create_worker(server, logger, tmp_dir=TMP_DIR)
+        ok = worker.connect()
+        worker.disconnect()
+        print(f"{server['name']}: {'Verbindung erfolgreich' if ok else 'Verbindung fehlgeschlagen'}")
+        if not ok:
+            exit_code = 1
+    return exit_code
+
+
+def cmd_update(config: ConfigHandler, args, logger: Logger) -> int:
+    return report(create_runner(config, args, logger).run(update=True, backup=False))
+
+
+def cmd_backup(config: ConfigHandler, args, logger: Logger) -> int:
+    return report(create_runner(config, args, logger).run(update=False, backup=True))
+
+
+def cmd_restore(config: ConfigHandler, args, logger: Logger) -> int:
+    servers = select_servers(config, args.server)
+    if len(servers) != 1:
+        print("Bitte genau einen Server mit --server angeben." if servers else "Keine Server konfiguriert.")
+        return 1
+    server = servers[0]
+    backup_dir = create_runner(config, args, logger).backup_dir_for(server)
+    if backup_dir is None:
+        print("Kein Backup-Ordner konfiguriert.")
+        return 1
+    worker = create_worker(server, logger, tmp_dir=TMP_DIR)
+    restore = RestoreLogic(worker, backup_dir, logger,
+                           parallel_connections=config.get("backup_parallel_connections", 1))
+    ok = restore.restore(args.backup, args.files or None, skip_identical=not args.force)
+    print(f"{server['name']}: {'Wiederherstellung erfolgreich' if ok else 'Wiederherstellung fehlgeschlagen'}")
+    return 0 if ok else 1
+
+
+def cmd_sync(config: ConfigHandler, args, logger: Logger) -> int:
+    servers = select_servers(config, args.server)
+    if len(servers) != 1:
+        print("Bitte genau einen Server mit --server angeben." if servers else "Keine Server konfiguriert.")
+        return 1
+    worker = create_worker(servers[0], logger, tmp_dir=TMP_DIR)
+    engine = SyncEngine(worker, args.local_dir, logger, direction=args.direction, delete=args.delete,
+                        remote_dir=args.remote_dir)
+    plan = engine.sync(dry_run=args.dry_run)
+    if plan is None:
+        print(f"{servers[0]['name']}: Abgleich fehlgeschlagen")
+        return 1
+    print(f"{servers[0]['name']}: {len(plan['download'])} heruntergeladen, {len(plan['upload'])} hochgeladen, "
+          f"{len(plan['delete_local']) + len(plan['delete_remote'])} gelöscht"
+          + (" (Probelauf)" if args.dry_run else ""))
+    return 0
+
+
+def daemonize(pid_file: str = None):
+    """
+    Löst den Prozess per Double-Fork vom Terminal (nur POSIX).
+    """
+    if os.fork() > 0:
+        os._exit(0)
+    os.setsid()
+    if os.fork() > 0:
+        os._exit(0)
+    os.chdir("/")
+    os.umask(0o022)
+    with open(os.devnull, "rb") as devnull_in, open(os.devnull, "ab") as devnull_out:
+        os.dup2(devnull_in.fileno(), sys.stdin.fileno())
+        os.dup2(devnull_out.fileno(), sys.stdout.fileno())
+        os.dup2(devnull_out.fileno(), sys.stderr.fileno())
+    if pid_file:
+        with open(pid_file, "w") as f:
+            f.write(str(os.getpid()))
+
+
+def cmd_run(config: ConfigHandler, args, logger: Logger) -> int:
+    update_at = update_trigger(config, args.update_interval)
+    backup_at = backup_trigger(config, args.backup_interval)
+    if update_at is None and backup_at is None:
+        print("Kein Zeitplan konfiguriert (update_interval_30/60, update_cron, update_interval, "
+              "backup_cron oder backup_interval).")
+        return 1
+
+    # Pfade vor dem Daemonisieren auflösen (danach ist das Arbeitsverzeichnis "/")
+    runner = create_runner(config, args, logger)
+    if args.daemon:
+        if not hasattr(os, "fork"):
+            print("--daemon wird nur unter POSIX unterstützt.")
+            return 1
+        daemonize(os.path.abspath(args.pid_file) if args.pid_file else None)
+
+    # Alle Aufgaben teilen sich einen Scheduler-Thread
+    # Verpasste Läufe (skip, coalesce, catchup); Standard: verwerfen
+    misfire = config.get("scheduler_misfire", "skip")
+    scheduler = Scheduler()
+    if update_at is not None:
+        scheduler.add_job("update", lambda: runner.run(update=True, backup=False), update_at, misfire=misfire)
+    if backup_at is not None:
+        scheduler.add_job("backup", lambda: runner.run(update=False, backup=True), backup_at, misfire=misfire)
+    scheduler.add_job("ftp-keepalive", get_default_pool().keepalive, IntervalTrigger(60))
+
+    update_cfg = config.get("update", {}) or {}
+    if update_cfg.get("auto_check") and update_cfg.get("repo_owner") and update_cfg.get("repo_name"):
+        from core.update_checker import UpdateChecker  # benötigt requests, nur bei Bedarf laden
+        checker = UpdateChecker(update_cfg["repo_owner"], update_cfg["repo_name"],
+                                update_cfg.get("current_version", "0.0.0"), logger)
+        scheduler.add_job("update-check", checker.is_update_available, CronTrigger("0 6 * * *"))
+
+    # Optional: Metriken für Prometheus o.ä. (nur lokal, sofern nicht anders konfiguriert)
+    metrics_server = None
+    metrics_port = args.metrics_port or config.get("metrics_port")
+    if metrics_port:
+        metrics_server = MetricsServer(config.get("metrics_host", "127.0.0.1"), int(metrics_port), logger=logger)
+        metrics_server.start()
+
+    stop_event = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop_event.set())
+    if hasattr(signal, "SIGHUP"):
+        # Bandbreitengrenzen zur Laufzeit neu aus der config.json lesen
+        signal.signal(signal.SIGHUP, lambda *_: config.load() and apply_bandwidth(config, logger))
+
+    scheduler.start()
+    logger.log_info("Headless: Scheduler läuft, beenden mit Strg+C bzw. SIGTERM.")
+    while not stop_event.wait(1):
+        pass
+
+    logger.log_info("Headless: Beende Scheduler...")
+    scheduler.stop()
+    if metrics_server:
+        metrics_server.stop()
+    get_default_pool().close_all()
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Savegame FTP JSON Updater (ohne GUI)")
+    parser.add_argument("--config", default=CONFIG_FILE, help="Pfad zur config.json")
+    parser.add_argument("--server", help="Nur den Server mit diesem Namen bearbeiten")
+    parser.add_argument("--log-file", help="Zusätzlich in diese Datei protokollieren")
+    parser.add_argument("--json-log", help="Strukturierte Ereignisse (JSON Lines) in diese Datei schreiben")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("test-connection", help="FTP-Verbindung prüfen")
+    subparsers.add_parser("update", help="Index-Datei einmalig aktualisieren")
+    subparsers.add_parser("backup", help="Einmaliges Backup erstellen")
+
+    restore_parser = subparsers.add_parser("restore", help="Backup auf den FTP-Server zurückspielen")
+    restore_parser.add_argument("backup", help="ZIP-Archiv (backup_...zip) oder Snapshot (backup_...)")
+    restore_parser.add_argument("--files", nargs="+", help="Nur diese Dateien wiederherstellen")
+    restore_parser.add_argument("--force", action="store_true", help="Auch bereits identische Dateien hochladen")
+
+    sync_parser = subparsers.add_parser("sync", help="FTP-Verzeichnis inkrementell mit lokalem Ordner abgleichen")
+    sync_parser.add_argument("local_dir", help="Lokaler Spiegelordner")
+    sync_parser.add_argument("--direction", choices=DIRECTIONS, default="download",
+                             help="download (Server -> lokal), upload (lokal -> Server) oder both")
+    sync_parser.add_argument("--remote-dir", default="", help="Unterverzeichnis relativ zum FTP-Verzeichnis")
+    sync_parser.add_argument("--delete", action="store_true", help="Auf der Gegenseite fehlende Dateien löschen")
+    sync_parser.add_argument("--dry-run", action="store_true", help="Nur anzeigen, was übertragen würde")
+
+    run_parser = subparsers.add_parser("run", help="Scheduler im Vordergrund ausführen")
+    run_parser.add_argument("--daemon", action="store_true", help="Als Daemon im Hintergrund laufen (POSIX)")
+    run_parser.add_argument("--pid-file", help="PID-Datei im Daemon-Modus")
+    run_parser.add_argument("--update-interval", type=int, help="Update-Intervall in Minuten")
+    run_parser.add_argument("--backup-interval", type=int, help="Backup-Intervall in Minuten (0 = aus)")
+    run_parser.add_argument("--metrics-port", type=int, help="Metriken per HTTP unter /metrics auf diesem Port anbieten")
+    return parser
+
+
+COMMANDS = {
+    "test-connection": cmd_test_connection,
+    "update": cmd_update,
+    "backup": cmd_backup,
+    "restore": cmd_restore,
+    "sync": cmd_sync,
+    "run": cmd_run,
+}
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    ensure_dir_exists(TMP_DIR)
+
+    log_file = os.path.abspath(args.log_file) if args.log_file else None
+    json_file = os.path.abspath(args.json_log) if args.json_log else None
+    logger = Logger(log_file, json_file=json_file)
+    config = ConfigHandler(os.path.abspath(args.config))
+    if not config.load():
+        print(f"Konfiguration {args.config} nicht gefunden oder ungültig.")
+        return 1
+    apply_bandwidth(config, logger)
+    apply_transfer_tuning(config, logger)
+    try:
+        return COMMANDS[args.command](config, args, logger)
+    finally:
+        get_default_tuner().save()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
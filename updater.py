@@ -14,9 +14,14 @@ from PyQt6.QtCore import QTimer, Qt
 from core.config_handler import ConfigHandler
 from core.logger import Logger
 from core.ftp_worker import FTPWorker
+from core.ftp_pool import get_default_pool
+from core.rate_limit import get_default_limiter
+from core.transfer_tuning import TUNING_FILENAME, get_default_tuner
+from core.listing_cache import DEFAULT_TTL, get_default_listing_cache
 from core.scheduler import Scheduler
 from core.updater_logic import UpdaterLogic
 from core.backup_logic import BackupLogic
+from core.backup_catalog import BackupCatalog
 from core.i18n import I18n
 from core.tray_icon import TrayIcon
 from core.utils import ensure_dir_exists
@@ -66,7 +71,8 @@ class UpdaterGUI(QWidget):
         interval = self.config.get("update_interval", 60) * 60  # Minuten zu Sekunden
         self.scheduler = Scheduler(interval, self.run_update)
 
-        self.ftp_worker = FTPWorker(host, username, password, ftp_dir, self.logger)
+        self.ftp_worker = FTPWorker(host, username, password, ftp_dir, self.logger,
+                                    pool=get_default_pool(), tmp_dir=TMP_DIR)
 
     def toggle_visibility(self):
         if self.isVisible():
@@ -202,21 +208,29 @@ class UpdaterGUI(QWidget):
         # Beispiel: FTP Verbindung testen, Dateien herunterladen, Backup machen etc.
         self.log("[Update] Update beendet.")
     
-    def run_updater_now(self):
-        from core.ftp_worker import FTPWorker
-        from core.config_handler import ConfigHandler
-
-        config = ConfigHandler.load_config()
-        ftp_config = config.get("ftp", {})
-
-        ftp = FTPWorker(
-            ftp_config.get("host", ""),
-            ftp_config.get("user", ""),
-            ftp_config.get("password", "")
+    def create_ftp_worker(self) -> FTPWorker:
+        """
+        Erzeugt einen FTPWorker aus den Eingabefeldern des Server-Tabs.
+        Die Sitzung wird aus dem gemeinsamen Verbindungspool geliehen.
+        """
+        port_text = self.ftp_port.text().strip()
+        return FTPWorker(
+            self.ftp_host.text(),
+            self.ftp_user.text(),
+            self.ftp_pass.text(),
+            self.ftp_dir.text() or "/",
+            self.logger,
+            port=int(port_text) if port_text.isdigit() else 21,
+            pool=get_default_pool(),
+            tmp_dir=TMP_DIR,
         )
 
+    def run_updater_now(self):
+        ftp = self.create_ftp_worker()
+
         try:
-            ftp.connect()
+            if not ftp.connect():
+                raise ConnectionError(f"Keine Verbindung zu {ftp.host}")
             self.tray_icon.show_message("Updater", "Updatevorgang gestartet.")
             # Hier ggf. weitere Logik zum Übertragen/Prüfen einbauen
         except Exception as e:
@@ -230,9 +244,12 @@ class UpdaterGUI(QWidget):
             self.chk_interval_60.setEnabled(False)
         else:
             self.chk_interval_60.setEnabled(True)
+        self.spin_30_1.setEnabled(self.chk_interval_30.isChecked())
+        self.spin_30_2.setEnabled(self.chk_interval_30.isChecked())
+        self.spin_60.setEnabled(self.chk_interval_60.isChecked())
     
     def setup_scheduler(self):
-        from core.scheduler import Scheduler
+        from core.scheduler import Scheduler, MinuteOfHourTrigger
 
         # Task-Funktion, die der Scheduler ausführen soll
         def scheduled_task():
@@ -246,18 +263,19 @@ class UpdaterGUI(QWidget):
                 self.log(f"[Scheduler] Fehler bei Update-Aufgabe: {e}")
                 self.tray_icon.set_status('error')
 
-        # Intervall aus GUI, z.B. aus Checkboxen oder Eingabefeldern (in Sekunden)
+        # Feste Minuten aus GUI: bei 30 Minuten eine Zeit je Halbstunde, bei 60 Minuten eine pro Stunde
         if self.chk_interval_30.isChecked():
-            interval_seconds = 1800  # 30 Minuten
+            minutes = [self.spin_30_1.value(), 30 + self.spin_30_2.value()]
         elif self.chk_interval_60.isChecked():
-            interval_seconds = 3600  # 60 Minuten
+            minutes = [self.spin_60.value()]
         else:
-            interval_seconds = 0  # Deaktiviert oder manuell
+            minutes = []  # Deaktiviert oder manuell
 
-        if interval_seconds > 0:
-            self.scheduler = Scheduler(interval_seconds, scheduled_task)
+        if minutes:
+            self.scheduler = Scheduler()
+            self.scheduler.add_job("update", scheduled_task, MinuteOfHourTrigger(minutes))
             self.scheduler.start()
-            self.log(f"[Scheduler] Scheduler mit Intervall {interval_seconds}s gestartet.")
+            self.log(f"[Scheduler] Scheduler für Minute(n) {minutes} jeder Stunde gestartet.")
             self.tray_icon.set_status('running')
         else:
             self.scheduler = None
@@ -297,6 +315,26 @@ class UpdaterGUI(QWidget):
         folder = QFileDialog.getExistingDirectory(self, "Backup-Ordner wählen")
         if folder:
             self.backup_folder.setText(folder)
+            self.refresh_backup_list()
+
+    def refresh_backup_list(self):
+        """
+        Füllt "Vorhandene Backups" aus dem Backup-Katalog, ohne die Archive zu öffnen.
+        """
+        self.list_backups.clear()
+        backup_folder = self.backup_folder.text()
+        if not backup_folder or not os.path.isdir(backup_folder):
+            return
+        try:
+            catalog = BackupCatalog.for_backup_dir(backup_folder, self.logger)
+            catalog.sync_directory(backup_folder)
+            for backup in catalog.list_backups():
+                details = f"{backup['size'] / (1024 * 1024):.1f} MB, {backup['file_count']} Dateien"
+                if backup["server"]:
+                    details += f", {backup['server']}"
+                self.list_backups.addItem(f"{backup['name']} ({details})")
+        except Exception as e:
+            self.logger.log_error(f"Backup-Liste konnte nicht geladen werden: {e}")
 
     def run_backup_now(self):
         backup_folder = self.backup_folder.text()  # Pfad aus Eingabefeld
@@ -346,20 +384,22 @@ class UpdaterGUI(QWidget):
         # Backup
         self.spin_backup_rotate.setValue(cfg.get("backup_rotation", 10))
         self.backup_folder.setText(cfg.get("backup_folder", os.path.join(os.getcwd(), "backups")))
+        self.refresh_backup_list()
+
+        # Bandbreite (nur über config.json einstellbar)
+        get_default_limiter().apply_settings(cfg.get("bandwidth"), self.logger)
+        get_default_tuner().configure(os.path.join(TMP_DIR, TUNING_FILENAME),
+                                      enabled=cfg.get("transfer_tuning", True), logger=self.logger)
+        get_default_listing_cache().configure(cfg.get("listing_cache_ttl", DEFAULT_TTL))
 
         # Optionen
         self.chk_logging
 
     def test_ftp_connection(self):
-        host = self.ftp_host.text()
-        user = self.ftp_user.text()
-        password = self.ftp_pass.text()
-
-        from core.ftp_worker import FTPWorker
-
-        ftp = FTPWorker(host, user, password)
+        ftp = self.create_ftp_worker()
         try:
-            ftp.connect()
+            if not ftp.connect():
+                raise ConnectionError(f"Keine Verbindung zu {ftp.host}")
             self.tray_icon.show_message("FTP", "Verbindung erfolgreich!")
         except Exception as e:
             self.tray_icon.show_message("FTP", f"Verbindung fehlgeschlagen:\n{e}")